@@ -0,0 +1,168 @@
+"""Zero-copy PCM buffers for audio passed between conversion stages.
+
+``PcmAudio`` holds one ``bytes`` object, so padding a chunk with its pause or
+joining chunks copies every sample each time, as pydub's immutable
+``AudioSegment`` does.  An ``AudioBuffer`` is instead a list of memoryviews
+into existing sample data: slicing, appending and padding with silence only
+add or narrow views, and encoders write the views out with ``writelines``
+without joining them.  Silence is a view into one shared block of zeros.
+
+The buffer has the same format attributes as ``PcmAudio`` (``sample_rate``,
+``channels``, ``sample_width``, ``frames``, ``format``...), so stages and
+encoders accept either.  Audio becomes contiguous only at the edges:
+``data`` and ``to_pcm()`` join the views into bytes, ``to_array()`` returns a
+NumPy array (a view when the buffer is a single part) for sample processing,
+and ``to_segment()`` builds a pydub ``AudioSegment``.  NumPy and pydub are
+imported only when those are called.
+"""
+from audio_codec import PcmAudio
+
+_ZERO_BLOCK = 1 << 16
+_zeros = memoryview(bytes(_ZERO_BLOCK))
+
+_DTYPES = {1: "u1", 2: "<i2", 4: "<i4"}
+
+
+def _zero_views(nbytes):
+    """Views of the shared zero block totalling ``nbytes``"""
+    global _zeros
+    if nbytes > len(_zeros) and nbytes <= 16 * _ZERO_BLOCK:
+        _zeros = memoryview(bytes(nbytes))
+    views = []
+    while nbytes > 0:
+        part = _zeros[:nbytes]
+        views.append(part)
+        nbytes -= len(part)
+    return views
+
+
+class AudioBuffer:
+    """Interleaved PCM audio held as views into other buffers"""
+
+    __slots__ = ("views", "sample_rate", "channels", "sample_width", "nbytes")
+
+    def __init__(self, sample_rate, channels=1, sample_width=2, views=()):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.views = []
+        self.nbytes = 0
+        for view in views:
+            self._add(view)
+
+    @classmethod
+    def from_pcm(cls, audio):
+        """Wrap ``audio`` (PcmAudio or AudioBuffer) without copying samples"""
+        return cls(audio.sample_rate, audio.channels, audio.sample_width, audio.views)
+
+    @classmethod
+    def from_array(cls, samples, sample_rate, channels=1):
+        """Wrap a C-contiguous NumPy array of integer samples without copying"""
+        view = memoryview(samples).cast("B")
+        return cls(sample_rate, channels, samples.dtype.itemsize, (view,))
+
+    @classmethod
+    def silence(cls, frames, sample_rate, channels=1, sample_width=2):
+        buffer = cls(sample_rate, channels, sample_width)
+        buffer.append_silence(frames)
+        return buffer
+
+    def _add(self, view):
+        view = view if isinstance(view, memoryview) else memoryview(view)
+        if view.ndim != 1 or view.itemsize != 1:
+            view = view.cast("B")
+        if len(view):
+            self.views.append(view)
+            self.nbytes += len(view)
+
+    # Format, as on PcmAudio
+
+    @property
+    def frame_size(self):
+        return self.channels * self.sample_width
+
+    @property
+    def frames(self):
+        return self.nbytes // self.frame_size
+
+    @property
+    def duration_ms(self):
+        return self.frames * 1000.0 / self.sample_rate
+
+    @property
+    def format(self):
+        return (self.sample_rate, self.channels, self.sample_width)
+
+    def __len__(self):
+        return self.frames
+
+    # Building
+
+    def append(self, audio):
+        """Add ``audio`` (same format) to the end; its views are shared, not copied"""
+        if audio.format != self.format:
+            raise ValueError(f"Cannot join {audio.format} audio to {self.format}")
+        for view in audio.views:
+            self._add(view)
+        return self
+
+    def append_silence(self, frames):
+        for view in _zero_views(frames * self.frame_size):
+            self._add(view)
+        return self
+
+    def __add__(self, other):
+        return AudioBuffer.from_pcm(self).append(other)
+
+    def slice(self, start, end=None):
+        """Frames ``start`` to ``end`` as a new buffer of narrowed views"""
+        frames = self.frames
+        end = frames if end is None else min(end, frames)
+        start = min(max(start, 0), end)
+        first, last = start * self.frame_size, end * self.frame_size
+        result = AudioBuffer(*self.format)
+        position = 0
+        for view in self.views:
+            view_end = position + len(view)
+            if view_end > first and position < last:
+                result._add(view[max(first - position, 0):min(last, view_end) - position])
+            position = view_end
+            if position >= last:
+                break
+        return result
+
+    def __getitem__(self, frames):
+        if not isinstance(frames, slice) or frames.step not in (None, 1):
+            raise TypeError("AudioBuffer only supports contiguous frame slices")
+        start, end, _ = frames.indices(self.frames)
+        return self.slice(start, end)
+
+    # Edges, where contiguous audio is needed
+
+    @property
+    def data(self):
+        """The samples as bytes (copies unless the buffer is one bytes view)"""
+        if len(self.views) == 1 and isinstance(self.views[0].obj, bytes) \
+                and len(self.views[0]) == len(self.views[0].obj):
+            return self.views[0].obj
+        return b"".join(self.views)
+
+    def to_pcm(self):
+        return PcmAudio(self.data, *self.format)
+
+    def to_array(self):
+        """Samples as a NumPy array of shape (frames, channels)"""
+        import numpy
+        dtype = numpy.dtype(_DTYPES[self.sample_width])
+        if len(self.views) == 1:
+            samples = numpy.frombuffer(self.views[0], dtype=dtype)
+        else:
+            samples = numpy.concatenate(
+                [numpy.frombuffer(view, dtype=dtype) for view in self.views])
+        return samples.reshape(-1, self.channels)
+
+    def to_segment(self):
+        """A pydub ``AudioSegment`` with these samples"""
+        from pydub import AudioSegment
+        return AudioSegment(data=self.data, sample_width=self.sample_width,
+                            frame_rate=self.sample_rate, channels=self.channels)
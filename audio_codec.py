@@ -0,0 +1,242 @@
+"""Audio decode/encode helpers shared by the audiobook converters.
+
+pyttsx3 writes every chunk as a small WAV file.  Reading those back through
+pydub (``AudioSegment.from_mp3``/``from_file``) and writing the result with
+``export`` launches a new ffmpeg process for every call, which adds up to
+thousands of process launches on a long book.  ``CodecWorker`` decodes WAV
+chunks in-process and feeds all audio of one output file through a single
+long-lived ffmpeg encoder process.
+"""
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from collections import namedtuple
+
+
+class PcmAudio(namedtuple("PcmAudio", "data sample_rate channels sample_width")):
+    """Raw interleaved PCM audio with its format"""
+    __slots__ = ()
+
+    @property
+    def frame_size(self):
+        return self.channels * self.sample_width
+
+    @property
+    def frames(self):
+        return len(self.data) // self.frame_size
+
+    @property
+    def duration_ms(self):
+        return self.frames * 1000.0 / self.sample_rate
+
+    @property
+    def format(self):
+        return (self.sample_rate, self.channels, self.sample_width)
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+    @property
+    def views(self):
+        """The data as a list of buffers, like ``AudioBuffer.views``"""
+        return [memoryview(self.data)]
+
+
+def find_ffmpeg():
+    """Locate the ffmpeg binary, preferring the one pydub is configured with"""
+    try:
+        from pydub import AudioSegment
+        converter = AudioSegment.converter
+    except ImportError:
+        converter = "ffmpeg"
+    return shutil.which(converter) or shutil.which("ffmpeg")
+
+
+def silence(duration_ms, sample_rate, channels=1, sample_width=2):
+    """Return a block of digital silence, sharing one buffer of zeros"""
+    from audio_buffer import AudioBuffer
+    frames = int(round(sample_rate * duration_ms / 1000.0))
+    return AudioBuffer.silence(frames, sample_rate, channels, sample_width)
+
+
+def read_wav(source):
+    """Decode a PCM WAV file (path or bytes) without spawning a process"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with wave.open(source, "rb") as wav:
+        return PcmAudio(wav.readframes(wav.getnframes()), wav.getframerate(),
+                        wav.getnchannels(), wav.getsampwidth())
+
+
+def wav_bytes(audio):
+    """Encode a PcmAudio block as an in-memory WAV file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(audio.channels)
+        wav.setsampwidth(audio.sample_width)
+        wav.setframerate(audio.sample_rate)
+        for view in audio.views:
+            wav.writeframesraw(view)
+    return buffer.getvalue()
+
+
+def is_wav(path):
+    with open(path, "rb") as f:
+        header = f.read(12)
+    return header[:4] == b"RIFF" and header[8:12] == b"WAVE"
+
+
+class StreamEncoder:
+    """A single ffmpeg process encoding raw PCM from a pipe into one file"""
+
+    def __init__(self, ffmpeg, output_file, sample_rate, channels=1, sample_width=2,
+                 fmt="mp3", bitrate=None, extra_args=()):
+        if sample_width != 2:
+            raise ValueError("Only 16-bit PCM can be streamed to the encoder")
+        self.output_file = output_file
+        self.format = (sample_rate, channels, sample_width)
+        self.bytes_written = 0
+        cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels),
+               "-i", "pipe:0", "-f", fmt]
+        if bitrate:
+            cmd += ["-b:a", bitrate]
+        cmd += list(extra_args)
+        cmd.append(output_file)
+        self._stderr = _ErrorLog()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL,
+                                        stderr=self._stderr.handle)
+
+    def write(self, audio):
+        """Append a PcmAudio or AudioBuffer block (must match the stream format)"""
+        if audio.format != self.format:
+            raise ValueError(f"Chunk format {audio.format} does not match "
+                             f"encoder format {self.format}")
+        # Views go to the pipe as they are, without being joined first
+        self.process.stdin.writelines(audio.views)
+        self.bytes_written += audio.nbytes
+
+    def close(self):
+        """Flush the pipe and wait for ffmpeg to finish writing the file"""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        message = self._stderr.read_and_close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {message}")
+
+    def abort(self):
+        """Kill the encoder and remove the partially written file"""
+        self.process.kill()
+        self.process.wait()
+        self._stderr.read_and_close()
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _ErrorLog:
+    """Temporary file capturing ffmpeg stderr without risking a pipe deadlock"""
+
+    def __init__(self):
+        self.handle = tempfile.TemporaryFile()
+
+    def read_and_close(self):
+        self.handle.seek(0)
+        message = self.handle.read().decode("utf-8", "replace").strip()
+        self.handle.close()
+        return message
+
+
+class CodecWorker:
+    """Long-lived codec that all chunk decodes and encodes go through.
+
+    WAV chunks (what pyttsx3 produces on every platform except macOS) are
+    decoded with the ``wave`` module; anything else falls back to one ffmpeg
+    call.  Output files are written by a ``StreamEncoder`` that stays alive for
+    the whole book.  ``stats`` records per-chunk overhead so it can be compared
+    with the old pydub path.
+    """
+
+    def __init__(self, ffmpeg=None):
+        self._ffmpeg = ffmpeg
+        self.stats = {"decodes": 0, "decode_seconds": 0.0,
+                      "process_spawns": 0, "encode_seconds": 0.0}
+
+    @property
+    def ffmpeg(self):
+        # Looked up on first use so creating a worker costs nothing at start-up
+        if self._ffmpeg is None:
+            self._ffmpeg = find_ffmpeg()
+        return self._ffmpeg
+
+    def decode(self, path):
+        start = time.perf_counter()
+        if is_wav(path):
+            audio = read_wav(path)
+        else:
+            audio = self._decode_with_ffmpeg(path)
+        self.stats["decodes"] += 1
+        self.stats["decode_seconds"] += time.perf_counter() - start
+        return audio
+
+    def _decode_with_ffmpeg(self, path, sample_rate=22050, channels=1):
+        if not self.ffmpeg:
+            raise RuntimeError("ffmpeg not found - cannot decode " + path)
+        self.stats["process_spawns"] += 1
+        result = subprocess.run(
+            [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-i", path,
+             "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "pipe:1"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg could not decode {path}: "
+                               f"{result.stderr.decode('utf-8', 'replace').strip()}")
+        return PcmAudio(result.stdout, sample_rate, channels, 2)
+
+    def open_encoder(self, output_file, sample_rate, channels=1, sample_width=2,
+                     fmt="mp3", bitrate=None, extra_args=()):
+        if not self.ffmpeg:
+            raise RuntimeError("ffmpeg not found - cannot encode " + output_file)
+        self.stats["process_spawns"] += 1
+        return _TimedEncoder(self, output_file, sample_rate, channels,
+                             sample_width, fmt, bitrate, extra_args)
+
+    def per_chunk_ms(self):
+        """Average decode overhead per chunk in milliseconds"""
+        if not self.stats["decodes"]:
+            return 0.0
+        return self.stats["decode_seconds"] * 1000 / self.stats["decodes"]
+
+
+class _TimedEncoder(StreamEncoder):
+    def __init__(self, worker, *args):
+        self._worker = worker
+        super().__init__(worker.ffmpeg, *args)
+
+    def write(self, audio):
+        start = time.perf_counter()
+        super().write(audio)
+        self._worker.stats["encode_seconds"] += time.perf_counter() - start
+
+    def close(self):
+        start = time.perf_counter()
+        try:
+            super().close()
+        finally:
+            self._worker.stats["encode_seconds"] += time.perf_counter() - start
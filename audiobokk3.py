@@ -1,29 +1,70 @@
 import os
 import time
-import re
 import threading
-import pyttsx3
-from pydub import AudioSegment
-from pydub.playback import play
 from PyQt5 import QtWidgets, QtCore, QtGui
-from PyQt5.QtWidgets import QFileDialog, QProgressBar, QTextEdit, QMessageBox
+from PyQt5.QtWidgets import QFileDialog, QProgressBar, QMessageBox
+from audio_codec import CodecWorker, silence
+from synthesis import BatchSynthesizer, DEFAULT_WINDOW
+from spool import ChunkSpool
+import voice_catalog
+from qt_workers import ProgressCoalescer, start_worker
+from text_view import LargeTextView
+from chunking import paragraph_spans
+from preview import PreviewRenderer, play_clip
 
 class AudioBookConverter(QtWidgets.QWidget):
+    engine_ready = QtCore.pyqtSignal(object, list)
+    engine_failed = QtCore.pyqtSignal(str)
+    preview_ready = QtCore.pyqtSignal(str)
+    preview_failed = QtCore.pyqtSignal(str)
+    
     def __init__(self):
         super().__init__()
         self.engine = None
         self.is_playing = False
-        self.init_engine()
+        self.codec = CodecWorker()
+        self.previewer = PreviewRenderer()
+        self.progress = ProgressCoalescer(parent=self)
+        self.task = None
         self.initUI()
+        self.progress.updated.connect(self.show_progress)
+        self.progress.highlighted.connect(self.text_area.highlight)
+        self.engine_ready.connect(self.on_engine_ready)
+        self.engine_failed.connect(self.on_engine_failed)
+        self.preview_ready.connect(self.on_preview_ready)
+        self.preview_failed.connect(self.on_preview_failed)
+        self.init_engine()
         
     def init_engine(self):
+        # Start the engine in the background so the window shows immediately
+        self.set_engine_controls_enabled(False)
+        self.status_label.setText("Loading speech engine...")
+        threading.Thread(target=self._init_engine_thread, daemon=True).start()
+
+    def _init_engine_thread(self):
         try:
-            self.engine = pyttsx3.init()
-            # Set default properties
-            self.engine.setProperty('rate', 150)
-            self.engine.setProperty('volume', 0.9)
+            engine, voices = voice_catalog.start_engine()
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not initialize TTS engine: {str(e)}")
+            self.engine_failed.emit(str(e))
+            return
+        self.engine_ready.emit(engine, voices)
+
+    def on_engine_ready(self, engine, voices):
+        self.engine = engine
+        self.engine.setProperty('rate', self.rate_slider.value())
+        self.engine.setProperty('volume', self.volume_slider.value()/100)
+        self.populate_voices(voices)
+        self.set_engine_controls_enabled(True)
+        self.status_label.setText("Ready")
+
+    def on_engine_failed(self, message):
+        self.status_label.setText("Speech engine unavailable")
+        QMessageBox.critical(self, "Error", f"Could not initialize TTS engine: {message}")
+
+    def set_engine_controls_enabled(self, enabled):
+        self.play_button.setEnabled(enabled)
+        self.convert_button.setEnabled(enabled)
+        self.preview_button.setEnabled(enabled)
     
     def initUI(self):
         # Set black and yellow color scheme
@@ -32,7 +73,7 @@ class AudioBookConverter(QtWidgets.QWidget):
                 background-color: #000000;
                 color: #FFFF00;
             }
-            QTextEdit, QLineEdit, QComboBox {
+            QTextEdit, QPlainTextEdit, QLineEdit, QComboBox {
                 background-color: #222222;
                 color: #FFFF00;
                 border: 1px solid #444444;
@@ -112,7 +153,7 @@ class AudioBookConverter(QtWidgets.QWidget):
         
         text_layout.addLayout(control_layout)
         
-        self.text_area = QTextEdit()
+        self.text_area = LargeTextView()
         self.text_area.setPlaceholderText("Enter or paste your text here...")
         self.text_area.setStyleSheet("font-size: 14px;")
         text_layout.addWidget(self.text_area)
@@ -202,6 +243,13 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.words_per_minute.setValue(180)
         pacing_layout.addWidget(self.words_per_minute, 1, 1)
         
+        batch_label = QtWidgets.QLabel("Paragraphs per engine run:")
+        pacing_layout.addWidget(batch_label, 2, 0)
+        self.batch_size_entry = QtWidgets.QSpinBox()
+        self.batch_size_entry.setRange(1, 128)
+        self.batch_size_entry.setValue(DEFAULT_WINDOW)
+        pacing_layout.addWidget(self.batch_size_entry, 2, 1)
+        
         pacing_group.setLayout(pacing_layout)
         layout.addWidget(pacing_group)
 
@@ -268,14 +316,18 @@ class AudioBookConverter(QtWidgets.QWidget):
         # Conversion control flag
         self.is_converting = False
 
-    def populate_voices(self):
-        if not self.engine:
-            return
+    def populate_voices(self, voices=None):
+        # Cached catalog until the engine reports its own list
+        if voices is None:
+            voices = voice_catalog.load_voices()
             
-        voices = self.engine.getProperty('voices')
+        selected = self.voice_combo.currentData()
         self.voice_combo.clear()
-        for i, voice in enumerate(voices):
-            self.voice_combo.addItem(f"{voice.name} ({voice.id})", i)
+        for voice in voices:
+            self.voice_combo.addItem(f"{voice['name']} ({voice['id']})", voice['id'])
+        index = self.voice_combo.findData(selected)
+        if index >= 0:
+            self.voice_combo.setCurrentIndex(index)
 
     def update_rate_label(self, value):
         self.rate_label.setText(f"{value} words/min")
@@ -305,27 +357,16 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.text_area.clear()
 
     def preview_voice(self):
-        if not self.engine:
-            return
-            
-        # Save current properties
-        old_voice = self.engine.getProperty('voice')
-        old_rate = self.engine.getProperty('rate')
-        old_volume = self.engine.getProperty('volume')
-        
-        # Set preview properties
-        voice_index = self.voice_combo.currentData()
-        voices = self.engine.getProperty('voices')
-        self.engine.setProperty('voice', voices[voice_index].id)
-        self.engine.setProperty('rate', self.rate_slider.value())
-        self.engine.setProperty('volume', self.volume_slider.value()/100)
-        
-        # Apply pitch effect
+        # Snapshot the settings; pitch is only applied when moved off 100
         pitch = self.pitch_slider.value()
-        if pitch != 100:
-            self.engine.setProperty('pitch', pitch/100)
+        settings = {
+            'voice': self.voice_combo.currentData(),
+            'rate': self.rate_slider.value(),
+            'volume': self.volume_slider.value()/100,
+            'pitch': pitch/100 if pitch != 100 else None
+        }
         
-        # Speak preview with selected effect
+        # Preview text with selected effect
         effect = self.effect_combo.currentText()
         preview_text = {
             "None": "This is a preview of the current voice settings.",
@@ -335,22 +376,43 @@ class AudioBookConverter(QtWidgets.QWidget):
             "Slow Motion": "This... is... a... slow... motion... preview..."
         }.get(effect, "Preview")
         
-        self.engine.say(preview_text)
-        self.engine.runAndWait()
+        # Play instantly if these settings were auditioned before
+        clip = self.previewer.cached_clip(settings, preview_text)
+        if clip:
+            play_clip(clip)
+            return
         
-        # Restore original properties
-        self.engine.setProperty('voice', old_voice)
-        self.engine.setProperty('rate', old_rate)
-        self.engine.setProperty('volume', old_volume)
-        if pitch != 100:
-            self.engine.setProperty('pitch', 1.0)
+        # Otherwise render on a separate engine without blocking the window
+        self.preview_button.setEnabled(False)
+        self.status_label.setText("Rendering preview...")
+        threading.Thread(
+            target=self._render_preview_thread,
+            args=(settings, preview_text),
+            daemon=True
+        ).start()
+
+    def _render_preview_thread(self, settings, preview_text):
+        try:
+            self.preview_ready.emit(self.previewer.render(settings, preview_text))
+        except Exception as e:
+            self.preview_failed.emit(str(e))
+
+    def on_preview_ready(self, clip):
+        self.preview_button.setEnabled(True)
+        self.status_label.setText("Ready")
+        play_clip(clip)
+
+    def on_preview_failed(self, message):
+        self.preview_button.setEnabled(True)
+        self.status_label.setText(f"Preview error: {message}")
 
     def play_text(self):
         if not self.engine or self.is_playing:
             return
             
-        text = self.text_area.toPlainText().strip()
-        if not text:
+        # Unstripped, so paragraph offsets match the text view for highlighting
+        text = self.text_area.toPlainText()
+        if not text.strip():
             QMessageBox.warning(self, "Warning", "Please enter some text to play.")
             return
             
@@ -359,76 +421,74 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.stop_play_button.setEnabled(True)
         self.status_label.setText("Playing text...")
         
+        # Snapshot settings here; the worker never touches widgets
+        voice_config = self.current_voice_config()
+        
         # Start playing in a separate thread
-        threading.Thread(
-            target=self._play_text_thread,
-            args=(text,),
-            daemon=True
-        ).start()
+        self.text_area.set_read_along(True)
+        self.progress.report(0, "Playing text...")
+        self.progress.start()
+        self.task = start_worker(
+            self, self._play_text_thread, text, voice_config,
+            on_finished=self.on_playback_finished,
+            on_failed=self.on_task_failed
+        )
 
-    def _play_text_thread(self, text):
-        try:
-            # Set voice properties
-            voice_index = self.voice_combo.currentData()
-            voices = self.engine.getProperty('voices')
-            self.engine.setProperty('voice', voices[voice_index].id)
-            self.engine.setProperty('rate', self.rate_slider.value())
-            self.engine.setProperty('volume', self.volume_slider.value()/100)
-            
-            # Apply pitch effect
-            pitch = self.pitch_slider.value()
-            if pitch != 100:
-                self.engine.setProperty('pitch', pitch/100)
+    def _play_text_thread(self, text, voice_config):
+        # Set voice properties
+        self.apply_voice_config(voice_config)
+        
+        # Split text into paragraphs
+        for start, end in paragraph_spans(text):
+            if not self.is_playing:
+                return
+                
+            paragraph = text[start:end]
+            self.progress.report_span(start, end)
             
-            # Split text into paragraphs
-            paragraphs = re.split(r'\n\s*\n', text)
+            # Apply voice effect if selected
+            if voice_config['effect'] != "None":
+                paragraph = self.apply_voice_effect(paragraph, voice_config['effect'])
             
-            for paragraph in paragraphs:
-                if not self.is_playing:
-                    break
-                    
-                paragraph = paragraph.strip()
-                if not paragraph:
-                    continue
-                
-                # Apply voice effect if selected
-                effect = self.effect_combo.currentText()
-                if effect != "None":
-                    paragraph = self.apply_voice_effect(paragraph, effect)
-                
-                # Speak the paragraph
-                self.engine.say(paragraph)
-                self.engine.runAndWait()
-                
-        except Exception as e:
-            QtCore.QMetaObject.invokeMethod(
-                self.status_label,
-                "setText",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(str, f"Error: {str(e)}")
-            )
+            # Speak the paragraph
+            self.engine.say(paragraph)
+            self.engine.runAndWait()
         
-        finally:
-            self.is_playing = False
-            QtCore.QMetaObject.invokeMethod(
-                self.play_button,
-                "setEnabled",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(bool, True)
-            )
-            QtCore.QMetaObject.invokeMethod(
-                self.stop_play_button,
-                "setEnabled",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(bool, False)
-            )
-            if self.is_playing:
-                QtCore.QMetaObject.invokeMethod(
-                    self.status_label,
-                    "setText",
-                    QtCore.Qt.QueuedConnection,
-                    QtCore.Q_ARG(str, "Playback complete")
-                )
+        self.progress.report(message="Playback complete")
+
+    def on_playback_finished(self, result):
+        self.task = None
+        self.progress.stop()
+        self.text_area.set_read_along(False)
+        self.is_playing = False
+        self.play_button.setEnabled(True)
+        self.stop_play_button.setEnabled(False)
+
+    def on_task_failed(self, message):
+        self.progress.report(message=f"Error: {message}")
+        self.progress.flush()
+
+    def show_progress(self, value, message):
+        self.progress_bar.setValue(value)
+        if message:
+            self.status_label.setText(message)
+
+    def current_voice_config(self):
+        return {
+            'voice': self.voice_combo.currentData(),
+            'rate': self.rate_slider.value(),
+            'volume': self.volume_slider.value()/100,
+            'pitch': self.pitch_slider.value()/100,
+            'effect': self.effect_combo.currentText()
+        }
+
+    def apply_voice_config(self, voice_config):
+        if voice_config['voice']:
+            self.engine.setProperty('voice', voice_config['voice'])
+        self.engine.setProperty('rate', voice_config['rate'])
+        self.engine.setProperty('volume', voice_config['volume'])
+        if voice_config['pitch'] != 1.0:
+            self.engine.setProperty('pitch', voice_config['pitch'])
 
     def apply_voice_effect(self, text, effect):
         """Modify text to simulate different voice effects"""
@@ -447,14 +507,15 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.is_playing = False
         if self.engine:
             self.engine.stop()
-        self.status_label.setText("Playback stopped")
+        self.progress.report(message="Playback stopped")
+        self.progress.flush()
 
     def convert_to_audio(self):
         if self.is_converting:
             return
             
-        text = self.text_area.toPlainText().strip()
-        if not text:
+        text = self.text_area.toPlainText()
+        if not text.strip():
             QMessageBox.warning(self, "Warning", "Please enter some text to convert.")
             return
             
@@ -471,19 +532,12 @@ class AudioBookConverter(QtWidgets.QWidget):
                 return
 
         # Get voice settings
-        voice_index = self.voice_combo.currentData()
-        voices = self.engine.getProperty('voices')
-        voice_config = {
-            'voice': voices[voice_index].id,
-            'rate': self.rate_slider.value(),
-            'volume': self.volume_slider.value()/100,
-            'pitch': self.pitch_slider.value()/100,
-            'effect': self.effect_combo.currentText()
-        }
+        voice_config = self.current_voice_config()
 
         # Get pacing settings
         pause_duration = self.pause_duration_entry.value()
         words_per_minute = self.words_per_minute.value()
+        batch_size = self.batch_size_entry.value()
         
         # Get output format
         output_format = self.format_combo.currentText()
@@ -504,65 +558,78 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.status_label.setText("Converting...")
         
         # Start conversion in a separate thread
-        threading.Thread(
-            target=self.advanced_text_to_audio_book,
-            args=(text, save_dir, voice_config, pause_duration, words_per_minute, output_format, filename),
-            daemon=True
-        ).start()
+        self.text_area.set_read_along(True)
+        self.progress.report(0, "Converting...")
+        self.progress.start()
+        self.task = start_worker(
+            self, self.advanced_text_to_audio_book,
+            text, save_dir, voice_config, pause_duration, words_per_minute, output_format, filename, batch_size,
+            on_finished=self.on_conversion_finished,
+            on_failed=self.on_task_failed
+        )
+
+    def on_conversion_finished(self, result):
+        self.task = None
+        self.progress.stop()
+        self.text_area.set_read_along(False)
+        self.is_converting = False
+        self.convert_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
 
     def stop_conversion(self):
         self.is_converting = False
         if self.engine:
             self.engine.stop()
-        self.status_label.setText("Conversion stopped")
+        self.progress.report(message="Conversion stopped")
+        self.progress.flush()
 
-    def advanced_text_to_audio_book(self, text, output_dir, voice_config, pause_duration, words_per_minute, output_format, filename):
+    def advanced_text_to_audio_book(self, text, output_dir, voice_config, pause_duration, words_per_minute, output_format, filename, batch_size=DEFAULT_WINDOW):
+        encoder = None
+        spool = None
         try:
             # Set voice properties
-            self.engine.setProperty('voice', voice_config['voice'])
-            self.engine.setProperty('rate', voice_config['rate'])
-            self.engine.setProperty('volume', voice_config['volume'])
-            if voice_config['pitch'] != 1.0:
-                self.engine.setProperty('pitch', voice_config['pitch'])
+            self.apply_voice_config(voice_config)
             
             # Split text into paragraphs
-            paragraphs = re.split(r'\n\s*\n', text)
-            total_paragraphs = len(paragraphs)
+            spans = list(paragraph_spans(text))
+            total_paragraphs = len(spans)
             
             # Prepare for saving to file if needed
             if output_format in ["Save as MP3", "Both"]:
                 output_file = os.path.join(output_dir, f"{filename}.mp3")
-                # Create a temporary directory for individual MP3 files
-                temp_dir = os.path.join(output_dir, "temp")
-                os.makedirs(temp_dir, exist_ok=True)
-                temp_files = []
+                # Per-paragraph WAV files go to RAM or local scratch, not the output dir
+                spool = ChunkSpool()
             
-            for i, paragraph in enumerate(paragraphs):
-                if not self.is_converting:
-                    break
-                    
-                paragraph = paragraph.strip()
-                if not paragraph:
-                    continue
-                
-                # Apply voice effect if selected
+            # Apply the voice effect up front
+            items = []
+            for i, (start, end) in enumerate(spans):
+                paragraph = text[start:end]
                 if voice_config['effect'] != "None":
                     paragraph = self.apply_voice_effect(paragraph, voice_config['effect'])
+                items.append((i, paragraph))
+            
+            # Render paragraph files in batches, one engine run loop per batch
+            if spool is not None:
+                synthesizer = BatchSynthesizer(
+                    self.engine,
+                    window=batch_size,
+                    should_stop=lambda: not self.is_converting
+                )
+                rendered = synthesizer.synthesize(
+                    (i, paragraph, spool.path(f"para_{i}.wav"))
+                    for i, paragraph in items
+                )
+            else:
+                rendered = ((i, paragraph, None) for i, paragraph in items)
+            
+            for i, paragraph, temp_file in rendered:
+                if not self.is_converting:
+                    break
                 
                 # Update progress
                 progress = int((i + 1) / total_paragraphs * 100)
-                QtCore.QMetaObject.invokeMethod(
-                    self.progress_bar, 
-                    "setValue", 
-                    QtCore.Qt.QueuedConnection, 
-                    QtCore.Q_ARG(int, progress)
-                )
-                QtCore.QMetaObject.invokeMethod(
-                    self.status_label,
-                    "setText",
-                    QtCore.Qt.QueuedConnection,
-                    QtCore.Q_ARG(str, f"Processing paragraph {i+1} of {total_paragraphs}")
-                )
+                self.progress.report(progress, f"Processing paragraph {i+1} of {total_paragraphs}")
+                self.progress.report_span(*spans[i])
                 
                 if output_format in ["Play Only", "Both"]:
                     # Speak the paragraph
@@ -573,66 +640,33 @@ class AudioBookConverter(QtWidgets.QWidget):
                     if i < total_paragraphs - 1:
                         time.sleep(pause_duration)
                 
-                if output_format in ["Save as MP3", "Both"]:
-                    # Save paragraph to temporary file
-                    temp_file = os.path.join(temp_dir, f"para_{i}.mp3")
-                    self.engine.save_to_file(paragraph, temp_file)
-                    self.engine.runAndWait()
-                    temp_files.append(temp_file)
-            
-            if output_format in ["Save as MP3", "Both"] and self.is_converting and temp_files:
-                # Combine all temporary files into one MP3
-                self.status_label.setText("Combining audio files...")
-                combined = AudioSegment.empty()
-                for temp_file in temp_files:
-                    sound = AudioSegment.from_mp3(temp_file)
-                    combined += sound
+                if temp_file is not None:
+                    # Decode in-process and stream into the single encoder
+                    sound = self.codec.decode(temp_file)
+                    spool.release(temp_file)
+                    if encoder is None:
+                        encoder = self.codec.open_encoder(
+                            output_file, sound.sample_rate, sound.channels, sound.sample_width
+                        )
+                    encoder.write(sound)
                     # Add pause between paragraphs in the output file
-                    combined += AudioSegment.silent(duration=pause_duration*1000)  # pydub uses milliseconds
-                    os.remove(temp_file)
-                
-                # Export the combined audio
-                combined.export(output_file, format="mp3")
-                os.rmdir(temp_dir)
-                
-                QtCore.QMetaObject.invokeMethod(
-                    self.status_label,
-                    "setText",
-                    QtCore.Qt.QueuedConnection,
-                    QtCore.Q_ARG(str, f"Saved to {output_file}")
-                )
+                    encoder.write(silence(pause_duration * 1000, *sound.format))
             
-            if self.is_converting:
-                QtCore.QMetaObject.invokeMethod(
-                    self.status_label,
-                    "setText",
-                    QtCore.Qt.QueuedConnection,
-                    QtCore.Q_ARG(str, "Conversion complete!")
-                )
-        
-        except Exception as e:
-            QtCore.QMetaObject.invokeMethod(
-                self.status_label,
-                "setText",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(str, f"Error: {str(e)}")
-            )
+            if encoder is not None and self.is_converting:
+                # Flush the encoder pipe and wait for the final MP3
+                self.progress.report(message="Finishing MP3 encoding...")
+                encoder.close()
+                encoder = None
+                self.progress.report(100, f"Conversion complete! Saved to {output_file}")
+            elif self.is_converting:
+                self.progress.report(100, "Conversion complete!")
         
         finally:
-            # Re-enable controls
-            QtCore.QMetaObject.invokeMethod(
-                self.convert_button,
-                "setEnabled",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(bool, True)
-            )
-            QtCore.QMetaObject.invokeMethod(
-                self.stop_button,
-                "setEnabled",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(bool, False)
-            )
-            self.is_converting = False
+            # Never leave an orphaned encoder process or spooled chunks behind
+            if encoder is not None:
+                encoder.abort()
+            if spool is not None:
+                spool.close()
 
 if __name__ == "__main__":
     import sys
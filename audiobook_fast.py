@@ -1,29 +1,73 @@
 import os
-import re
 import threading
-import time
-import pyttsx3
 from PyQt5 import QtWidgets, QtCore
-from PyQt5.QtWidgets import QFileDialog, QProgressBar, QTextEdit, QMessageBox
+from PyQt5.QtWidgets import QFileDialog, QProgressBar, QMessageBox
+from text_view import LargeTextView
+from synthesis import DEFAULT_WINDOW
+from chunking import DEFAULT_MAX_CHARS
+from conversion import (ConversionJob, ConversionSettings, OUTPUT_FORMATS, chunk_spans,
+                        speak_chunks)
+from dialogue import NARRATOR, speakers
+from tts_backends import ESPEAK_NG, PYTTSX3, EspeakBackend, available_backends
+from qt_workers import ProgressCoalescer, start_worker
+import voice_catalog
+from preview import PreviewRenderer, play_clip
+from queue_panel import QueuePanel
 
 class AudioBookConverter(QtWidgets.QWidget):
+    engine_ready = QtCore.pyqtSignal(object, list)
+    engine_failed = QtCore.pyqtSignal(str)
+    preview_ready = QtCore.pyqtSignal(str)
+    preview_failed = QtCore.pyqtSignal(str)
+    
     def __init__(self):
         super().__init__()
         self.engine = None
+        self.engine_voices = None
+        self.cast = {}  # speaker -> voice id for [Speaker] tagged dialogue
+        self.previewer = PreviewRenderer()
+        self.queue_panel = None
+        self.progress = ProgressCoalescer(parent=self)
+        self.task = None
         self.is_playing = False
         self.is_converting = False
         self.stop_requested = False
-        self.init_engine()
         self.initUI()
         self.setup_connections()
+        self.init_engine()
         
     def init_engine(self):
+        # Start the engine in the background so the window shows immediately
+        self.set_engine_controls_enabled(False)
+        self.status_label.setText("Loading speech engine...")
+        threading.Thread(target=self._init_engine_thread, daemon=True).start()
+    
+    def _init_engine_thread(self):
         try:
-            self.engine = pyttsx3.init()
-            self.engine.setProperty('rate', 150)
-            self.engine.setProperty('volume', 0.9)
+            engine, voices = voice_catalog.start_engine()
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not initialize TTS engine: {str(e)}")
+            self.engine_failed.emit(str(e))
+            return
+        self.engine_ready.emit(engine, voices)
+    
+    def on_engine_ready(self, engine, voices):
+        self.engine = engine
+        self.engine.setProperty('rate', self.rate_slider.value())
+        self.engine.setProperty('volume', self.volume_slider.value()/100)
+        self.engine_voices = voices
+        if self.backend_combo.currentText() == PYTTSX3:
+            self.populate_voices(voices)
+        self.set_engine_controls_enabled(True)
+        self.status_label.setText("Ready")
+    
+    def on_engine_failed(self, message):
+        self.status_label.setText("Speech engine unavailable")
+        QMessageBox.critical(self, "Error", f"Could not initialize TTS engine: {message}")
+    
+    def set_engine_controls_enabled(self, enabled):
+        self.play_button.setEnabled(enabled)
+        self.convert_button.setEnabled(enabled)
+        self.preview_button.setEnabled(enabled)
     
     def initUI(self):
         self.setWindowTitle("⚡ Turbo Audiobook Converter")
@@ -74,12 +118,14 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.play_button = QtWidgets.QPushButton("▶ Play Text")
         self.stop_play_button = QtWidgets.QPushButton("■ Stop Playing")
         self.clear_button = QtWidgets.QPushButton("Clear Text")
+        self.open_button = QtWidgets.QPushButton("Open File...")
         controls.addWidget(self.play_button)
         controls.addWidget(self.stop_play_button)
         controls.addWidget(self.clear_button)
+        controls.addWidget(self.open_button)
         
-        # Text area
-        self.text_area = QTextEdit()
+        # Text area (pages very large documents, highlights spoken text)
+        self.text_area = LargeTextView()
         self.text_area.setPlaceholderText("Enter or paste your text here...")
         
         layout.addLayout(controls)
@@ -123,6 +169,19 @@ class AudioBookConverter(QtWidgets.QWidget):
         layout.addWidget(self.pitch_slider, 3, 1)
         layout.addWidget(self.pitch_label, 3, 2)
         
+        # Speech backend used to render audio files
+        layout.addWidget(QtWidgets.QLabel("Engine:"), 4, 0)
+        self.backend_combo = QtWidgets.QComboBox()
+        self.backend_combo.addItems(available_backends())
+        layout.addWidget(self.backend_combo, 4, 1, 1, 2)
+        
+        # Voices for [Speaker] tagged dialogue
+        layout.addWidget(QtWidgets.QLabel("Cast:"), 5, 0)
+        self.cast_button = QtWidgets.QPushButton("Cast...")
+        self.cast_label = QtWidgets.QLabel("Single voice")
+        layout.addWidget(self.cast_button, 5, 1)
+        layout.addWidget(self.cast_label, 5, 2)
+        
         self.voice_group.setLayout(layout)
     
     def setup_pacing_group(self):
@@ -142,6 +201,42 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.words_per_minute.setValue(180)
         layout.addWidget(self.words_per_minute, 1, 1)
         
+        # Chunks queued per engine run loop when saving
+        layout.addWidget(QtWidgets.QLabel("Batch size:"), 2, 0)
+        self.batch_size = QtWidgets.QSpinBox()
+        self.batch_size.setRange(1, 128)
+        self.batch_size.setValue(DEFAULT_WINDOW)
+        layout.addWidget(self.batch_size, 2, 1)
+        
+        # Chunk size policy (characters, sentence-aligned)
+        layout.addWidget(QtWidgets.QLabel("Chunk min/max:"), 3, 0)
+        chunk_layout = QtWidgets.QHBoxLayout()
+        self.min_chunk_chars = QtWidgets.QSpinBox()
+        self.min_chunk_chars.setRange(0, 5000)
+        self.min_chunk_chars.setValue(0)
+        self.max_chunk_chars = QtWidgets.QSpinBox()
+        self.max_chunk_chars.setRange(50, 5000)
+        self.max_chunk_chars.setValue(DEFAULT_MAX_CHARS)
+        chunk_layout.addWidget(self.min_chunk_chars)
+        chunk_layout.addWidget(self.max_chunk_chars)
+        layout.addLayout(chunk_layout, 3, 1)
+        
+        self.autotune_chunks = QtWidgets.QCheckBox("Auto-tune chunk size")
+        layout.addWidget(self.autotune_chunks, 4, 0, 1, 2)
+        
+        self.clean_text = QtWidgets.QCheckBox("Strip page headers and repair line wraps")
+        self.clean_text.setToolTip(
+            "For text from scans and PDFs: skip running headers, footers and page numbers, "
+            "and join hyphenated and hard-wrapped lines"
+        )
+        layout.addWidget(self.clean_text, 5, 0, 1, 2)
+        
+        self.normalize_text = QtWidgets.QCheckBox("Read numbers, dates and abbreviations as words")
+        self.normalize_text.setToolTip(
+            "Expand \"$12.50\", \"March 5, 2024\", \"Chapter XII\" and \"Dr.\" before synthesis"
+        )
+        layout.addWidget(self.normalize_text, 6, 0, 1, 2)
+        
         self.pacing_group.setLayout(layout)
     
     def setup_output_group(self):
@@ -161,7 +256,7 @@ class AudioBookConverter(QtWidgets.QWidget):
         # Output format
         layout.addWidget(QtWidgets.QLabel("Format:"), 1, 0)
         self.format_combo = QtWidgets.QComboBox()
-        self.format_combo.addItems(["Play Only", "Save as MP3", "Both"])
+        self.format_combo.addItems(OUTPUT_FORMATS)
         layout.addWidget(self.format_combo, 1, 1)
         
         # Filename
@@ -169,6 +264,63 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.filename = QtWidgets.QLineEdit("audiobook")
         layout.addWidget(self.filename, 2, 1)
         
+        # Subtitles derived from the text/audio offset index
+        layout.addWidget(QtWidgets.QLabel("Subtitles:"), 3, 0)
+        subtitle_layout = QtWidgets.QHBoxLayout()
+        self.write_srt = QtWidgets.QCheckBox("SRT")
+        self.write_lrc = QtWidgets.QCheckBox("LRC")
+        subtitle_layout.addWidget(self.write_srt)
+        subtitle_layout.addWidget(self.write_lrc)
+        layout.addLayout(subtitle_layout, 3, 1)
+
+        self.incremental_update = QtWidgets.QCheckBox("Update existing (re-render changed text only)")
+        self.incremental_update.setToolTip(
+            "Splice re-rendered chunks into the previously saved MP3 instead of "
+            "converting the whole text again"
+        )
+        layout.addWidget(self.incremental_update, 4, 0, 1, 2)
+
+        # Pronunciation overrides applied to every chunk before synthesis
+        layout.addWidget(QtWidgets.QLabel("Lexicon:"), 5, 0)
+        self.lexicon_file = QtWidgets.QLineEdit()
+        self.lexicon_file.setPlaceholderText("term = spoken form, one per line")
+        self.lexicon_button = QtWidgets.QPushButton("...")
+        self.lexicon_button.setFixedWidth(30)
+        lexicon_layout = QtWidgets.QHBoxLayout()
+        lexicon_layout.addWidget(self.lexicon_file)
+        lexicon_layout.addWidget(self.lexicon_button)
+        layout.addLayout(lexicon_layout, 5, 1)
+
+        self.profile_conversion = QtWidgets.QCheckBox("Profile conversion")
+        self.profile_conversion.setToolTip(
+            "Write a flamegraph (.profile.folded) and a slowest-chunks report "
+            "(.profile.txt) next to the MP3"
+        )
+        layout.addWidget(self.profile_conversion, 6, 0, 1, 2)
+
+        # Memory the job keeps under by throttling chunks in flight
+        layout.addWidget(QtWidgets.QLabel("Memory budget:"), 7, 0)
+        self.memory_budget = QtWidgets.QSpinBox()
+        self.memory_budget.setRange(0, 65536)
+        self.memory_budget.setSingleStep(64)
+        self.memory_budget.setSuffix(" MB")
+        self.memory_budget.setSpecialValueText("Unlimited")
+        layout.addWidget(self.memory_budget, 7, 1)
+
+        self.hls_stream = QtWidgets.QCheckBox("Stream HLS while converting")
+        self.hls_stream.setToolTip(
+            "Write <filename>_hls/index.m3u8 and audio segments as chunks are rendered, "
+            "so a player can start before the book is finished (serve with hls.py serve)"
+        )
+        layout.addWidget(self.hls_stream, 8, 0, 1, 2)
+
+        # Settings file for watch_folder.py
+        self.save_settings_button = QtWidgets.QPushButton("Save settings...")
+        self.save_settings_button.setToolTip(
+            "Save these settings as JSON for the watch-folder daemon (watch_folder.py)"
+        )
+        layout.addWidget(self.save_settings_button, 9, 0, 1, 2)
+        
         self.output_group.setLayout(layout)
     
     def setup_control_buttons(self):
@@ -177,10 +329,13 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.convert_button = QtWidgets.QPushButton("🔊 Convert")
         self.stop_button = QtWidgets.QPushButton("🛑 Stop")
         self.preview_button = QtWidgets.QPushButton("🎧 Preview")
+        self.queue_button = QtWidgets.QPushButton("📚 Queue")
+        self.queue_button.setToolTip("Convert several documents in the background")
         
         self.control_buttons.addWidget(self.convert_button)
         self.control_buttons.addWidget(self.stop_button)
         self.control_buttons.addWidget(self.preview_button)
+        self.control_buttons.addWidget(self.queue_button)
     
     def setup_progress_status(self):
         self.progress_bar = QProgressBar()
@@ -190,19 +345,35 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.status_label.setAlignment(QtCore.Qt.AlignCenter)
     
     def setup_connections(self):
+        # Engine start-up
+        self.engine_ready.connect(self.on_engine_ready)
+        self.engine_failed.connect(self.on_engine_failed)
+        self.preview_ready.connect(self.on_preview_ready)
+        self.preview_failed.connect(self.on_preview_failed)
+        
+        # Coalesced progress and read-along highlighting from worker threads
+        self.progress.updated.connect(self.show_progress)
+        self.progress.highlighted.connect(self.text_area.highlight)
+        
         # Slider connections
         self.rate_slider.valueChanged.connect(self.update_rate_label)
         self.volume_slider.valueChanged.connect(self.update_volume_label)
         self.pitch_slider.valueChanged.connect(self.update_pitch_label)
+        self.backend_combo.currentTextChanged.connect(self.on_backend_changed)
+        self.cast_button.clicked.connect(self.edit_cast)
         
         # Button connections
         self.play_button.clicked.connect(self.play_text)
         self.stop_play_button.clicked.connect(self.stop_playing)
         self.clear_button.clicked.connect(self.clear_text)
+        self.open_button.clicked.connect(self.open_text_file)
         self.browse_button.clicked.connect(self.browse_directory)
+        self.lexicon_button.clicked.connect(self.browse_lexicon)
+        self.save_settings_button.clicked.connect(self.save_settings)
         self.convert_button.clicked.connect(self.start_conversion)
         self.stop_button.clicked.connect(self.stop_conversion)
         self.preview_button.clicked.connect(self.preview_voice)
+        self.queue_button.clicked.connect(self.show_queue)
     
     def apply_styles(self):
         self.setStyleSheet("""
@@ -222,7 +393,7 @@ class AudioBookConverter(QtWidgets.QWidget):
                 left: 10px;
                 padding: 0 5px;
             }
-            QTextEdit, QLineEdit, QComboBox {
+            QTextEdit, QPlainTextEdit, QLineEdit, QComboBox {
                 background-color: #111111;
                 color: #FFFF00;
                 border: 1px solid #333300;
@@ -280,14 +451,29 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.stop_play_button.setEnabled(False)
         self.stop_button.setEnabled(False)
     
-    def populate_voices(self):
-        if not self.engine:
-            return
-            
+    def populate_voices(self, voices=None):
+        # Cached catalog until the engine reports its own list
+        if voices is None:
+            voices = voice_catalog.load_voices()
+        
+        selected = self.voice_combo.currentData()
         self.voice_combo.clear()
-        voices = self.engine.getProperty('voices')
-        for i, voice in enumerate(voices):
-            self.voice_combo.addItem(f"{voice.name} ({voice.gender})", i)
+        for voice in voices:
+            self.voice_combo.addItem(f"{voice['name']} ({voice['gender']})", voice['id'])
+        index = self.voice_combo.findData(selected)
+        if index >= 0:
+            self.voice_combo.setCurrentIndex(index)
+    
+    def on_backend_changed(self, name):
+        # Each backend names its voices differently
+        voices = self.engine_voices
+        if name == ESPEAK_NG:
+            try:
+                voices = EspeakBackend().list_voices()
+            except Exception as e:
+                self.show_message(f"Cannot list espeak-ng voices: {str(e)}", "error")
+                return
+        self.populate_voices(voices)
     
     def update_rate_label(self, value):
         self.rate_label.setText(f"{value} wpm")
@@ -310,49 +496,129 @@ class AudioBookConverter(QtWidgets.QWidget):
     def clear_text(self):
         self.text_area.clear()
     
+    def open_text_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Text File", "", "Text files (*.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                self.text_area.setPlainText(f.read())
+        except OSError as e:
+            self.show_message(f"Cannot open file: {str(e)}", "error")
+    
     def browse_directory(self):
         directory = QFileDialog.getExistingDirectory(self, "Select Output Directory")
         if directory:
             self.output_dir.setText(directory)
     
+    def edit_cast(self):
+        """Pick a voice for each speaker tagged in the text"""
+        names = [NARRATOR.capitalize()] + speakers(self.text_area.toPlainText())
+        if len(names) == 1:
+            self.show_message("Tag dialogue paragraphs with a speaker, e.g. "
+                              "\"[Alice] Who's there?\", to give them their own voices.", "info")
+            return
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Cast")
+        form = QtWidgets.QFormLayout(dialog)
+        combos = {}
+        for name in names:
+            combo = QtWidgets.QComboBox()
+            combo.addItem("(voice above)" if name.lower() == NARRATOR else "(narrator)", None)
+            for row in range(self.voice_combo.count()):
+                combo.addItem(self.voice_combo.itemText(row), self.voice_combo.itemData(row))
+            current = self.cast.get(name.lower())
+            if current is not None:
+                combo.setCurrentIndex(max(0, combo.findData(current)))
+            form.addRow(f"{name}:", combo)
+            combos[name.lower()] = combo
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+        if dialog.exec_() != QtWidgets.QDialog.Accepted:
+            return
+        self.cast = {name: combo.currentData() for name, combo in combos.items()
+                     if combo.currentData() is not None}
+        self.cast_label.setText(f"{len(self.cast)} voices cast" if self.cast else "Single voice")
+    
+    def browse_lexicon(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Lexicon", "",
+                                              "Lexicon files (*.txt *.lex);;All files (*)")
+        if path:
+            self.lexicon_file.setText(path)
+    
+    def save_settings(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Settings", "settings.json",
+                                              "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            self.conversion_settings().save(path)
+        except OSError as e:
+            self.show_message(f"Cannot save settings: {str(e)}", "error")
+            return
+        self.update_status(f"Settings saved to {path}")
+    
+    def show_queue(self):
+        if self.queue_panel is None:
+            self.queue_panel = QueuePanel(self.conversion_settings, parent=self)
+            self.queue_panel.setStyleSheet(self.styleSheet())
+        self.queue_panel.show()
+        self.queue_panel.raise_()
+    
+    def closeEvent(self, event):
+        if self.queue_panel is not None:
+            self.queue_panel.queue.shutdown()
+        super().closeEvent(event)
+    
     def preview_voice(self):
-        if not self.engine:
+        settings = {
+            'voice': self.voice_combo.currentData(),
+            'rate': self.rate_slider.value(),
+            'volume': self.volume_slider.value()/100,
+            'pitch': self.pitch_slider.value()/100
+        }
+        text = "This is a preview of the current voice settings."
+        
+        # Play instantly if these settings were auditioned before
+        clip = self.previewer.cached_clip(settings, text)
+        if clip:
+            play_clip(clip)
             return
-            
-        # Save current settings
-        old_voice = self.engine.getProperty('voice')
-        old_rate = self.engine.getProperty('rate')
-        old_volume = self.engine.getProperty('volume')
-        old_pitch = self.engine.getProperty('pitch') if hasattr(self.engine, 'getProperty') else None
-        
-        # Apply selected settings
-        voice_idx = self.voice_combo.currentData()
-        voices = self.engine.getProperty('voices')
-        self.engine.setProperty('voice', voices[voice_idx].id)
-        self.engine.setProperty('rate', self.rate_slider.value())
-        self.engine.setProperty('volume', self.volume_slider.value()/100)
-        
-        # Apply pitch if available
-        if old_pitch is not None:
-            self.engine.setProperty('pitch', self.pitch_slider.value()/100)
-        
-        # Speak preview
-        self.engine.say("This is a preview of the current voice settings.")
-        self.engine.runAndWait()
         
-        # Restore original settings
-        self.engine.setProperty('voice', old_voice)
-        self.engine.setProperty('rate', old_rate)
-        self.engine.setProperty('volume', old_volume)
-        if old_pitch is not None:
-            self.engine.setProperty('pitch', old_pitch)
+        # Otherwise render on a separate engine without blocking the window
+        self.preview_button.setEnabled(False)
+        self.status_label.setText("Rendering preview...")
+        threading.Thread(
+            target=self._render_preview_thread,
+            args=(settings, text),
+            daemon=True
+        ).start()
+    
+    def _render_preview_thread(self, settings, text):
+        try:
+            self.preview_ready.emit(self.previewer.render(settings, text))
+        except Exception as e:
+            self.preview_failed.emit(str(e))
+    
+    def on_preview_ready(self, clip):
+        self.preview_button.setEnabled(True)
+        self.status_label.setText("Ready")
+        play_clip(clip)
+    
+    def on_preview_failed(self, message):
+        self.preview_button.setEnabled(True)
+        self.status_label.setText(f"Preview error: {message}")
     
     def play_text(self):
         if self.is_playing or not self.engine:
             return
             
-        text = self.text_area.toPlainText().strip()
-        if not text:
+        # Unstripped, so chunk offsets match the text view for highlighting
+        text = self.text_area.toPlainText()
+        if not text.strip():
             self.show_message("Please enter some text to play.", "warning")
             return
             
@@ -361,51 +627,26 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.toggle_play_controls(True)
         self.status_label.setText("Playing...")
         
-        # Start playback in thread
-        threading.Thread(
-            target=self._play_text_thread,
-            args=(text,),
-            daemon=True
-        ).start()
+        # Snapshot settings here; the worker never touches widgets
+        settings = self.conversion_settings()
+        spans = list(chunk_spans(text, settings))
+        self.text_area.set_read_along(True)
+        self.progress.report(0, "Playing...")
+        self.progress.start()
+        self.task = start_worker(
+            self, speak_chunks, self.engine, text, spans, settings,
+            self.progress.report, lambda: self.stop_requested,
+            self.progress.report_span,
+            on_finished=self.on_playback_finished,
+            on_failed=self.on_task_failed
+        )
     
-    def _play_text_thread(self, text):
-        try:
-            # Configure voice
-            voice_idx = self.voice_combo.currentData()
-            voices = self.engine.getProperty('voices')
-            self.engine.setProperty('voice', voices[voice_idx].id)
-            self.engine.setProperty('rate', self.rate_slider.value())
-            self.engine.setProperty('volume', self.volume_slider.value()/100)
-            
-            # Split into chunks for progress tracking
-            chunks = self._split_text(text)
-            total_chunks = len(chunks)
-            
-            for i, chunk in enumerate(chunks):
-                if self.stop_requested:
-                    break
-                    
-                # Update progress
-                progress = int((i + 1) / total_chunks * 100)
-                self.update_progress(progress, f"Playing chunk {i+1}/{total_chunks}")
-                
-                # Speak the chunk
-                self.engine.say(chunk)
-                self.engine.runAndWait()
-                
-                # Short pause between chunks
-                if i < total_chunks - 1 and not self.stop_requested:
-                    time.sleep(0.2)
-            
-            if not self.stop_requested:
-                self.update_status("Playback complete")
-        
-        except Exception as e:
-            self.update_status(f"Error: {str(e)}")
-        
-        finally:
-            self.is_playing = False
-            self.toggle_play_controls(False)
+    def on_playback_finished(self, result):
+        self.task = None
+        self.progress.stop()
+        self.text_area.set_read_along(False)
+        self.is_playing = False
+        self.toggle_play_controls(False)
     
     def stop_playing(self):
         self.stop_requested = True
@@ -417,8 +658,8 @@ class AudioBookConverter(QtWidgets.QWidget):
         if self.is_converting or not self.engine:
             return
             
-        text = self.text_area.toPlainText().strip()
-        if not text:
+        text = self.text_area.toPlainText()
+        if not text.strip():
             self.show_message("Please enter some text to convert.", "warning")
             return
             
@@ -435,107 +676,31 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.toggle_convert_controls(True)
         self.status_label.setText("Converting...")
         
-        # Start conversion in thread
-        threading.Thread(
-            target=self._convert_text_thread,
-            args=(text, output_dir),
-            daemon=True
-        ).start()
+        # Snapshot settings here; the worker never touches widgets
+        job = ConversionJob(
+            self.engine, text, self.conversion_settings(output_dir),
+            progress=self.progress.report,
+            should_stop=lambda: self.stop_requested,
+            highlight=self.progress.report_span
+        )
+        self.text_area.set_read_along(True)
+        self.progress.report(0, "Converting...")
+        self.progress.start()
+        self.task = start_worker(
+            self, job.run,
+            on_finished=self.on_conversion_finished,
+            on_failed=self.on_task_failed
+        )
     
-    def _convert_text_thread(self, text, output_dir):
-        try:
-            # Configure voice
-            voice_idx = self.voice_combo.currentData()
-            voices = self.engine.getProperty('voices')
-            self.engine.setProperty('voice', voices[voice_idx].id)
-            self.engine.setProperty('rate', self.rate_slider.value())
-            self.engine.setProperty('volume', self.volume_slider.value()/100)
-            
-            # Get output settings
-            output_format = self.format_combo.currentText()
-            filename = self.filename.text().strip() or "audiobook"
-            output_file = os.path.join(output_dir, f"{filename}.mp3")
-            
-            # Split text for processing
-            chunks = self._split_text(text)
-            total_chunks = len(chunks)
-            
-            # Temporary storage for MP3 chunks
-            temp_files = []
-            temp_dir = os.path.join(output_dir, "temp_audio")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Create a single output file writer
-            if output_format in ["Save as MP3", "Both"]:
-                try:
-                    from pydub import AudioSegment
-                    combined = AudioSegment.empty()
-                    save_to_file = True
-                except ImportError:
-                    self.update_status("pydub not available - cannot save MP3")
-                    save_to_file = False
-            else:
-                save_to_file = False
-            
-            for i, chunk in enumerate(chunks):
-                if self.stop_requested:
-                    break
-                    
-                # Update progress
-                progress = int((i + 1) / total_chunks * 100)
-                self.update_progress(progress, f"Processing chunk {i+1}/{total_chunks}")
-                
-                # Play chunk if requested
-                if output_format in ["Play Only", "Both"]:
-                    self.engine.say(chunk)
-                    self.engine.runAndWait()
-                    
-                    # Pause between chunks
-                    if i < total_chunks - 1 and not self.stop_requested:
-                        time.sleep(self.pause_duration.value())
-                
-                # Save to file if requested
-                if save_to_file:
-                    temp_file = os.path.join(temp_dir, f"chunk_{i}.wav")  # Save as WAV first
-                    self.engine.save_to_file(chunk, temp_file)
-                    self.engine.runAndWait()
-                    
-                    # Convert to AudioSegment and add to combined
-                    sound = AudioSegment.from_wav(temp_file)
-                    combined += sound
-                    
-                    # Add pause between chunks except the last one
-                    if i < total_chunks - 1:
-                        combined += AudioSegment.silent(
-                            duration=int(self.pause_duration.value() * 1000)
-                        )
-                    
-                    temp_files.append(temp_file)
-            
-            # Save final MP3 file
-            if not self.stop_requested and save_to_file and len(combined) > 0:
-                try:
-                    combined.export(output_file, format="mp3", bitrate="64k")
-                    self.update_status(f"Successfully saved to {output_file}")
-                except Exception as e:
-                    self.update_status(f"Error saving MP3: {str(e)}")
-            
-            if not self.stop_requested:
-                self.update_status("Conversion complete!")
-        
-        except Exception as e:
-            self.update_status(f"Error: {str(e)}")
-        
-        finally:
-            # Cleanup temporary files
-            if 'temp_dir' in locals() and os.path.exists(temp_dir):
-                for file in temp_files:
-                    if os.path.exists(file):
-                        os.remove(file)
-                os.rmdir(temp_dir)
-            
-            self.is_converting = False
-            self.toggle_convert_controls(False)
+    def on_conversion_finished(self, output_file):
+        self.task = None
+        self.progress.stop()
+        self.text_area.set_read_along(False)
+        self.is_converting = False
+        self.toggle_convert_controls(False)
+    
+    def on_task_failed(self, message):
+        self.update_status(f"Error: {message}")
     
     def stop_conversion(self):
         self.stop_requested = True
@@ -543,38 +708,37 @@ class AudioBookConverter(QtWidgets.QWidget):
             self.engine.stop()
         self.update_status("Conversion stopped")
     
-    def _split_text(self, text):
-        """Optimized text splitting with paragraph awareness"""
-        # Split by paragraphs first
-        paragraphs = re.split(r'\n\s*\n', text)
-        
-        # Further split long paragraphs into sentences
-        chunks = []
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-                
-            if len(para) > 500:  # Split long paragraphs
-                sentences = re.split(r'(?<=[.!?])\s+', para)
-                current_chunk = []
-                current_length = 0
-                
-                for sentence in sentences:
-                    if current_length + len(sentence) > 500 and current_chunk:
-                        chunks.append(' '.join(current_chunk))
-                        current_chunk = []
-                        current_length = 0
-                    
-                    current_chunk.append(sentence)
-                    current_length += len(sentence)
-                
-                if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-            else:
-                chunks.append(para)
-        
-        return chunks
+    def conversion_settings(self, output_dir=None):
+        return ConversionSettings(
+            voice=self.voice_combo.currentData(),
+            rate=self.rate_slider.value(),
+            volume=self.volume_slider.value()/100,
+            pause=self.pause_duration.value(),
+            output_format=self.format_combo.currentText(),
+            output_dir=output_dir or self.output_dir.text(),
+            filename=self.filename.text().strip() or "audiobook",
+            batch_size=self.batch_size.value(),
+            min_chunk_chars=self.min_chunk_chars.value(),
+            max_chunk_chars=self.max_chunk_chars.value(),
+            autotune=self.autotune_chunks.isChecked(),
+            subtitle_formats=tuple(
+                fmt for fmt, box in (("srt", self.write_srt), ("lrc", self.write_lrc))
+                if box.isChecked()
+            ),
+            incremental=self.incremental_update.isChecked(),
+            backend=self.backend_combo.currentText(),
+            lexicon_file=self.lexicon_file.text().strip() or None,
+            clean_text=self.clean_text.isChecked(),
+            normalize_text=self.normalize_text.isChecked(),
+            profile=self.profile_conversion.isChecked(),
+            memory_budget_mb=self.memory_budget.value(),
+            hls=self.hls_stream.isChecked(),
+            cast=dict(self.cast)
+        )
+    
+    def _split_text(self, text, policy=None):
+        """Sentence-aligned text splitting with paragraph awareness"""
+        return (policy or self.conversion_settings().chunk_policy()).split(text)
     
     def toggle_play_controls(self, playing):
         self.play_button.setEnabled(not playing)
@@ -586,21 +750,14 @@ class AudioBookConverter(QtWidgets.QWidget):
         self.stop_button.setEnabled(converting)
         self.play_button.setEnabled(not converting)
     
-    def update_progress(self, value, message=""):
-        QtCore.QMetaObject.invokeMethod(
-            self.progress_bar, "setValue",
-            QtCore.Qt.QueuedConnection,
-            QtCore.Q_ARG(int, value)
-        )
-        if message:
-            self.update_status(message)
-    
     def update_status(self, message):
-        QtCore.QMetaObject.invokeMethod(
-            self.status_label, "setText",
-            QtCore.Qt.QueuedConnection,
-            QtCore.Q_ARG(str, message)
-        )
+        self.progress.report(message=message)
+        self.progress.flush()
+    
+    def show_progress(self, value, message):
+        self.progress_bar.setValue(value)
+        if message:
+            self.status_label.setText(message)
     
     def show_message(self, message, msg_type="info"):
         if msg_type == "info":
@@ -0,0 +1,51 @@
+"""Chunks/sec of each speech backend rendering the same chunks to PCM.
+
+Renders identical chunks with every backend available on this machine
+(pyttsx3 through its platform driver, espeak-ng through its command line) and
+reports chunks/sec and the realtime factor (seconds of audio per second of
+wall time).
+
+    python benchmarks/bench_backends.py --chunks 100 --backends pyttsx3 espeak-ng
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts_backends import available_backends, create_backend  # noqa: E402
+
+SENTENCE = "The quick brown fox jumps over the lazy dog near the riverbank."
+
+
+def run(backend, chunks):
+    start = time.perf_counter()
+    audio_ms = 0.0
+    for _, _, audio in backend.render(enumerate(chunks)):
+        audio_ms += audio.duration_ms
+    return time.perf_counter() - start, audio_ms / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--sentences", type=int, default=3, help="Sentences per chunk")
+    parser.add_argument("--backends", nargs="+", default=available_backends())
+    parser.add_argument("--rate", type=int, default=150)
+    args = parser.parse_args()
+
+    chunks = [" ".join([SENTENCE] * args.sentences) + f" Chunk number {i}."
+              for i in range(args.chunks)]
+
+    print(f"{'backend':>10} {'seconds':>8} {'chunks/s':>9} {'realtime':>9}")
+    for name in args.backends:
+        backend = create_backend(name)
+        backend.configure(rate=args.rate)
+        seconds, audio_seconds = run(backend, chunks)
+        print(f"{name:>10} {seconds:>8.2f} {len(chunks) / seconds:>9.1f} "
+              f"{audio_seconds / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
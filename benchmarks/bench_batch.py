@@ -0,0 +1,51 @@
+"""Per-chunk run-loop overhead: one runAndWait per chunk vs. batched windows.
+
+Renders the same set of short chunks with the installed pyttsx3 driver, first
+with a window of 1 (the old save_to_file + runAndWait per chunk) and then with
+the requested windows, and reports chunks/sec and run loops used.
+
+    python benchmarks/bench_batch.py --chunks 100 --windows 1 8 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthesis import BatchSynthesizer  # noqa: E402
+
+SENTENCE = "The quick brown fox jumps over the lazy dog near the riverbank."
+
+
+def run(engine, chunks, window, tmp):
+    synthesizer = BatchSynthesizer(engine, window=window)
+    items = ((i, text, os.path.join(tmp, f"w{window}_{i}.wav")) for i, text in enumerate(chunks))
+    start = time.perf_counter()
+    for _, _, path in synthesizer.synthesize(items):
+        os.remove(path)
+    return time.perf_counter() - start, synthesizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    import pyttsx3
+    engine = pyttsx3.init()
+    chunks = [f"{SENTENCE} Chunk number {i}." for i in range(args.chunks)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"driver: {engine}  chunks: {args.chunks}")
+        for window in args.windows:
+            elapsed, synth = run(engine, chunks, window, tmp)
+            print(f"window {window:3d}: {elapsed:7.2f}s  {args.chunks / elapsed:7.2f} chunks/s  "
+                  f"run loops {synth.stats['run_loops']:4d}  retries {synth.stats['retries']:4d}  "
+                  f"effective window {synth.window}")
+
+
+if __name__ == "__main__":
+    main()
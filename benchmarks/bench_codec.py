@@ -0,0 +1,88 @@
+"""Per-chunk codec overhead: pydub round trips vs. the persistent CodecWorker.
+
+Writes N synthetic WAV chunks shaped like pyttsx3 output (22.05 kHz mono
+16-bit) and times the old path (``AudioSegment.from_file`` per chunk, ``+=``
+and one ``export``) against ``CodecWorker.decode`` feeding a single
+``StreamEncoder``.  Needs pydub and ffmpeg.
+
+    python benchmarks/bench_codec.py --chunks 500
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_codec import CodecWorker, silence  # noqa: E402
+
+
+def write_chunk(path, seconds=3.0, sample_rate=22050):
+    frames = int(seconds * sample_rate)
+    samples = (int(8000 * math.sin(2 * math.pi * 220 * n / sample_rate)) for n in range(frames))
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"".join(struct.pack("<h", s) for s in samples))
+
+
+def bench_pydub(paths, output_file):
+    from pydub import AudioSegment
+    start = time.perf_counter()
+    combined = AudioSegment.empty()
+    for path in paths:
+        combined += AudioSegment.from_file(path)
+        combined += AudioSegment.silent(duration=500)
+    combined.export(output_file, format="mp3")
+    return time.perf_counter() - start
+
+
+def bench_codec_worker(paths, output_file):
+    codec = CodecWorker()
+    start = time.perf_counter()
+    encoder = None
+    for path in paths:
+        sound = codec.decode(path)
+        if encoder is None:
+            encoder = codec.open_encoder(output_file, *sound.format)
+        encoder.write(sound)
+        encoder.write(silence(500, *sound.format))
+    encoder.close()
+    return time.perf_counter() - start, codec.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0, help="audio per chunk")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.wav")
+        write_chunk(template, args.seconds)
+        with open(template, "rb") as f:
+            data = f.read()
+        paths = []
+        for i in range(args.chunks):
+            path = os.path.join(tmp, f"chunk_{i}.wav")
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+
+        old = bench_pydub(paths, os.path.join(tmp, "old.mp3"))
+        new, stats = bench_codec_worker(paths, os.path.join(tmp, "new.mp3"))
+
+    print(f"chunks: {args.chunks} x {args.seconds:.1f}s")
+    print(f"pydub per-chunk decode + export : {old:8.2f}s  {old * 1000 / args.chunks:7.2f} ms/chunk")
+    print(f"CodecWorker + streaming encoder : {new:8.2f}s  {new * 1000 / args.chunks:7.2f} ms/chunk")
+    print(f"  decode overhead {stats['decode_seconds'] * 1000 / args.chunks:.3f} ms/chunk, "
+          f"{stats['process_spawns']} ffmpeg process(es)")
+
+
+if __name__ == "__main__":
+    main()
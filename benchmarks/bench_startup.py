@@ -0,0 +1,71 @@
+"""Cold start-up time of the GUIs, up to the first painted window.
+
+Each measurement runs in a fresh interpreter (so imports are cold) with the
+offscreen Qt platform, times import + construction + show, and separately
+reports when the background engine start-up finished.  Exits non-zero when
+time-to-window exceeds --budget, so it can guard start-up in CI.
+
+    python benchmarks/bench_startup.py --budget 1.0
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+from PyQt5 import QtWidgets, QtCore
+module = __import__(sys.argv[1])
+app = QtWidgets.QApplication([])
+window = module.AudioBookConverter()
+window.show()
+app.processEvents()
+shown = time.perf_counter() - start
+result = {"window": shown, "engine": None}
+
+def finish(*args):
+    result["engine"] = time.perf_counter() - start
+    app.quit()
+
+window.engine_ready.connect(finish)
+window.engine_failed.connect(finish)
+QtCore.QTimer.singleShot(30000, app.quit)
+if window.engine is None:
+    app.exec_()
+print(json.dumps(result))
+"""
+
+
+def measure(module):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    output = subprocess.run([sys.executable, "-c", PROBE, module], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, check=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["audiobook_fast", "audiobokk3"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="maximum seconds until the window is shown")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.runs)]
+        window = min(r["window"] for r in runs)
+        engines = [r["engine"] for r in runs if r["engine"] is not None]
+        engine = f"{min(engines):.2f}s" if engines else "n/a"
+        verdict = "ok" if window <= args.budget else "OVER BUDGET"
+        failed |= window > args.budget
+        print(f"{module:16s} window {window:.2f}s  engine ready {engine}  [{verdict}]")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Golden-corpus regression check of the converters' speed, memory and output.
+
+Converts every text in benchmarks/corpus with each converter (the Turbo
+``ConversionJob`` behind audiobook_fast and the classic audiobokk3 path), each
+run in a fresh interpreter with its own pyttsx3 engine, and checks:
+
+* output against the stored baseline: audio duration, chunk count and the
+  similarity of the loudness envelope (correlation, 1.0 = identical);
+* output between converters on the same text: duration and similarity
+  relative to the first converter listed;
+* performance against the baseline: wall time, peak memory (max RSS of the
+  converting process) and realtime factor (seconds of audio per second).
+
+Exits non-zero when any check is outside its tolerance, so it can guard CI.
+Timings depend on the machine, so baselines are recorded per machine with
+--update-baseline.  Another converter is a function added to ``CONVERTERS``.
+
+    python benchmarks/perf_regression.py --update-baseline
+    python benchmarks/perf_regression.py --runs 3 --wall-tolerance 0.1
+"""
+import argparse
+import array
+import glob
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audio_codec import find_ffmpeg  # noqa: E402
+
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baselines.json")
+ENVELOPE_RATE = 1000  # Hz the output is decoded at for duration and envelope
+ENVELOPE_WINDOW = 100  # samples per envelope value (10 per second)
+
+
+# Converters: fn(engine, text, output_dir, name, options) -> (mp3 path, chunks)
+
+def convert_turbo(engine, text, output_dir, name, options):
+    from conversion import SAVE_MP3, ConversionJob, ConversionSettings
+    from incremental import MANIFEST_SUFFIX, ChunkManifest
+    settings = ConversionSettings(voice=options["voice"], rate=options["rate"],
+                                  volume=options["volume"], pause=options["pause"],
+                                  output_format=SAVE_MP3, output_dir=output_dir,
+                                  filename=name, checkpoint=False)
+    output = ConversionJob(engine, text, settings).run()
+    manifest = ChunkManifest.load(settings.sidecar_file(MANIFEST_SUFFIX))
+    return output, len(manifest.chunks) if manifest else 0
+
+
+class _NoProgress:
+    def report(self, value=None, message=None):
+        pass
+
+    def report_span(self, start, end):
+        pass
+
+
+def convert_classic(engine, text, output_dir, name, options):
+    from audio_codec import CodecWorker
+    from audiobokk3 import AudioBookConverter
+    from chunking import paragraph_spans
+
+    class Host:
+        """Just enough of the audiobokk3 window for its conversion to run headless"""
+        apply_voice_config = AudioBookConverter.apply_voice_config
+        apply_voice_effect = AudioBookConverter.apply_voice_effect
+        convert = AudioBookConverter.advanced_text_to_audio_book
+
+        def __init__(self):
+            self.engine = engine
+            self.codec = CodecWorker()
+            self.progress = _NoProgress()
+            self.is_converting = True
+
+    voice_config = {"voice": options["voice"], "rate": options["rate"],
+                    "volume": options["volume"], "pitch": 1.0, "effect": "None"}
+    Host().convert(text, output_dir, voice_config, options["pause"], options["rate"],
+                   "Save as MP3", name)
+    return os.path.join(output_dir, f"{name}.mp3"), len(list(paragraph_spans(text)))
+
+
+CONVERTERS = {"turbo": convert_turbo, "classic": convert_classic}
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, or None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_child(args):
+    """Convert one text in this process and print the measurements as JSON"""
+    import pyttsx3
+    engine = pyttsx3.init()
+    with open(args.child[1], encoding="utf-8") as f:
+        text = f.read()
+    options = {"voice": args.voice, "rate": args.rate, "volume": args.volume,
+               "pause": args.pause}
+    start = time.perf_counter()
+    output, chunks = CONVERTERS[args.child[0]](engine, text, args.child[2],
+                                               args.child[0], options)
+    wall = time.perf_counter() - start
+    print(json.dumps({"output": output, "chunks": chunks, "wall": wall,
+                      "peak_bytes": peak_rss()}))
+
+
+def measure(converter, corpus_file, runs, options):
+    """Best of ``runs`` child conversions, plus the analysed output"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        command = [sys.executable, os.path.abspath(__file__),
+                   "--child", converter, corpus_file, output_dir]
+        for option, value in options.items():
+            if value is not None:
+                command += [f"--{option}", str(value)]
+        results = [json.loads(subprocess.run(
+            command, cwd=ROOT, stdout=subprocess.PIPE, check=True,
+            text=True).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+        best = min(results, key=lambda result: result["wall"])
+        if not best["output"] or not os.path.exists(best["output"]):
+            raise RuntimeError(f"{converter} wrote no audio for {corpus_file}")
+        duration, envelope = analyse(best["output"])
+    # Noise only ever adds time and memory, so the lowest of each is kept
+    peak = min((result["peak_bytes"] for result in results if result["peak_bytes"]), default=0)
+    return {"wall": best["wall"], "peak_mb": peak / (1024 * 1024), "chunks": best["chunks"],
+            "duration": duration, "rtf": duration / best["wall"] if best["wall"] else 0.0,
+            "envelope": envelope}
+
+
+def analyse(mp3_file):
+    """(duration in seconds, loudness envelope) of an audio file"""
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not found - cannot analyse " + mp3_file)
+    raw = subprocess.run([ffmpeg, "-hide_banner", "-loglevel", "error", "-i", mp3_file,
+                          "-f", "s16le", "-ar", str(ENVELOPE_RATE), "-ac", "1", "pipe:1"],
+                         stdout=subprocess.PIPE, check=True).stdout
+    samples = array.array("h")
+    samples.frombytes(raw[:len(raw) - len(raw) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    envelope = []
+    for start in range(0, len(samples) - ENVELOPE_WINDOW + 1, ENVELOPE_WINDOW):
+        window = samples[start:start + ENVELOPE_WINDOW]
+        envelope.append(round(math.sqrt(sum(x * x for x in window) / ENVELOPE_WINDOW), 1))
+    return len(samples) / ENVELOPE_RATE, envelope
+
+
+def similarity(a, b):
+    """Correlation of two envelopes, resampled to the same length"""
+    n = min(len(a), len(b))
+    if n < 2:
+        return 0.0
+    a = [a[i * len(a) // n] for i in range(n)]
+    b = [b[i * len(b) // n] for i in range(n)]
+    mean_a, mean_b = sum(a) / n, sum(b) / n
+    cov = sum((x - mean_a) * (y - mean_b) for x, y in zip(a, b))
+    var_a = sum((x - mean_a) ** 2 for x in a)
+    var_b = sum((y - mean_b) ** 2 for y in b)
+    if not var_a or not var_b:
+        return 1.0 if var_a == var_b else 0.0
+    return cov / math.sqrt(var_a * var_b)
+
+
+def check_baseline(result, baseline, args):
+    """(check, passed, detail) of ``result`` against its stored baseline"""
+    checks = []
+
+    def within(name, value, reference, tolerance, higher_is_worse=True, unit=""):
+        change = (value - reference) / reference if reference else 0.0
+        passed = change <= tolerance if higher_is_worse else change >= -tolerance
+        checks.append((name, passed, f"{value:.2f}{unit} vs {reference:.2f}{unit} "
+                                     f"({change:+.0%}, limit {tolerance:.0%})"))
+
+    duration_change = abs(result["duration"] - baseline["duration"]) / (baseline["duration"] or 1)
+    checks.append(("duration", duration_change <= args.duration_tolerance,
+                   f"{result['duration']:.1f}s vs {baseline['duration']:.1f}s"))
+    checks.append(("chunks", result["chunks"] == baseline["chunks"],
+                   f"{result['chunks']} vs {baseline['chunks']}"))
+    score = similarity(result["envelope"], baseline["envelope"])
+    checks.append(("similarity", score >= args.min_similarity,
+                   f"{score:.3f} (min {args.min_similarity})"))
+    within("wall time", result["wall"], baseline["wall"], args.wall_tolerance, unit="s")
+    if result["peak_mb"] and baseline["peak_mb"]:
+        within("peak memory", result["peak_mb"], baseline["peak_mb"],
+               args.memory_tolerance, unit=" MB")
+    within("realtime", result["rtf"], baseline["rtf"], args.rtf_tolerance,
+           higher_is_worse=False, unit="x")
+    return checks
+
+
+def check_equivalence(result, reference, args):
+    """(check, passed, detail) of one converter's output against another's"""
+    change = abs(result["duration"] - reference["duration"]) / (reference["duration"] or 1)
+    score = similarity(result["envelope"], reference["envelope"])
+    return [("same duration", change <= args.cross_duration_tolerance,
+             f"{result['duration']:.1f}s vs {reference['duration']:.1f}s ({change:.0%})"),
+            ("same audio", score >= args.cross_similarity,
+             f"{score:.3f} (min {args.cross_similarity})")]
+
+
+def load_baselines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"machine": None, "results": {}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--converters", nargs="+", default=list(CONVERTERS),
+                        choices=list(CONVERTERS))
+    parser.add_argument("--corpus", nargs="+",
+                        default=sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt"))))
+    parser.add_argument("--runs", type=int, default=1, help="Best of this many runs")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the baseline instead of checking")
+    parser.add_argument("--voice")
+    parser.add_argument("--rate", type=int, default=150)
+    parser.add_argument("--volume", type=float, default=0.9)
+    parser.add_argument("--pause", type=float, default=0.5)
+    parser.add_argument("--duration-tolerance", type=float, default=0.02)
+    parser.add_argument("--min-similarity", type=float, default=0.9)
+    parser.add_argument("--wall-tolerance", type=float, default=0.2)
+    parser.add_argument("--memory-tolerance", type=float, default=0.2)
+    parser.add_argument("--rtf-tolerance", type=float, default=0.15)
+    parser.add_argument("--cross-duration-tolerance", type=float, default=0.15)
+    parser.add_argument("--cross-similarity", type=float, default=0.6)
+    parser.add_argument("--child", nargs=3, metavar=("CONVERTER", "TEXT", "OUTPUT_DIR"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    options = {"voice": args.voice, "rate": args.rate, "volume": args.volume,
+               "pause": args.pause}
+    baselines = load_baselines(args.baseline)
+    machine = platform.node()
+    if baselines["results"] and baselines["machine"] != machine and not args.update_baseline:
+        print(f"warning: baselines were recorded on {baselines['machine']}, not {machine}")
+
+    failed = False
+    print(f"{'converter':>10} {'text':>12} {'seconds':>8} {'peak MB':>8} "
+          f"{'realtime':>9} {'audio s':>8} {'chunks':>7}")
+    for corpus_file in args.corpus:
+        text_name = os.path.splitext(os.path.basename(corpus_file))[0]
+        reference = None
+        for converter in args.converters:
+            result = measure(converter, corpus_file, args.runs, options)
+            print(f"{converter:>10} {text_name:>12} {result['wall']:>8.2f} "
+                  f"{result['peak_mb']:>8.0f} {result['rtf']:>8.1f}x "
+                  f"{result['duration']:>8.1f} {result['chunks']:>7}")
+            key = f"{converter}/{text_name}"
+            checks = []
+            if args.update_baseline:
+                baselines["results"][key] = result
+            elif key in baselines["results"]:
+                checks += check_baseline(result, baselines["results"][key], args)
+            else:
+                print(f"{'':>23} no baseline for {key}; record one with --update-baseline")
+            if reference is None:
+                reference = (converter, result)
+            else:
+                checks += [(f"{check} as {reference[0]}", passed, detail) for check, passed, detail
+                           in check_equivalence(result, reference[1], args)]
+            for check, passed, detail in checks:
+                failed |= not passed
+                print(f"{'':>23} {'ok  ' if passed else 'FAIL'} {check}: {detail}")
+
+    if args.update_baseline:
+        baselines["machine"] = machine
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=1)
+        print(f"Baselines written to {args.baseline}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Compressed on-disk store for rendered chunk audio.
+
+Chunks are kept losslessly compressed in one append-only data file with a
+small JSON-lines index next to it (``<name>.dat`` / ``<name>.idx``).  16-bit
+PCM is split into a low-byte and a high-byte plane before zlib: speech at
+normal levels leaves most high bytes near 0 or 255, so the planes compress
+far better than interleaved samples, and both the split and the merge are
+byte slicing done in C.  Decoding is a single ``zlib.decompress`` plus two
+slice assignments, so reading chunks back for final assembly stays cheap.
+
+A chunk is written to the data file and flushed before its index line, so a
+store left behind by a crash or a stopped job is valid up to the last chunk
+that was fully written.  ``ConversionJob`` uses it, when
+``ConversionSettings.checkpoint`` is on, to checkpoint rendered chunks so an
+interrupted conversion resumes where it stopped; the job queue turns it on
+so paused jobs can carry on.
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+
+from audio_codec import PcmAudio
+from voice_catalog import CACHE_DIR
+
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")
+MAX_CHECKPOINTS = 8
+
+PLANES_ZLIB = "planes-zlib"
+ZLIB = "zlib"
+COMPRESS_LEVEL = 1  # most of the gain at a fraction of the cost of higher levels
+
+
+def pack_pcm(audio):
+    """Compress PcmAudio data; returns (codec, payload)"""
+    data = audio.data
+    # A trailing partial frame cannot be played, and would leave the planes uneven
+    data = data[:len(data) - len(data) % audio.frame_size]
+    if audio.sample_width == 2:
+        return PLANES_ZLIB, zlib.compress(data[0::2] + data[1::2], COMPRESS_LEVEL)
+    return ZLIB, zlib.compress(data, COMPRESS_LEVEL)
+
+
+def unpack_pcm(codec, payload, sample_rate, channels, sample_width):
+    raw = zlib.decompress(payload)
+    if codec == PLANES_ZLIB:
+        half = len(raw) // 2
+        data = bytearray(len(raw))
+        data[0::2] = raw[:half]
+        data[1::2] = raw[half:]
+        raw = bytes(data)
+    elif codec != ZLIB:
+        raise ValueError(f"Unknown chunk codec {codec!r}")
+    return PcmAudio(raw, sample_rate, channels, sample_width)
+
+
+class ChunkStore:
+    """Keyed, append-only store of compressed PcmAudio chunks"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data_file = path + ".dat"
+        self.index_file = path + ".idx"
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self._data = None
+        self.stats = {"chunks": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    def _load_index(self):
+        index = {}
+        try:
+            size = os.path.getsize(self.data_file)
+            with open(self.index_file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        key, entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line
+                    if entry[1] + entry[2] <= size:
+                        index[key] = entry
+        except OSError:
+            pass
+        return index
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def put(self, key, audio):
+        codec, payload = pack_pcm(audio)
+        with self._lock:
+            if key in self._index:
+                return
+            if self._data is None:
+                os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
+                self._data = open(self.data_file, "ab")
+                self._index_out = open(self.index_file, "a", encoding="utf-8")
+            offset = self._data.tell()
+            self._data.write(payload)
+            self._data.flush()
+            entry = [codec, offset, len(payload), audio.sample_rate, audio.channels,
+                     audio.sample_width]
+            self._index_out.write(json.dumps([key, entry]) + "\n")
+            self._index_out.flush()
+            self._index[key] = entry
+            self.stats["chunks"] += 1
+            self.stats["raw_bytes"] += len(audio.data)
+            self.stats["stored_bytes"] += len(payload)
+
+    def get(self, key):
+        """The chunk stored under ``key``, or None"""
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        codec, offset, length, sample_rate, channels, sample_width = entry
+        with open(self.data_file, "rb") as f:
+            f.seek(offset)
+            payload = f.read(length)
+        return unpack_pcm(codec, payload, sample_rate, channels, sample_width)
+
+    def close(self):
+        with self._lock:
+            if self._data is not None:
+                self._data.close()
+                self._index_out.close()
+                self._data = None
+
+    def remove(self):
+        """Close the store and delete its files"""
+        self.close()
+        for path in (self.data_file, self.index_file):
+            if os.path.exists(path):
+                os.remove(path)
+        self._index = {}
+
+
+def checkpoint_store(output_file, fingerprint, directory=CHECKPOINT_DIR,
+                     max_checkpoints=MAX_CHECKPOINTS):
+    """Checkpoint store for one output file rendered with fixed settings"""
+    key = json.dumps({"output": os.path.abspath(output_file), "settings": fingerprint},
+                     sort_keys=True)
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    _prune(directory, max_checkpoints, keep=name)
+    return ChunkStore(os.path.join(directory, name))
+
+
+def _prune(directory, max_checkpoints, keep):
+    # Drop the oldest abandoned checkpoints
+    try:
+        names = {os.path.splitext(entry)[0] for entry in os.listdir(directory)}
+    except OSError:
+        return
+    names.discard(keep)
+    stores = sorted(names, key=lambda name: _mtime(os.path.join(directory, name + ".idx")))
+    for name in stores[:max(0, len(stores) - max_checkpoints + 1)]:
+        ChunkStore(os.path.join(directory, name)).remove()
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
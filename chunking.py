@@ -0,0 +1,206 @@
+"""Chunk sizing for splitting text before synthesis.
+
+Every chunk pays a fixed cost (engine run loop, temp file, decode) on top of
+the time spent actually speaking it, so chunks that are too small waste time
+on overhead while chunks that are too large leave workers idle at the end of
+a book and make Stop slow to react.  ``ChunkPolicy`` makes the limits
+tunable and ``autotune`` picks a size for the current machine by measuring
+the speech backend's fixed overhead and its synthesis rate.
+"""
+import math
+import re
+import time
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+DEFAULT_MAX_CHARS = 500
+
+
+class ChunkPolicy:
+    """Sentence-aligned chunking limits.
+
+    Paragraphs longer than ``max_chars`` are split into groups of whole
+    sentences no longer than ``max_chars`` (a single longer sentence is kept
+    intact).  Consecutive pieces are merged while the chunk being built is
+    shorter than ``min_chars``; the default of 0 keeps every paragraph in its
+    own chunk.
+    """
+
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS, min_chars=0):
+        if max_chars <= 0:
+            raise ValueError("max_chars must be positive")
+        if not 0 <= min_chars <= max_chars:
+            raise ValueError("min_chars must be between 0 and max_chars")
+        self.max_chars = int(max_chars)
+        self.min_chars = int(min_chars)
+
+    def __repr__(self):
+        return f"ChunkPolicy(max_chars={self.max_chars}, min_chars={self.min_chars})"
+
+    def __eq__(self, other):
+        return (isinstance(other, ChunkPolicy)
+                and (self.max_chars, self.min_chars) == (other.max_chars, other.min_chars))
+
+    def iter_spans(self, text):
+        """Yield (start, end) offsets of each chunk in ``text``, lazily and in order.
+
+        Every chunk is the exact slice ``text[start:end]``, so positions
+        reported while speaking a chunk map straight back to the source.
+        """
+        pending = None
+        for para_start, para_end in paragraph_spans(text):
+            for start, end in self._split_paragraph(text, para_start, para_end):
+                if pending is not None:
+                    pending_start, pending_end = pending
+                    if (pending_end - pending_start >= self.min_chars
+                            or end - pending_start > self.max_chars):
+                        yield pending
+                    else:
+                        pending = (pending_start, end)
+                        continue
+                pending = (start, end)
+        if pending is not None:
+            yield pending
+
+    def iter_chunks(self, text):
+        """Yield chunk strings lazily, in document order"""
+        for start, end in self.iter_spans(text):
+            yield text[start:end]
+
+    def split(self, text):
+        return list(self.iter_chunks(text))
+
+    def _split_paragraph(self, text, para_start, para_end):
+        if para_end - para_start <= self.max_chars:
+            return [(para_start, para_end)]
+
+        # Group whole sentences up to max_chars
+        pieces = []
+        current = None
+        for start, end in sentence_spans(text, para_start, para_end):
+            if current is not None and end - current[0] > self.max_chars:
+                pieces.append(current)
+                current = None
+            current = (start, end) if current is None else (current[0], end)
+        if current is not None:
+            pieces.append(current)
+        return pieces
+
+
+def _strip_span(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def paragraph_spans(text):
+    position = 0
+    for match in PARAGRAPH_BREAK.finditer(text):
+        start, end = _strip_span(text, position, match.start())
+        if start < end:
+            yield start, end
+        position = match.end()
+    start, end = _strip_span(text, position, len(text))
+    if start < end:
+        yield start, end
+
+
+def sentence_spans(text, para_start, para_end):
+    position = para_start
+    for match in SENTENCE_BREAK.finditer(text, para_start, para_end):
+        yield position, match.start()
+        position = match.end()
+    yield position, para_end
+
+
+class EngineTiming:
+    """Linear cost model: seconds(chunk) = overhead + chars / chars_per_second"""
+
+    def __init__(self, overhead, chars_per_second):
+        self.overhead = max(0.0, overhead)
+        self.chars_per_second = chars_per_second
+
+    def __repr__(self):
+        return (f"EngineTiming(overhead={self.overhead * 1000:.1f}ms, "
+                f"chars_per_second={self.chars_per_second:.0f})")
+
+    def chunk_seconds(self, chars):
+        return self.overhead + chars / self.chars_per_second
+
+    def makespan(self, total_chars, chunk_chars, workers=1):
+        """Estimated wall time to render ``total_chars`` with ``workers`` in parallel"""
+        workers = max(1, workers)
+        chunks = math.ceil(total_chars / chunk_chars)
+        waves = math.ceil(chunks / workers)
+        last_chunk = total_chars - (chunks - 1) * chunk_chars
+        # The final wave only runs as long as its longest chunk
+        last_wave_chunks = chunks - (waves - 1) * workers
+        last_wave = chunk_chars if last_wave_chunks > 1 else last_chunk
+        return (waves - 1) * self.chunk_seconds(chunk_chars) + self.chunk_seconds(last_wave)
+
+
+def measure_engine(synthesize, sample_text, probe_sizes=(60, 600), repeats=2):
+    """Fit an EngineTiming by timing ``synthesize(text)`` on two probe sizes"""
+    words = sample_text.split() or ["audiobook"]
+    points = []
+    for size in probe_sizes:
+        probe = _probe_text(words, size)
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            synthesize(probe)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        points.append((len(probe), best))
+
+    (small_chars, small_time), (large_chars, large_time) = points[0], points[-1]
+    per_char = (large_time - small_time) / max(1, large_chars - small_chars)
+    if per_char <= 0:
+        # Timing noise swamped the difference; treat everything as overhead-free
+        per_char = large_time / max(1, large_chars)
+    overhead = small_time - small_chars * per_char
+    return EngineTiming(overhead, 1.0 / per_char)
+
+
+def best_chunk_size(timing, total_chars, workers=1, min_chars=100, max_chars=2000, step=50):
+    """Chunk size in [min_chars, max_chars] with the lowest estimated cost.
+
+    The cost is the makespan over ``workers`` plus the time to render one
+    chunk: nothing reaches the encoder until the first chunk is rendered,
+    and Stop waits for the chunks in progress.  With one worker the
+    makespan only falls as chunks grow, so it is this latency that bounds
+    the size, near sqrt(total_chars * overhead * chars_per_second).  Ties
+    go to the smaller size, which keeps cache granularity fine without
+    costing throughput.
+    """
+    if total_chars <= 0:
+        return max_chars
+    best_size, best_time = max_chars, None
+    for size in range(min_chars, max_chars + 1, step):
+        estimate = (timing.makespan(total_chars, size, workers)
+                    + timing.chunk_seconds(min(size, total_chars)))
+        if best_time is None or estimate < best_time * 0.999:
+            best_size, best_time = size, estimate
+    return best_size
+
+
+def autotune(backend, text, workers=1, min_chars=100, max_chars=2000):
+    """Measure ``backend`` on this machine; return (ChunkPolicy, EngineTiming) for ``text``"""
+    timing = measure_engine(backend.synthesize, text[:5000])
+    size = best_chunk_size(timing, len(text), workers, min_chars, max_chars)
+    return ChunkPolicy(max_chars=size, min_chars=size // 2), timing
+
+
+def _probe_text(words, size):
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        word = words[i % len(words)]
+        parts.append(word)
+        length += len(word) + 1
+        i += 1
+    return ' '.join(parts).rstrip('.!?') + '.'
@@ -0,0 +1,124 @@
+"""Clean-up of text extracted from scanned books and PDFs before synthesis.
+
+Extracted text carries the page furniture of the printed book: running
+headers and footers repeated on every page, page numbers, words hyphenated
+across line ends and hard line wraps.  Spoken, that is minutes of garbage
+audio and wasted engine time on a long book.
+
+``find_boilerplate`` makes one pass over the whole document and counts each
+short line by a normalised key (case folded, digits masked, so "Chapter 3 -
+The Storm  47" on every page counts as one line).  Lines seen at least
+``min_repeats`` times that do not read like prose are boilerplate, as is
+every line that is only a page number once the document has that many of
+them.  Masking must not merge real headings, so the number of a "Chapter 2"
+or "Part 4" heading is kept in the key, and lines that share a key but not
+their text only count when they recur at page-like intervals: most gaps
+between them about the same and no longer than ``MAX_PAGE_LINES``.
+Chapters are neither that short nor that even.
+
+A ``TextCleaner`` then cleans chunk by chunk as they are spoken, like the
+pronunciation lexicon, so chunk offsets still point into the original text
+and read-along highlighting is unaffected.  It counts the characters it
+saves for the conversion summary.
+"""
+import collections
+import re
+
+DEFAULT_MIN_REPEATS = 3
+MAX_HEADER_CHARS = 80  # longer lines are prose, never page furniture
+MAX_PAGE_LINES = 120  # lines of extracted text on one page, blank ones included
+PAGE_TOLERANCE = 0.25  # how far a gap may stray from the typical one and still be a page
+
+# Lines ending like a sentence, a quotation or a wrapped word are prose,
+# however often they repeat
+_PROSE_END = tuple('.!?,;:"\'”’)-')
+_DIGITS = re.compile(r"\d+")
+# The number that tells one heading from the next
+HEADING_NUMBER = re.compile(r"\b(?:chapter|part|book|volume|section|act|scene|canto|letter"
+                            r"|lesson|appendix)\s+\d+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+# "12", "- 12 -", "Page 12", "page 12 of 300", front matter "xiv"
+PAGE_NUMBER = re.compile(r"[^\w]*(?:(?i:page)\s+)?(?:\d{1,4}|[ivxlc]{1,7})"
+                         r"(?:\s+(?i:of)\s+\d{1,4})?[^\w]*")
+# "exam-\nple" -> "example"; a capital after the break is a real hyphen,
+# which is kept and joined without a space ("Anglo-\nSaxon")
+HYPHEN_BREAK = re.compile(r"(?<=[^\W\d_])-[ \t]*\n[ \t]*(?=[a-z])")
+HYPHEN_WRAP = re.compile(r"(?<=[^\W\d_]-)[ \t]*\n[ \t]*(?=\S)")
+LINE_WRAP = re.compile(r"(?<=\S)[ \t]*\n[ \t]*(?=\S)")
+
+
+def line_key(line):
+    """Key under which ``line`` counts as a repeat, or None if it cannot be one"""
+    line = line.strip()
+    if not line or len(line) > MAX_HEADER_CHARS:
+        return None
+    if PAGE_NUMBER.fullmatch(line):
+        return "#page"
+    if line.endswith(_PROSE_END):
+        return None
+    headings = [match.span() for match in HEADING_NUMBER.finditer(line)]
+
+    def mask(match):
+        if any(start <= match.start() < end for start, end in headings):
+            return match.group(0)
+        return "#"
+    return _SPACE.sub(" ", _DIGITS.sub(mask, line.lower()))
+
+
+def page_like(positions):
+    """Whether line numbers ``positions`` are spaced like pages of one book"""
+    gaps = sorted(b - a for a, b in zip(positions, positions[1:]))
+    if not gaps:
+        return False
+    typical = gaps[len(gaps) // 2]
+    regular = sum(1 for gap in gaps if abs(gap - typical) <= typical * PAGE_TOLERANCE)
+    return typical <= MAX_PAGE_LINES and regular * 3 >= len(gaps) * 2
+
+
+def find_boilerplate(text, min_repeats=DEFAULT_MIN_REPEATS):
+    """Keys of the lines of ``text`` repeated often enough to be page furniture"""
+    positions = collections.defaultdict(list)
+    texts = collections.defaultdict(set)
+    for n, line in enumerate(text.splitlines()):
+        key = line_key(line)
+        if key is not None:
+            positions[key].append(n)
+            texts[key].add(_SPACE.sub(" ", line.strip().lower()))
+    return frozenset(key for key, seen in positions.items()
+                     if len(seen) >= min_repeats
+                     and (len(texts[key]) == 1 or page_like(seen)))
+
+
+class TextCleaner:
+    def __init__(self, boilerplate=frozenset(), repair=True):
+        self.boilerplate = boilerplate
+        self.repair = repair
+        self.stats = {"chars_in": 0, "chars_out": 0, "lines_removed": 0}
+
+    @classmethod
+    def for_text(cls, text, min_repeats=DEFAULT_MIN_REPEATS, repair=True):
+        return cls(find_boilerplate(text, min_repeats), repair)
+
+    def apply(self, text):
+        """``text`` without boilerplate lines, hyphenation or hard wraps"""
+        lines = text.splitlines()
+        if self.boilerplate:
+            kept = [line for line in lines if line_key(line) not in self.boilerplate]
+            self.stats["lines_removed"] += len(lines) - len(kept)
+            lines = kept
+        cleaned = "\n".join(lines).strip()
+        if self.repair:
+            cleaned = LINE_WRAP.sub(" ", HYPHEN_WRAP.sub("", HYPHEN_BREAK.sub("", cleaned)))
+        self.stats["chars_in"] += len(text)
+        self.stats["chars_out"] += len(cleaned)
+        return cleaned
+
+    @property
+    def saved(self):
+        return self.stats["chars_in"] - self.stats["chars_out"]
+
+    def summary(self):
+        chars_in = self.stats["chars_in"] or 1
+        return (f"Clean-up saved {self.saved:,} characters "
+                f"({self.saved * 100 / chars_in:.1f}%), "
+                f"{self.stats['lines_removed']} repeated lines removed")
@@ -0,0 +1,703 @@
+"""Headless text-to-audiobook conversion used by the Turbo GUI.
+
+A ``ConversionSettings`` snapshot is taken on the GUI thread before a job
+starts, so the worker never reads widgets.  Progress goes out through a plain
+``progress(value, message)`` callback; the GUI decides how often to repaint.
+"""
+import collections
+import contextlib
+import dataclasses
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from audio_codec import CodecWorker
+from chunk_store import checkpoint_store
+from chunking import ChunkPolicy, DEFAULT_MAX_CHARS, autotune
+from cleanup import TextCleaner
+from dialogue import VoiceRouter, voiced_spans
+from distributed import RemoteBackend
+from hls import DEFAULT_SEGMENT_SECONDS, HlsWriter, segment_file
+from incremental import (MANIFEST_SUFFIX, ChunkManifest, SpliceEncoder, can_update,
+                         chunk_digest, fingerprint, pad_to_frames, scan_frames,
+                         splice_files)
+from lexicon import load_lexicon
+from memory_budget import MemoryGovernor
+from normalize import TextNormalizer
+from offset_index import OffsetIndex
+from pipeline import DEFAULT_QUEUE_SIZE, Pipeline, Stage
+from profiling import DEFAULT_INTERVAL, DEFAULT_TOP, Profiler
+from spool import DEFAULT_BUDGET_MB, ChunkSpool
+from synthesis import DEFAULT_WINDOW
+from tts_backends import PYTTSX3, create_backend
+
+PLAY_ONLY = "Play Only"
+SAVE_MP3 = "Save as MP3"
+BOTH = "Both"
+OUTPUT_FORMATS = [PLAY_ONLY, SAVE_MP3, BOTH]
+
+
+@dataclass
+class ConversionSettings:
+    voice: Optional[str] = None
+    rate: int = 150
+    volume: float = 0.9
+    pause: float = 0.5
+    output_format: str = SAVE_MP3
+    output_dir: str = "."
+    filename: str = "audiobook"
+    batch_size: int = DEFAULT_WINDOW
+    min_chunk_chars: int = 0
+    max_chunk_chars: int = DEFAULT_MAX_CHARS
+    autotune: bool = False
+    bitrate: str = "64k"
+    write_index: bool = True
+    subtitle_formats: tuple = ()  # any of "srt", "lrc"
+    incremental: bool = False  # re-render only chunks changed since the last save
+    workers: tuple = ()  # "host:port" render workers; empty renders locally
+    backend: str = PYTTSX3  # see tts_backends
+    queue_size: int = DEFAULT_QUEUE_SIZE  # chunks buffered between pipeline stages
+    stage_workers: dict = field(default_factory=dict)  # e.g. {"postprocess": 2}
+    checkpoint: bool = False  # keep rendered chunks until the book is saved, to resume
+    spool_budget_mb: int = DEFAULT_BUDGET_MB  # RAM for chunk files before spilling
+    scratch_dir: Optional[str] = None  # local spill directory; default system temp
+    lexicon_file: Optional[str] = None  # "term = spoken form" pronunciation overrides
+    clean_text: bool = False  # drop running headers and page numbers, mend wraps (see cleanup)
+    normalize_text: bool = False  # numbers, dates, money, abbreviations as words (see normalize)
+    profile: bool = False  # write a flamegraph and slowest-chunks report (see profiling)
+    profile_top: int = DEFAULT_TOP
+    profile_interval: float = DEFAULT_INTERVAL
+    memory_budget_mb: int = 0  # RSS + RAM spool the job keeps under; 0 = no limit
+    hls: bool = False  # also write <name>_hls/index.m3u8 while converting (see hls)
+    hls_segment_seconds: float = DEFAULT_SEGMENT_SECONDS
+    cast: dict = field(default_factory=dict)  # speaker -> voice id for tagged dialogue
+
+    @property
+    def output_file(self):
+        return os.path.join(self.output_dir, f"{self.filename or 'audiobook'}.mp3")
+
+    def sidecar_file(self, extension):
+        """Path of a file stored next to the audio, e.g. the .idx index"""
+        return os.path.splitext(self.output_file)[0] + extension
+
+    @property
+    def plays(self):
+        return self.output_format in (PLAY_ONLY, BOTH)
+
+    @property
+    def saves(self):
+        return self.output_format in (SAVE_MP3, BOTH)
+
+    def chunk_policy(self):
+        return ChunkPolicy(max_chars=self.max_chunk_chars,
+                           min_chars=min(self.min_chunk_chars, self.max_chunk_chars))
+
+    def save(self, path):
+        """Write the settings as JSON, e.g. for the watch-folder daemon"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dataclasses.asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, path, **overrides):
+        """Settings saved by ``save``; unknown keys are ignored"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        values = {}
+        for spec in dataclasses.fields(cls):
+            if spec.name in data:
+                value = data[spec.name]
+                # JSON has no tuples
+                values[spec.name] = tuple(value) if isinstance(value, list) else value
+        values.update(overrides)
+        return cls(**values)
+
+
+def configure_engine(engine, settings):
+    if engine is None:
+        return
+    if settings.voice:
+        engine.setProperty('voice', settings.voice)
+    engine.setProperty('rate', settings.rate)
+    engine.setProperty('volume', settings.volume)
+
+
+def _no_progress(value=None, message=None):
+    pass
+
+
+def settings_lexicon(settings, progress=_no_progress):
+    """The pronunciation lexicon named by ``settings``, or None"""
+    if not settings.lexicon_file:
+        return None
+    try:
+        lexicon = load_lexicon(settings.lexicon_file)
+    except (OSError, UnicodeDecodeError) as e:
+        progress(None, f"Lexicon not loaded: {e}")
+        return None
+    progress(None, f"Lexicon: {len(lexicon)} entries")
+    return lexicon
+
+
+def settings_cleaner(settings, text):
+    """A ``TextCleaner`` for ``text`` if ``settings`` ask for clean-up, else None"""
+    return TextCleaner.for_text(text) if settings.clean_text else None
+
+
+def settings_normalizer(settings):
+    return TextNormalizer() if settings.normalize_text else None
+
+
+def chunk_spans(text, settings, policy=None):
+    """(start, end, voice) of every chunk; voice is None unless there is a cast"""
+    policy = policy or settings.chunk_policy()
+    if not settings.cast:
+        return ((start, end, None) for start, end in policy.iter_spans(text))
+    return voiced_spans(text, policy, settings.cast, settings.voice)
+
+
+def _word_span(chunk, location, length):
+    """Chunk-relative (start, end) of a started-word event.
+
+    Drivers disagree on whether ``location`` is 0- or 1-based (espeak reports
+    1-based positions), so use whichever lands on the start of a word.
+    """
+    for start in (location, location - 1):
+        if (0 <= start < len(chunk) and chunk[start].isalnum()
+                and (start == 0 or not chunk[start - 1].isalnum())):
+            return start, min(len(chunk), start + length)
+    return location, min(len(chunk), location + length)
+
+
+class ReadAlong:
+    """Forward the chunk and word being spoken as source text offsets"""
+
+    def __init__(self, engine, highlight=None, lock=None):
+        self.engine = engine
+        self.highlight = highlight
+        self.lock = lock or contextlib.nullcontext()
+        self.chunk = ""
+        self.offset = 0
+        self.speaking = False
+        self.token = engine.connect('started-word', self.on_word) if highlight else None
+
+    def speak(self, chunk, start, voice=None):
+        if self.highlight:
+            self.highlight(start, start + len(chunk))
+        self.chunk, self.offset = chunk, start
+        # Word events also fire while rendering files; only follow speech
+        with self.lock:
+            if voice:
+                self.engine.setProperty('voice', voice)
+            self.speaking = True
+            try:
+                self.engine.say(chunk)
+                self.engine.runAndWait()
+            finally:
+                self.speaking = False
+
+    def on_word(self, name=None, location=0, length=0, **kwargs):
+        if self.speaking and location is not None:
+            start, end = _word_span(self.chunk, location, length)
+            self.highlight(self.offset + start, self.offset + end)
+
+    def close(self):
+        if self.token is not None:
+            self.engine.disconnect(self.token)
+            self.token = None
+
+
+def speak_chunks(engine, text, spans, settings, progress=_no_progress,
+                 should_stop=lambda: False, highlight=None, gap=0.2):
+    """Speak the (start, end, voice) chunks of ``text`` aloud one after another"""
+    configure_engine(engine, settings)
+    # Speakers' voices stay set on the engine; narration selects its own again
+    narrator = settings.voice or engine.getProperty('voice')
+    lexicon = settings_lexicon(settings, progress)
+    cleaner = settings_cleaner(settings, text)
+    normalizer = settings_normalizer(settings)
+    read_along = ReadAlong(engine, highlight)
+    total_chunks = len(spans)
+    try:
+        for i, (start, end, voice) in enumerate(spans):
+            if should_stop():
+                return
+            progress(int((i + 1) / total_chunks * 100), f"Playing chunk {i+1}/{total_chunks}")
+            chunk = cleaner.apply(text[start:end]) if cleaner else text[start:end]
+            if lexicon and chunk:
+                chunk = lexicon.apply(chunk)
+            if normalizer and chunk:
+                chunk = normalizer.apply(chunk)
+            if chunk:
+                read_along.speak(chunk, start, voice or narrator)
+
+            # Short pause between chunks
+            if i < total_chunks - 1 and not should_stop():
+                time.sleep(gap)
+    finally:
+        read_along.close()
+    progress(None, "Playback complete")
+
+
+class ConversionJob:
+    """Split, synthesize, play and/or save one text with fixed settings"""
+
+    def __init__(self, engine, text, settings, progress=None, should_stop=None,
+                 highlight=None, codec=None):
+        self.engine = engine
+        self.text = text
+        self.settings = settings
+        self.progress = progress or _no_progress
+        self.should_stop = should_stop or (lambda: False)
+        self.highlight = highlight
+        self.codec = codec or CodecWorker()
+        self.pipeline = None
+        self._writer = None
+        self._hls = None
+        self._store = None
+        self.lexicon = None
+        self.cleaner = None
+        self.normalizer = None
+        self.chunk_voices = {}  # chunk index -> voice, for tagged dialogue
+        self.narrator_voice = None
+        self.profiler = None
+        self.governor = None
+        # Playback and file rendering share the engine from different stages
+        self.engine_lock = threading.Lock()
+
+    def run(self):
+        """Run the conversion; returns the saved file path, or None"""
+        if not self.settings.profile:
+            return self._run()
+        self.profiler = Profiler(self.settings.profile_interval)
+        try:
+            with self.profiler:
+                return self._run()
+        finally:
+            self._write_profile()
+
+    def _measure(self, stage, chunk=None):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.measure(stage, chunk)
+
+    def _write_profile(self):
+        stats = self.pipeline.stats if self.pipeline is not None else None
+        try:
+            folded, report = self.profiler.write(self.settings.output_file, stats,
+                                                 self.settings.profile_top)
+        except OSError as e:
+            self.progress(None, f"Profile not written: {e}")
+            return
+        self.progress(None, f"Profile written to {report} and {folded}")
+
+    def _run(self):
+        settings = self.settings
+        configure_engine(self.engine, settings)
+        policy = settings.chunk_policy()
+        self.lexicon = settings_lexicon(settings, self.progress)
+        self.cleaner = settings_cleaner(settings, self.text)
+        self.normalizer = settings_normalizer(settings)
+        self.narrator_voice = self._narrator_voice()
+
+        # An update keeps the previous run's chunking so unchanged text
+        # splits into the same chunks
+        previous = None
+        if settings.incremental and settings.saves and not settings.plays:
+            previous = ChunkManifest.load(settings.sidecar_file(MANIFEST_SUFFIX))
+            if previous is not None:
+                policy = ChunkPolicy(max_chars=previous.fingerprint["max_chunk_chars"],
+                                     min_chars=previous.fingerprint["min_chunk_chars"])
+
+        # Pick a chunk size for this machine if requested
+        if settings.autotune and previous is None and not settings.workers:
+            self.progress(None, "Tuning chunk size...")
+            with self._measure("autotune"):
+                # Measured on the backend that will render the book, and sized
+                # for the chunks its synthesize stage renders at once
+                backend = create_backend(settings.backend, self.engine, codec=self.codec,
+                                         jobs=settings.stage_workers.get("synthesize"),
+                                         lock=self.engine_lock)
+                backend.configure(settings.voice, settings.rate, settings.volume)
+                policy, timing = autotune(
+                    backend, self.text, backend.concurrency,
+                    min_chars=max(50, policy.min_chars),
+                    max_chars=policy.max_chars
+                )
+            self.progress(None, f"Chunk size {policy.max_chars} chars "
+                                f"({timing.overhead * 1000:.0f} ms overhead/chunk)")
+
+        # Intermediate chunk files live in RAM or local scratch, never in
+        # the output directory
+        spool = ChunkSpool(settings.spool_budget_mb, settings.scratch_dir)
+        read_along = ReadAlong(self.engine, self.highlight if settings.plays else None,
+                               lock=self.engine_lock)
+        try:
+            if previous is not None:
+                if can_update(previous, settings.output_file, fingerprint(settings, policy)):
+                    spans, chunks = [], []
+                    for span, chunk in self._chunks(policy):
+                        spans.append(span)
+                        chunks.append(chunk)
+                    with self._measure("update"):
+                        return self._update(previous, chunks, spans, spool)
+                self.progress(None, "Settings or output changed - converting everything")
+            return self._convert(policy, spool, read_along)
+        finally:
+            read_along.close()
+            spool.close()
+
+    def _convert(self, policy, spool, read_along):
+        """Segment -> synthesize -> post-process -> encode -> write, overlapped"""
+        settings = self.settings
+        text_end = max(1, len(self.text.rstrip()))
+
+        save_to_file = settings.saves
+        if save_to_file and not self.codec.ffmpeg:
+            self.progress(None, "ffmpeg not available - cannot save MP3")
+            save_to_file = False
+
+        # Segment: chunks are split off lazily as the next stage asks for them
+        segments = ((i, chunk, span)
+                    for i, (span, chunk) in enumerate(self._chunks(policy)))
+        stages = []
+        self._store = None
+        if save_to_file:
+            # Opt-in: compressing every chunk a second time and writing it out
+            # costs CPU and disk a plain conversion does not need
+            if settings.checkpoint:
+                self._store = checkpoint_store(settings.output_file, fingerprint(settings, policy))
+                if len(self._store):
+                    self.progress(None, f"Resuming: {len(self._store)} chunks already rendered")
+            workers = settings.stage_workers
+            stages = [
+                Stage("synthesize", lambda items: self._synthesize_stage(items, spool),
+                      stream=True),
+                Stage("postprocess", self._postprocess_stage,
+                      workers=workers.get("postprocess", 1)),
+                Stage("encode", lambda item: self._encode_stage(item, policy)),
+            ]
+        self.governor = None
+        if settings.memory_budget_mb > 0:
+            self.governor = self._make_governor(stages, spool)
+            segments = self._admitted(segments)
+        self.pipeline = Pipeline(segments, stages, queue_size=settings.queue_size,
+                                 should_stop=self.should_stop, profiler=self.profiler,
+                                 governor=self.governor)
+
+        # Write: the offset index is filled in as encoded chunks come out
+        self._writer = None
+        self._hls = None
+        index = None
+        try:
+            for item in self.pipeline:
+                i, chunk, span = item[:3]
+                if self.profiler is not None:
+                    self.profiler.label(i, chunk)
+                with self._measure("write", i):
+                    if save_to_file:
+                        sample_start, sample_end = item[3:]
+                        if index is None:
+                            index = OffsetIndex(self._writer.manifest.sample_rate)
+                        index.add(self.text, span[0], span[1], sample_start, sample_end)
+
+                    # Update progress
+                    self.progress(int(span[1] / text_end * 100), f"Processing chunk {i+1}")
+                    if self.highlight and not settings.plays:
+                        self.highlight(*span)
+
+                    # Play chunk if requested
+                    if settings.plays:
+                        read_along.speak(chunk, span[0], self._voice(i) or self.narrator_voice)
+
+                        # Pause between chunks
+                        if span[1] < text_end and not self.should_stop():
+                            time.sleep(settings.pause)
+                if self.governor is not None:
+                    self.governor.observe("write")
+                    self.governor.release(i)
+        except BaseException:
+            self._abort_output()
+            raise
+        finally:
+            if self._store is not None:
+                self._store.close()
+            if self.governor is not None:
+                self.governor.close()
+
+        if self.should_stop():
+            self._abort_output()
+            return None
+        for text_filter in (self.cleaner, self.normalizer):
+            if text_filter is not None:
+                self.progress(None, text_filter.summary())
+
+        # Finish the MP3 file
+        if self._writer is not None:
+            with self._measure("finish"):
+                try:
+                    self._writer.close()
+                except Exception as e:
+                    self.progress(None, f"Error saving MP3: {str(e)}")
+                    return None
+                if self._store is not None:
+                    self._store.remove()
+                self._writer.manifest.save(settings.sidecar_file(MANIFEST_SUFFIX))
+                self._write_timing_files(index)
+                if self._hls is not None:
+                    self._hls.close()
+            if self.governor is not None:
+                self.progress(None, self.governor.summary())
+            self.progress(100, f"Conversion complete! Saved to {settings.output_file}")
+            return settings.output_file
+
+        self.progress(100, "Conversion complete!")
+        return None
+
+    def _abort_output(self):
+        if self._writer is not None:
+            self._writer.abort()
+        if self._hls is not None:
+            self._hls.abort()
+
+    def _make_governor(self, stages, spool):
+        # At most this many chunks can be queued or worked on at once anyway
+        capacity = (self.settings.queue_size * (len(stages) + 1)
+                    + sum(stage.workers for stage in stages))
+        governor = MemoryGovernor(self.settings.memory_budget_mb, capacity)
+        governor.add_source(spool.ram_bytes)
+        governor.add_flusher(spool.shrink)
+        return governor
+
+    def _admitted(self, segments):
+        for segment in segments:
+            if not self.governor.admit(segment[0], self.should_stop):
+                return
+            yield segment
+
+    def _track(self, i, sound):
+        if self.governor is not None:
+            self.governor.track(i, sound.nbytes)
+
+    def _chunks(self, policy):
+        """Yield ((start, end), spoken text) of every chunk with something to say"""
+        # Records each chunk's voice as the chunk is split off
+        i = 0
+        for start, end, voice in chunk_spans(self.text, self.settings, policy):
+            chunk = self._spoken(start, end)
+            if not chunk:
+                continue  # nothing but page furniture
+            if voice is not None:
+                self.chunk_voices[i] = voice
+            yield (start, end), chunk
+            i += 1
+
+    def _voice(self, i):
+        return self.chunk_voices.get(i)
+
+    def _narrator_voice(self):
+        # Speakers' voices stay set on a shared engine, so narration has to
+        # name its voice rather than leave the engine as it is.  espeak-ng
+        # and render workers start each request from their default voice.
+        settings = self.settings
+        if settings.voice or not settings.cast or settings.workers \
+                or settings.backend != PYTTSX3:
+            return settings.voice
+        if self.engine is None:
+            self.engine = create_backend(PYTTSX3).engine
+        return self.engine.getProperty('voice')
+
+    def _spoken(self, start, end):
+        # Chunks carry the text as it is to be spoken; digests follow it, so
+        # a lexicon change re-renders exactly the chunks it affects
+        chunk = self.text[start:end]
+        if self.cleaner is not None:
+            chunk = self.cleaner.apply(chunk)
+        # The lexicon sees the text as written, so its entries win over
+        # the generic expansions
+        if self.lexicon is not None and chunk:
+            chunk = self.lexicon.apply(chunk)
+        if self.normalizer is not None and chunk:
+            chunk = self.normalizer.apply(chunk)
+        return chunk
+
+    def _synthesize_stage(self, items, spool):
+        # Checkpointed chunks skip the engine; they are read back only when
+        # their turn comes so a long resumed run holds no audio in advance
+        store = self._store
+        pending = collections.deque()
+
+        def texts():
+            for i, chunk, span in items:
+                digest = chunk_digest(chunk, self._voice(i))
+                cached = store is not None and digest in store
+                pending.append((i, chunk, span, digest, cached))
+                if not cached:
+                    yield i, chunk
+                elif self.governor is not None:
+                    # Read back only when its turn comes; holds nothing until then
+                    self.governor.release(i)
+
+        def restored():
+            while pending and pending[0][4]:
+                i, chunk, span, digest, _ = pending.popleft()
+                sound = store.get(digest)
+                self._track(i, sound)
+                yield i, chunk, span, digest, sound, True
+
+        for i, chunk, sound in self._render(texts(), spool):
+            yield from restored()
+            _, _, span, digest, _ = pending.popleft()
+            self._track(i, sound)
+            yield i, chunk, span, digest, sound, False
+        yield from restored()
+
+    def _postprocess_stage(self, item):
+        # Checkpoint and pad to whole MP3 frames off the encoder's thread
+        i, chunk, span, digest, sound, cached = item
+        if self._store is not None and not cached:
+            self._store.put(digest, sound)
+        segment = pad_to_frames(sound, self.settings.pause)
+        self._track(i, segment)
+        return i, chunk, span, segment, sound.frames, digest
+
+    def _encode_stage(self, item, policy):
+        i, chunk, span, segment, speech_frames, digest = item
+        if self._writer is None:
+            self._writer = SpliceEncoder(self.codec, self.settings.output_file, segment.format,
+                                         self.settings.bitrate, self.settings.pause,
+                                         fingerprint(self.settings, policy, segment.format))
+            if self.settings.hls:
+                self._hls = HlsWriter(self.settings.output_file,
+                                      segment_seconds=self.settings.hls_segment_seconds)
+                self.progress(None, f"Streaming to {self._hls.playlist}")
+        sample_start, sample_end = self._writer.write_segment(segment, speech_frames, digest)
+        if self._hls is not None:
+            # Picks up whatever ffmpeg has flushed to the file so far
+            self._hls.poll()
+        return i, chunk, span, sample_start, sample_end
+
+    def _render(self, items, spool):
+        """Yield (index, text, PcmAudio) for (index, text) items, in order"""
+        settings = self.settings
+        if settings.cast:
+            router = VoiceRouter(lambda voice: self._backend(voice or self.narrator_voice,
+                                                             spool, pin_voice=True))
+            if self.governor is not None:
+                self.governor.set_floor(router.lookahead)
+            yield from router.render(((i, chunk, self._voice(i)) for i, chunk in items),
+                                     self.should_stop)
+            return
+        backend = self._backend(settings.voice, spool)
+        if self.governor is not None:
+            self.governor.set_floor(backend.lookahead)
+        yield from backend.render(items, self.should_stop)
+
+    def _backend(self, voice, spool, pin_voice=False):
+        settings = self.settings
+        if settings.workers:
+            # Each worker process has its own engine, so voices switched
+            # there never touch this process's engine
+            backend = RemoteBackend.from_settings(settings, self.codec, spool)
+        else:
+            backend = create_backend(settings.backend, self.engine, window=settings.batch_size,
+                                     codec=self.codec, spool=spool,
+                                     jobs=settings.stage_workers.get("synthesize"),
+                                     lock=self.engine_lock, pin_voice=pin_voice)
+        backend.configure(voice, settings.rate, settings.volume)
+        return backend
+
+    def _update(self, previous, chunks, spans, spool):
+        """Re-render only chunks missing from ``previous`` and splice the book"""
+        settings = self.settings
+        digests = [chunk_digest(chunk, self._voice(i)) for i, chunk in enumerate(chunks)]
+        reusable = previous.by_digest()
+
+        # Each new piece of text is rendered once, however often it occurs
+        changed = []
+        seen = set()
+        for i, digest in enumerate(digests):
+            if digest not in reusable and digest not in seen:
+                seen.add(digest)
+                changed.append(i)
+        self.progress(0, f"Re-rendering {len(changed)} of {len(chunks)} chunks")
+
+        fresh = {}
+        fresh_file = spool.path("changed.mp3")
+        if changed:
+            fresh = self._render_changed(previous, changed, chunks, digests,
+                                         spool, fresh_file)
+            if fresh is None:
+                return None
+
+        # Copy every chunk's frames from the old book or the fresh render
+        frame_offsets = {settings.output_file: scan_frames(settings.output_file)}
+        if fresh:
+            frame_offsets[fresh_file] = scan_frames(fresh_file)
+        frame = previous.frame
+        manifest = ChunkManifest(previous.fingerprint, previous.sample_rate)
+        index = OffsetIndex(previous.sample_rate)
+        pieces = []
+        position = 0
+        for i, digest in enumerate(digests):
+            source = settings.output_file if digest in reusable else fresh_file
+            start, speech_end, end = (reusable if digest in reusable else fresh)[digest]
+            offsets = frame_offsets[source]
+            pieces.append((source, offsets[start // frame], offsets[end // frame]))
+            manifest.add(digest, position, speech_end - start, end - start)
+            index.add(self.text, spans[i][0], spans[i][1],
+                      position, position + speech_end - start)
+            position += end - start
+
+        splice_files(settings.output_file, pieces)
+        manifest.save(settings.sidecar_file(MANIFEST_SUFFIX))
+        self._write_timing_files(index)
+        if settings.hls:
+            segment_file(settings.output_file, segment_seconds=settings.hls_segment_seconds)
+        self.progress(100, f"Update complete! Re-rendered {len(changed)} of "
+                           f"{len(chunks)} chunks in {settings.output_file}")
+        return settings.output_file
+
+    def _render_changed(self, previous, changed, chunks, digests, spool, fresh_file):
+        """Encode the changed chunks into ``fresh_file``; returns their segments"""
+        rendered = self._render(((i, chunks[i]) for i in changed), spool)
+        expected_format = tuple(previous.fingerprint["format"])
+        writer = None
+        try:
+            for n, (i, chunk, sound) in enumerate(rendered):
+                if self.should_stop():
+                    break
+                self.progress(int((n + 1) / len(changed) * 100),
+                              f"Rendering changed chunk {n+1}/{len(changed)}")
+                if sound.format != expected_format:
+                    raise RuntimeError("The voice now renders a different audio format; "
+                                       "convert the whole book again")
+                if writer is None:
+                    writer = SpliceEncoder(self.codec, fresh_file, sound.format,
+                                           self.settings.bitrate, self.settings.pause,
+                                           previous.fingerprint)
+                writer.write_chunk(sound, digests[i])
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+
+        if self.should_stop():
+            if writer is not None:
+                writer.abort()
+            return None
+        writer.close()
+        return writer.manifest.by_digest()
+
+    def _write_timing_files(self, index):
+        settings = self.settings
+        if index is None:
+            return
+        if settings.write_index:
+            index.save(settings.sidecar_file(".idx"))
+        for fmt in settings.subtitle_formats:
+            content = index.to_srt(self.text) if fmt == "srt" else index.to_lrc(self.text)
+            with open(settings.sidecar_file(f".{fmt}"), "w", encoding="utf-8") as f:
+                f.write(content)
@@ -0,0 +1,139 @@
+"""Multi-voice rendering of speaker-tagged text.
+
+A paragraph that starts with a speaker tag is spoken by that speaker's
+voice; every other paragraph is narration::
+
+    The door creaked open.
+
+    [Alice] Who's there?
+
+    [Bob] Only me.
+
+``ConversionSettings.cast`` maps speaker names (case-insensitive) to voice
+ids; ``narrator`` in the cast overrides the narration voice, and speakers
+missing from it are read by the narrator.  Tags are not spoken, and chunk
+offsets still point into the original text so read-along highlighting works.
+
+Switching voices on an engine between chunks is slow, so chunks are not
+rendered in text order.  A ``VoiceRouter`` reads a window of chunks, groups
+them by voice, hands each group to a backend set up for that voice and puts
+the results back in order: a window with three voices costs three voice
+changes however the lines alternate.  Backends that render in parallel
+(espeak-ng) run their groups at the same time.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from chunking import paragraph_spans
+
+NARRATOR = "narrator"
+DEFAULT_ROUTER_WINDOW = 32  # chunks grouped by voice at a time
+
+SPEAKER_TAG = re.compile(r"\[([^\[\]\n]{1,40})\][ \t]*")
+
+
+def speaker_segments(text):
+    """Yield (speaker, start, end) runs of ``text``; speaker is None for narration"""
+    narration = None
+    for start, end in paragraph_spans(text):
+        match = SPEAKER_TAG.match(text, start, end)
+        if match is None:
+            narration = (narration[0] if narration else start, end)
+            continue
+        if narration is not None:
+            yield None, narration[0], narration[1]
+            narration = None
+        body_start = match.end()
+        if body_start < end:
+            yield match.group(1).strip(), body_start, end
+    if narration is not None:
+        yield None, narration[0], narration[1]
+
+
+def speakers(text):
+    """Speaker names tagged in ``text``, in order of first appearance"""
+    seen = {}
+    for speaker, _, _ in speaker_segments(text):
+        if speaker is not None:
+            seen.setdefault(speaker.lower(), speaker)
+    return list(seen.values())
+
+
+def resolve_voice(speaker, cast, default_voice=None):
+    cast = {name.lower(): voice for name, voice in cast.items()}
+    narrator = cast.get(NARRATOR) or default_voice
+    if speaker is None:
+        return narrator
+    return cast.get(speaker.lower()) or narrator
+
+
+def voiced_spans(text, policy, cast, default_voice=None):
+    """Yield (start, end, voice) chunks; no chunk spans a change of speaker"""
+    for speaker, segment_start, segment_end in speaker_segments(text):
+        voice = resolve_voice(speaker, cast, default_voice)
+        segment = text[segment_start:segment_end]
+        for start, end in policy.iter_spans(segment):
+            yield segment_start + start, segment_start + end, voice
+
+
+class VoiceRouter:
+    """Render (index, text, voice) items on one backend per voice, in order.
+
+    ``make_backend(voice)`` returns a backend configured for ``voice``; it is
+    called once per voice.
+    """
+
+    def __init__(self, make_backend, window=DEFAULT_ROUTER_WINDOW):
+        self.make_backend = make_backend
+        self.window = max(1, int(window))
+        self.backends = {}
+        self.stats = {"windows": 0, "groups": 0}
+
+    @property
+    def lookahead(self):
+        return self.window
+
+    def backend(self, voice):
+        if voice not in self.backends:
+            self.backends[voice] = self.make_backend(voice)
+        return self.backends[voice]
+
+    def render(self, items, should_stop=None):
+        """Yield (index, text, PcmAudio) for (index, text, voice) items, in order"""
+        should_stop = should_stop or (lambda: False)
+        window = []
+        for item in items:
+            window.append(item)
+            if len(window) >= self.window:
+                yield from self._render_window(window, should_stop)
+                window = []
+        if window:
+            yield from self._render_window(window, should_stop)
+
+    def _render_window(self, window, should_stop):
+        groups = {}
+        for index, text, voice in window:
+            groups.setdefault(voice, []).append((index, text))
+        self.stats["windows"] += 1
+        self.stats["groups"] += len(groups)
+
+        def render_group(voice):
+            backend = self.backend(voice)
+            return {index: audio for index, _, audio in
+                    backend.render(groups[voice], should_stop)}
+
+        results = {}
+        parallel = [voice for voice in groups if self.backend(voice).capabilities.parallel]
+        with ThreadPoolExecutor(max_workers=max(1, len(parallel))) as pool:
+            futures = [pool.submit(render_group, voice) for voice in parallel]
+            # Backends sharing one engine take their turns on this thread
+            for voice in groups:
+                if voice not in parallel:
+                    results.update(render_group(voice))
+            for future in futures:
+                results.update(future.result())
+
+        for index, text, _ in window:
+            if should_stop() or index not in results:
+                return
+            yield index, text, results.pop(index)
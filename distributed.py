@@ -0,0 +1,584 @@
+"""Distributed chunk rendering over HTTP.
+
+A render worker is a small HTTP server wrapping the speech backends::
+
+    python distributed.py worker --port 8765
+
+A coordinator shards a job's chunks over any number of workers and hands the
+rendered files back in document order, so ``DistributedSynthesizer`` is a
+drop-in replacement for ``BatchSynthesizer`` (``ConversionSettings.workers``
+selects it).  To convert a file over workers, or over local worker processes
+started just for the run::
+
+    python distributed.py render book.txt --workers host1:8765 host2:8765
+    python distributed.py render book.txt --local 4
+
+Protocol: ``POST /render`` with a JSON body ``{"backend", "voice", "rate",
+"volume", "chunks": [[index, text], ...]}``; the reply is, for each chunk, a
+little-endian (uint32 index, uint64 length) header followed by that many
+bytes of WAV audio.  ``GET /health`` answers ``ok``.
+
+Chunks are read lazily and handed out in batches to whichever worker is
+free, front of the book first, so the coordinator can stream it to the
+encoder while later chunks are still rendering; reading stops a few
+batches ahead of what has been handed on.  A failed request puts its
+chunks back for a worker that has not failed them to retry, up to
+``MAX_ATTEMPTS`` times per chunk, and a worker that fails
+``MAX_WORKER_FAILURES`` times in a row is dropped from the job.  A job
+whose chunk cannot be rendered, whether it ran out of attempts or every
+worker was dropped, fails with ``SynthesisError``.
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from audio_codec import CodecWorker, wav_bytes
+from spool import ChunkSpool
+from synthesis import SynthesisError
+from tts_backends import PYTTSX3, BackendCapabilities, TTSBackend, create_backend
+
+DEFAULT_PORT = 8765
+DEFAULT_BATCH = 4
+REQUEST_TIMEOUT = 300
+MAX_ATTEMPTS = 3
+MAX_WORKER_FAILURES = 3
+RETRY_BACKOFF = 0.5  # seconds, doubled after each consecutive failure
+
+_CHUNK_HEADER = struct.Struct("<IQ")  # chunk index, WAV byte count
+# A request that failed in one of these ways is retried on another worker
+RENDER_ERRORS = (OSError, ValueError, http.client.HTTPException)
+
+
+def encode_results(results):
+    """Serialise [(index, wav_bytes), ...] for a /render reply"""
+    return b"".join(_CHUNK_HEADER.pack(index, len(data)) + data for index, data in results)
+
+
+def decode_results(payload):
+    results = {}
+    position = 0
+    while position < len(payload):
+        if position + _CHUNK_HEADER.size > len(payload):
+            raise ValueError("Truncated render reply")
+        index, length = _CHUNK_HEADER.unpack_from(payload, position)
+        position += _CHUNK_HEADER.size
+        if position + length > len(payload):
+            raise ValueError("Truncated render reply")
+        results[index] = payload[position:position + length]
+        position += length
+    return results
+
+
+# Worker side
+
+class RenderWorker:
+    """Render batches of chunks to WAV bytes, one batch at a time"""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.backends = {}
+        self.lock = threading.Lock()
+
+    def render(self, backend, voice, rate, volume, chunks):
+        with self.lock:
+            if backend not in self.backends:
+                self.backends[backend] = create_backend(backend, self.engine)
+            renderer = self.backends[backend]
+            renderer.configure(voice, rate, volume)
+            return [(index, wav_bytes(audio)) for index, _, audio in renderer.render(chunks)]
+
+
+class _WorkerHandler(BaseHTTPRequestHandler):
+    worker = None  # set on the per-server subclass
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error(404)
+            return
+        self._reply(b"ok", "text/plain")
+
+    def do_POST(self):
+        if self.path != "/render":
+            self.send_error(404)
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            results = self.worker.render(request.get("backend", PYTTSX3), request.get("voice"),
+                                         request.get("rate", 150), request.get("volume", 0.9),
+                                         request["chunks"])
+        except Exception as e:
+            self.send_error(500, str(e)[:200])
+            return
+        self._reply(encode_results(results), "application/octet-stream")
+
+    def _reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_worker_server(port=DEFAULT_PORT, host="0.0.0.0", worker=None):
+    handler = type("WorkerHandler", (_WorkerHandler,), {"worker": worker or RenderWorker()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def spawn_local_workers(count, startup_timeout=30):
+    """Start ``count`` worker processes on this machine; returns (processes, addresses)
+
+    Each worker listens on a free port the system picks and writes it to a
+    file, so a worker left over from another run or instance can never
+    answer in place of the one just started.
+    """
+    script = os.path.abspath(__file__)
+    directory = tempfile.mkdtemp(prefix="render_workers_")
+    processes, port_files = [], []
+    try:
+        for n in range(count):
+            port_file = os.path.join(directory, f"worker_{n}.port")
+            processes.append(subprocess.Popen(
+                [sys.executable, script, "worker", "--host", "127.0.0.1", "--port", "0",
+                 "--port-file", port_file]))
+            port_files.append(port_file)
+
+        deadline = time.monotonic() + startup_timeout
+        addresses = []
+        for n, (process, port_file) in enumerate(zip(processes, port_files)):
+            while True:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    stop_local_workers(processes)
+                    raise RuntimeError(f"Render worker {n + 1} of {count} did not start")
+                port = _read_port(port_file)
+                if port is not None and _healthy(f"127.0.0.1:{port}"):
+                    break
+                time.sleep(0.2)
+            addresses.append(f"127.0.0.1:{port}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return processes, addresses
+
+
+def stop_local_workers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def _read_port(path):
+    try:
+        with open(path, encoding="ascii") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _healthy(address):
+    try:
+        with urllib.request.urlopen(f"http://{address}/health", timeout=2) as reply:
+            return reply.read() == b"ok"
+    except OSError:
+        return False
+
+
+# Coordinator side
+
+class ShardQueue:
+    """Batches cut from a chunk iterator as workers ask for them, retries first.
+
+    Batches are cut in document order, so the front of the book finishes
+    first, and only while fewer than ``ahead`` chunks are read but not yet
+    handed on by the coordinator: a slow consumer holds the workers back
+    instead of the whole book being read in.  A retried batch goes to a
+    live worker that has not failed it yet when there is one, so a dead
+    host cannot use up a chunk's attempts on its own; the workers that
+    failed a batch add up over its attempts.  A worker with nothing to take
+    waits while other batches are in flight, since any of them may still
+    come back for a retry.
+    """
+
+    def __init__(self, items, workers, batch=DEFAULT_BATCH, ahead=None):
+        self.lock = threading.Condition()
+        self.source = enumerate(items)
+        self.batch = max(1, int(batch))
+        self.ahead = ahead or self.batch * len(workers) * 2
+        self.items = {}  # position -> item, from being read until handed on
+        self.read = 0  # chunks read from the iterator
+        self.released = 0  # chunks handed on
+        self.reading = False
+        self.exhausted = False
+        self.source_error = None
+        self.retries = collections.deque()  # (batch, workers that failed it)
+        self.live = set(workers)
+        self.taken = {}  # worker -> (its current batch, workers that failed it)
+        self.closed = False
+
+    def take(self, worker, should_stop=None, poll=0.5):
+        """Next batch for ``worker``, or None once every batch is done"""
+        should_stop = should_stop or (lambda: False)
+        while True:
+            with self.lock:
+                while True:
+                    if self.closed or should_stop():
+                        return None
+                    entry = self._retry(worker)
+                    if entry is not None:
+                        self.taken[worker] = entry
+                        return entry[0]
+                    if (not self.exhausted and not self.reading
+                            and self.read < self.released + self.ahead):
+                        self.reading = True
+                        break
+                    if self.drained(self.read) and not self.taken and not self.retries:
+                        return None
+                    self.lock.wait(poll)
+            # The iterator may block (memory admission), so it is read
+            # without holding up workers handing batches back
+            batch = self._read()
+            if batch:
+                with self.lock:
+                    self.taken[worker] = (batch, frozenset())
+                return batch
+
+    def _retry(self, worker):
+        others = self.live - {worker}
+        for entry in self.retries:
+            # Only a worker that failed the batch before when no other can
+            if worker not in entry[1] or not others - entry[1]:
+                self.retries.remove(entry)
+                return entry
+        return None
+
+    def _read(self):
+        read, error = [], None
+        try:
+            for _ in range(self.batch):
+                entry = next(self.source, None)
+                if entry is None:
+                    break
+                read.append(entry)
+        except Exception as e:
+            error = e
+        with self.lock:
+            for position, item in read:
+                self.items[position] = item
+            self.read += len(read)
+            if error is not None or len(read) < self.batch:
+                self.exhausted = True
+                self.source_error = error
+            self.reading = False
+            self.lock.notify_all()
+        return [(position, 0) for position, _ in read]
+
+    def drained(self, position):
+        """Whether the iterator ended before ``position``"""
+        return self.exhausted and not self.reading and position >= self.read
+
+    def release(self, position):
+        """The coordinator has handed on the chunk at ``position``"""
+        with self.lock:
+            self.items.pop(position, None)
+            self.released = position + 1
+            self.lock.notify_all()
+
+    def done(self, worker):
+        with self.lock:
+            self.taken.pop(worker, None)
+            self.lock.notify_all()
+
+    def put_back(self, batch, failed_by):
+        with self.lock:
+            _, failers = self.taken.pop(failed_by, (None, frozenset()))
+            self.retries.append((batch, failers | {failed_by}))
+            self.lock.notify_all()
+
+    def retire(self, worker):
+        """``worker`` takes no more batches; a batch it still holds goes back"""
+        with self.lock:
+            self.live.discard(worker)
+            if worker in self.taken:
+                batch, failers = self.taken.pop(worker)
+                self.retries.append((batch, failers | {worker}))
+            self.lock.notify_all()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+
+
+class DistributedSynthesizer:
+    """Render (index, text, path) items on remote workers, yielding them in order"""
+
+    def __init__(self, workers, voice=None, rate=150, volume=0.9, batch=DEFAULT_BATCH,
+                 should_stop=None, timeout=REQUEST_TIMEOUT, backend=PYTTSX3):
+        if not workers:
+            raise ValueError("No render workers given")
+        self.workers = list(workers)
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self.backend = backend
+        self.batch = max(1, int(batch))
+        self.should_stop = should_stop or (lambda: False)
+        self.timeout = timeout
+        self.stats = {"chunks": 0, "retries": 0,
+                      "per_worker": {worker: 0 for worker in self.workers}}
+
+    @classmethod
+    def from_settings(cls, settings, should_stop=None):
+        return cls(settings.workers, settings.voice, settings.rate, settings.volume,
+                   batch=settings.batch_size, should_stop=should_stop,
+                   backend=settings.backend)
+
+    @property
+    def lookahead(self):
+        """Chunks read from the input before the first is yielded, at most"""
+        return self.batch * len(self.workers) * 2
+
+    def synthesize(self, items):
+        """Yield each (index, text, path) item, in order, once its file exists"""
+        queue = ShardQueue(items, self.workers, self.batch, self.lookahead)
+        done = queue.lock
+        state = {"finished": set(), "error": None, "last_failure": None,
+                 "live": len(self.workers), "closed": False}
+
+        def run(worker):
+            failures = 0
+            try:
+                while not self.should_stop():
+                    with done:
+                        if state["error"] is not None or state["closed"]:
+                            return
+                    pending = queue.take(worker, self.should_stop)
+                    if pending is None:
+                        return
+                    try:
+                        self._render(worker, queue.items, pending)
+                    except RENDER_ERRORS as e:
+                        failures += 1
+                        retry = []
+                        with done:
+                            state["last_failure"] = f"{worker}: {e}"
+                        for position, attempts in pending:
+                            if attempts + 1 >= MAX_ATTEMPTS:
+                                index, text, _ = queue.items[position]
+                                with done:
+                                    state["error"] = SynthesisError(index, text, f"{worker}: {e}")
+                                    done.notify_all()
+                                queue.close()
+                                return
+                            retry.append((position, attempts + 1))
+                        with done:
+                            self.stats["retries"] += len(retry)
+                        queue.put_back(retry, worker)
+                        if failures >= MAX_WORKER_FAILURES:
+                            return
+                        # Back off so healthy workers pick the retry up first
+                        time.sleep(RETRY_BACKOFF * 2 ** (failures - 1))
+                        continue
+                    failures = 0
+                    with done:
+                        state["finished"].update(position for position, _ in pending)
+                        self.stats["per_worker"][worker] += len(pending)
+                        done.notify_all()
+                    queue.done(worker)
+            finally:
+                queue.retire(worker)
+                with done:
+                    state["live"] -= 1
+                    done.notify_all()
+
+        threads = [threading.Thread(target=run, args=(worker,), daemon=True)
+                   for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        position = 0
+        try:
+            while True:
+                with done:
+                    while (position not in state["finished"] and state["error"] is None
+                           and state["live"] > 0 and not self.should_stop()
+                           and not queue.drained(position)):
+                        done.wait(0.5)
+                    if state["error"] is not None:
+                        raise state["error"]
+                    if queue.source_error is not None:
+                        raise queue.source_error
+                    if position not in state["finished"]:
+                        if self.should_stop() or queue.drained(position):
+                            return
+                        # Every worker was dropped before a chunk ran out of attempts
+                        index, text, _ = queue.items[position]
+                        raise SynthesisError(index, text, "every render worker failed; last: "
+                                                          f"{state['last_failure']}")
+                    item = queue.items[position]
+                queue.release(position)
+                self.stats["chunks"] += 1
+                yield item
+                position += 1
+        finally:
+            queue.close()
+            with done:
+                state["closed"] = True
+
+    def _render(self, worker, items, pending):
+        body = json.dumps({
+            "backend": self.backend, "voice": self.voice, "rate": self.rate, "volume": self.volume,
+            "chunks": [[items[position][0], items[position][1]] for position, _ in pending],
+        }).encode("utf-8")
+        request = urllib.request.Request(f"http://{worker}/render", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as reply:
+            results = decode_results(reply.read())
+        for position, _ in pending:
+            index, _, path = items[position]
+            if index not in results:
+                raise ValueError(f"Worker returned no audio for chunk {index + 1}")
+            with open(path, "wb") as f:
+                f.write(results[index])
+
+
+class RemoteBackend(TTSBackend):
+    """A ``TTSBackend`` that renders on render workers.
+
+    Lets code written against backends, such as the per-voice routing of
+    tagged dialogue, render in the workers' processes instead of on a local
+    engine.
+    """
+
+    capabilities = BackendCapabilities(batching=True, parallel=False, platform_voices=False)
+
+    def __init__(self, workers, backend=PYTTSX3, batch=DEFAULT_BATCH, codec=None, spool=None,
+                 timeout=REQUEST_TIMEOUT):
+        super().__init__()
+        self.workers = tuple(workers)
+        self.name = backend
+        self.batch = batch
+        self.codec = codec or CodecWorker()
+        self.spool = spool
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls, settings, codec=None, spool=None):
+        return cls(settings.workers, settings.backend, settings.batch_size, codec, spool)
+
+    @property
+    def lookahead(self):
+        return self.batch
+
+    def synthesize(self, text):
+        for _, _, audio in self.render([(0, text)]):
+            return audio
+        raise SynthesisError(0, text, "no audio written")
+
+    def render(self, items, should_stop=None):
+        if self.spool is not None:
+            yield from self._render(items, self.spool, should_stop)
+            return
+        with ChunkSpool() as spool:
+            yield from self._render(items, spool, should_stop)
+
+    def _render(self, items, spool, should_stop):
+        synthesizer = DistributedSynthesizer(self.workers, self.voice, self.rate, self.volume,
+                                             batch=self.batch, should_stop=should_stop,
+                                             timeout=self.timeout, backend=self.name)
+        for index, text, path in synthesizer.synthesize(
+                (index, text, spool.path(f"chunk_{index}.wav")) for index, text in items):
+            audio = self.codec.decode(path)
+            spool.release(path)
+            yield index, text, audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="Serve a render worker")
+    worker.add_argument("--host", default="0.0.0.0")
+    worker.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="0 picks a free port")
+    worker.add_argument("--port-file", help="Write the port listened on to this file")
+
+    render = commands.add_parser("render", help="Convert a text file over workers")
+    render.add_argument("input")
+    render.add_argument("--workers", nargs="+", default=[], metavar="HOST:PORT")
+    render.add_argument("--local", type=int, default=0,
+                        help="Start this many worker processes on this machine")
+    render.add_argument("--output-dir", default=".")
+    render.add_argument("--filename")
+    render.add_argument("--backend", default=PYTTSX3)
+    render.add_argument("--voice")
+    render.add_argument("--rate", type=int, default=150)
+    render.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    render.add_argument("--lexicon", help="Pronunciation lexicon file")
+    render.add_argument("--clean", action="store_true",
+                        help="Strip page headers and numbers, repair line wraps")
+    render.add_argument("--normalize", action="store_true",
+                        help="Read numbers, dates, money and abbreviations as words")
+    render.add_argument("--profile", action="store_true",
+                        help="Write a flamegraph and slowest-chunks report")
+    render.add_argument("--memory-budget", type=int, default=0, metavar="MB",
+                        help="Throttle the job to stay under this much memory")
+    render.add_argument("--hls", action="store_true",
+                        help="Also write an HLS playlist and segments while converting")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        server = make_worker_server(args.port, args.host)
+        port = server.server_address[1]
+        if args.port_file:
+            # Written whole, so the parent never reads half a number
+            with open(args.port_file + ".tmp", "w", encoding="ascii") as f:
+                f.write(str(port))
+            os.replace(args.port_file + ".tmp", args.port_file)
+        print(f"Render worker listening on {args.host}:{port}")
+        server.serve_forever()
+        return
+
+    from conversion import SAVE_MP3, ConversionJob, ConversionSettings
+
+    with open(args.input, encoding="utf-8") as f:
+        text = f.read()
+    processes, addresses = [], list(args.workers)
+    if args.local:
+        processes, local = spawn_local_workers(args.local)
+        addresses += local
+    if not addresses:
+        parser.error("give --workers and/or --local")
+    settings = ConversionSettings(
+        voice=args.voice, rate=args.rate, output_format=SAVE_MP3,
+        output_dir=args.output_dir,
+        filename=args.filename or os.path.splitext(os.path.basename(args.input))[0],
+        batch_size=args.batch, workers=tuple(addresses), backend=args.backend,
+        lexicon_file=args.lexicon, clean_text=args.clean,
+        normalize_text=args.normalize, profile=args.profile,
+        memory_budget_mb=args.memory_budget, hls=args.hls,
+    )
+    start = time.perf_counter()
+    try:
+        output = ConversionJob(None, text, settings,
+                               progress=lambda value=None, message=None:
+                               message and print(message)).run()
+    finally:
+        stop_local_workers(processes)
+    print(f"{output} in {time.perf_counter() - start:.1f}s over {len(addresses)} workers")
+
+
+if __name__ == "__main__":
+    main()
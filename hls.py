@@ -0,0 +1,194 @@
+"""HLS output, so a book can be listened to while it is still converting.
+
+An ``HlsWriter`` follows the MP3 file as the splice encoder writes it and
+cuts it into segments of at most ``segment_seconds``
+(``<name>_hls/segment_00000.mp3`` ...), each listed in ``index.m3u8`` as soon
+as it is complete.  The playlist is an EVENT playlist: segments are only ever
+appended, so a player can start within seconds of the conversion starting and
+seek anywhere in what has been rendered so far; ``#EXT-X-ENDLIST`` is added
+when the book is finished.
+
+Segments are packed MP3 audio (RFC 8216, section 3.4), cut on frame
+boundaries.  Saved books are encoded without the bit reservoir (see
+``incremental``), so every segment decodes on its own and the playlist can
+declare ``EXT-X-INDEPENDENT-SEGMENTS``.  Each segment starts with the ID3
+timestamp tag that packed audio requires.
+
+    python hls.py segment ~/Audiobooks/book.mp3
+    python hls.py serve ~/Audiobooks/book_hls --port 8000
+"""
+import argparse
+import functools
+import math
+import os
+import shutil
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from incremental import frame_info, frame_samples
+
+DEFAULT_SEGMENT_SECONDS = 6.0
+HLS_SUFFIX = "_hls"
+PLAYLIST_NAME = "index.m3u8"
+DEFAULT_PORT = 8000
+
+_TIMESTAMP_OWNER = b"com.apple.streaming.transportStreamTimestamp"
+
+
+def hls_directory(output_file):
+    return os.path.splitext(output_file)[0] + HLS_SUFFIX
+
+
+def _syncsafe(value):
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def timestamp_tag(sample, sample_rate):
+    """ID3v2.4 PRIV tag with the 90 kHz start time of a packed audio segment"""
+    pts = (sample * 90000 // sample_rate) & ((1 << 33) - 1)
+    body = _TIMESTAMP_OWNER + b"\0" + pts.to_bytes(8, "big")
+    frame = b"PRIV" + _syncsafe(len(body)) + b"\0\0" + body
+    return b"ID3\x04\x00\x00" + _syncsafe(len(frame)) + frame
+
+
+class HlsWriter:
+    def __init__(self, source_file, directory=None, segment_seconds=DEFAULT_SEGMENT_SECONDS):
+        self.source_file = source_file
+        self.directory = directory or hls_directory(source_file)
+        self.playlist = os.path.join(self.directory, PLAYLIST_NAME)
+        self.segment_seconds = segment_seconds
+        self.segments = 0
+        self._read = 0  # bytes of the source consumed
+        self._pending = bytearray()  # read but not yet a whole frame
+        self._frames = []  # frames of the segment being filled
+        self._segment_samples = 0
+        self._start_sample = 0
+        self._sample_rate = None
+
+        # Segments of an earlier conversion must not mix with this one
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+        header = ["#EXTM3U", "#EXT-X-VERSION:3",
+                  f"#EXT-X-TARGETDURATION:{math.ceil(segment_seconds)}",
+                  "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:EVENT",
+                  "#EXT-X-INDEPENDENT-SEGMENTS"]
+        self._append("\n".join(header) + "\n")
+
+    def poll(self):
+        """Cut segments from whatever the encoder has written so far"""
+        try:
+            with open(self.source_file, "rb") as f:
+                f.seek(self._read)
+                data = f.read()
+        except FileNotFoundError:
+            return  # the encoder has not created the file yet
+        self._read += len(data)
+        self._pending += data
+
+        pending = self._pending
+        position = 0
+        while position + 4 <= len(pending):
+            info = frame_info(pending[position:position + 4])
+            if info is None:
+                position += 1  # not a frame header; resynchronise
+                continue
+            length, sample_rate = info
+            if position + length > len(pending):
+                break
+            self._add_frame(bytes(pending[position:position + length]), sample_rate)
+            position += length
+        del pending[:position]
+
+    def _add_frame(self, frame, sample_rate):
+        samples = frame_samples(sample_rate)
+        self._sample_rate = sample_rate
+        if (self._frames and
+                self._segment_samples + samples > self.segment_seconds * sample_rate):
+            self._cut()
+        self._frames.append(frame)
+        self._segment_samples += samples
+
+    def _cut(self):
+        name = f"segment_{self.segments:05d}.mp3"
+        path = os.path.join(self.directory, name)
+        with open(path + ".part", "wb") as f:
+            f.write(timestamp_tag(self._start_sample, self._sample_rate))
+            f.writelines(self._frames)
+        os.replace(path + ".part", path)
+
+        # The segment exists before it is listed; one write per entry so a
+        # player reloading the playlist never sees half an entry
+        seconds = self._segment_samples / self._sample_rate
+        self._append(f"#EXTINF:{seconds:.3f},\n{name}\n")
+        self.segments += 1
+        self._start_sample += self._segment_samples
+        self._frames = []
+        self._segment_samples = 0
+
+    def _append(self, text):
+        # Appending keeps a long book's playlist updates O(1) per segment
+        with open(self.playlist, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    @property
+    def seconds(self):
+        """Duration of the segments listed so far"""
+        return self._start_sample / self._sample_rate if self._sample_rate else 0.0
+
+    def close(self):
+        """Segment the rest of the finished file and end the playlist"""
+        self.poll()
+        if self._frames:
+            self._cut()
+        self._append("#EXT-X-ENDLIST\n")
+
+    def abort(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def segment_file(mp3_file, directory=None, segment_seconds=DEFAULT_SEGMENT_SECONDS):
+    """Write the HLS segments and playlist for a finished MP3 file"""
+    writer = HlsWriter(mp3_file, directory, segment_seconds)
+    writer.close()
+    return writer.playlist
+
+
+class HlsRequestHandler(SimpleHTTPRequestHandler):
+    """Static files with HLS types; the playlist is never cached"""
+
+    extensions_map = {**SimpleHTTPRequestHandler.extensions_map,
+                      ".m3u8": "application/vnd.apple.mpegurl", ".mp3": "audio/mpeg"}
+
+    def end_headers(self):
+        if self.path.split("?")[0].endswith(".m3u8"):
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HLS segments for audiobooks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    segment = commands.add_parser("segment", help="Segment a finished MP3 file")
+    segment.add_argument("mp3_file")
+    segment.add_argument("--directory")
+    segment.add_argument("--seconds", type=float, default=DEFAULT_SEGMENT_SECONDS)
+
+    serve = commands.add_parser("serve", help="Serve a folder of playlists over HTTP")
+    serve.add_argument("directory")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.command == "segment":
+        print(segment_file(args.mp3_file, args.directory, args.seconds))
+        return
+
+    handler = functools.partial(HlsRequestHandler, directory=args.directory)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Serving http://{args.host}:{args.port}/{PLAYLIST_NAME}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
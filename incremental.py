@@ -0,0 +1,255 @@
+"""Frame-aligned MP3 output and incremental re-conversion.
+
+Saved books are encoded so that every chunk owns a whole run of MP3 frames:
+
+* the LAME bit reservoir is disabled, so no frame borrows bits from the one
+  before it and any run of frames can be cut out and pasted elsewhere;
+* each chunk's trailing pause is padded until chunk + pause is a multiple of
+  the frame size, so chunk boundaries fall exactly on frame boundaries; and
+* the pause is always longer than the encoder delay plus one frame, so the
+  samples that the delay shifts across a boundary are silence on both sides.
+
+A ``ChunkManifest`` (``<name>.chunks.json``) records the text hash and
+sample range of every chunk.  When the text is edited, ``ConversionJob``
+re-renders only chunks whose hash is not in the previous manifest, encodes
+them into one small MP3 and assembles the new book by copying frame runs
+from the old file and the new one, without decoding or re-encoding anything
+that did not change.
+"""
+import hashlib
+import json
+import mmap
+import os
+
+from audio_buffer import AudioBuffer
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".chunks.json"
+
+# LAME's fixed encoder delay (576 + 529 samples)
+ENCODER_DELAY = 1105
+
+# No bit reservoir and no header frames, so the file is nothing but
+# independently decodable audio frames
+SPLICE_ENCODER_ARGS = ["-reservoir", "0", "-write_xing", "0", "-id3v2_version", "0"]
+
+_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],   # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],       # MPEG-2
+}
+_BITRATES[0] = _BITRATES[2]                                                  # MPEG-2.5
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def frame_samples(sample_rate):
+    """Samples per Layer III frame (MPEG-1 above 24 kHz, MPEG-2/2.5 below)"""
+    return 1152 if sample_rate >= 32000 else 576
+
+
+def chunk_digest(text, voice=None):
+    """Hash of a chunk's text, and of its voice where that differs per chunk"""
+    if voice:
+        text = f"{voice}\0{text}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+def fingerprint(settings, policy, sample_format=None):
+    """Everything that changes how a chunk sounds, apart from its text"""
+    return {
+        "backend": settings.backend,
+        "voice": settings.voice,
+        "rate": settings.rate,
+        "volume": settings.volume,
+        "pause": settings.pause,
+        "bitrate": settings.bitrate,
+        "max_chunk_chars": policy.max_chars,
+        "min_chunk_chars": policy.min_chars,
+        "format": list(sample_format) if sample_format else None,
+    }
+
+
+class ChunkManifest:
+    """Per-chunk [digest, sample_start, speech_end, sample_end] of a saved book"""
+
+    def __init__(self, fingerprint, sample_rate, chunks=None):
+        self.fingerprint = fingerprint
+        self.sample_rate = sample_rate
+        self.frame = frame_samples(sample_rate)
+        self.chunks = chunks or []
+
+    def add(self, digest, sample_start, speech_samples, segment_samples):
+        self.chunks.append([digest, sample_start, sample_start + speech_samples,
+                            sample_start + segment_samples])
+
+    @property
+    def total_frames(self):
+        return self.chunks[-1][3] // self.frame if self.chunks else 0
+
+    def by_digest(self):
+        segments = {}
+        for digest, start, speech_end, end in self.chunks:
+            segments.setdefault(digest, (start, speech_end, end))
+        return segments
+
+    def save(self, path):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "fingerprint": self.fingerprint,
+                       "sample_rate": self.sample_rate, "chunks": self.chunks}, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """The manifest at ``path``, or None if missing or unreadable"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data["fingerprint"], data["sample_rate"], data["chunks"])
+
+
+def pad_to_frames(sound, pause_seconds):
+    """``sound`` plus a trailing pause that ends it on an MP3 frame boundary.
+
+    Returns an ``AudioBuffer`` sharing the chunk's samples rather than a copy.
+    """
+    frame = frame_samples(sound.sample_rate)
+    pause = max(int(round(pause_seconds * sound.sample_rate)), ENCODER_DELAY + frame)
+    pause += (-(sound.frames + pause)) % frame
+    return AudioBuffer.from_pcm(sound).append_silence(pause)
+
+
+class SpliceEncoder:
+    """Stream chunks into one encoder, each padded to a whole run of frames"""
+
+    def __init__(self, codec, output_file, sample_format, bitrate, pause_seconds, fingerprint):
+        sample_rate, channels, sample_width = sample_format
+        self.encoder = codec.open_encoder(output_file, sample_rate, channels, sample_width,
+                                          bitrate=bitrate, extra_args=SPLICE_ENCODER_ARGS)
+        self.format = sample_format
+        self.manifest = ChunkManifest(fingerprint, sample_rate)
+        self.pause_seconds = pause_seconds
+        self.position = 0
+
+    def write_chunk(self, sound, digest):
+        """Append a chunk plus its pause; returns (sample_start, speech_end)"""
+        return self.write_segment(pad_to_frames(sound, self.pause_seconds), sound.frames, digest)
+
+    def write_segment(self, segment, speech_frames, digest):
+        """Append a chunk already padded by ``pad_to_frames``"""
+        self.encoder.write(segment)
+        start = self.position
+        self.manifest.add(digest, start, speech_frames, segment.frames)
+        self.position += segment.frames
+        return start, start + speech_frames
+
+    def close(self):
+        self.encoder.close()
+
+    def abort(self):
+        self.encoder.abort()
+
+
+def scan_frames(path):
+    """Byte offsets of every MPEG audio frame in ``path``, plus the end offset"""
+    offsets = []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return [0]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = _skip_id3v2(data)
+            end = len(data)
+            while position + 4 <= end:
+                length = _frame_length(data[position:position + 4])
+                if not length:
+                    break
+                offsets.append(position)
+                position += length
+            offsets.append(min(position, end))
+    return offsets
+
+
+def _skip_id3v2(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def frame_info(header):
+    """(byte length, sample rate) of the Layer III frame ``header`` starts, or None"""
+    b0, b1, b2 = header[0], header[1], header[2]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    bitrate_index = (b2 >> 4) & 0xF
+    rate_index = (b2 >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _BITRATES[version][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    coefficient = 144 if version == 3 else 72
+    return coefficient * bitrate // sample_rate + padding, sample_rate
+
+
+def _frame_length(header):
+    info = frame_info(header)
+    return info[0] if info else 0
+
+
+def splice_files(output_file, pieces):
+    """Write ``pieces`` of (source_path, byte_start, byte_end) to ``output_file``.
+
+    Adjacent ranges from the same source are merged so unchanged stretches
+    of the book are copied in one go.
+    """
+    merged = []
+    for source, start, end in pieces:
+        if merged and merged[-1][0] == source and merged[-1][2] == start:
+            merged[-1][2] = end
+        else:
+            merged.append([source, start, end])
+
+    handles = {}
+    partial = output_file + ".part"
+    try:
+        with open(partial, "wb") as out:
+            for source, start, end in merged:
+                if source not in handles:
+                    handles[source] = open(source, "rb")
+                src = handles[source]
+                src.seek(start)
+                remaining = end - start
+                while remaining:
+                    block = src.read(min(remaining, 1 << 20))
+                    if not block:
+                        raise IOError(f"{source} is shorter than its manifest")
+                    out.write(block)
+                    remaining -= len(block)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        for handle in handles.values():
+            handle.close()
+    os.replace(partial, output_file)
+
+
+def can_update(manifest, output_file, expected_fingerprint):
+    """Whether ``output_file`` still matches ``manifest`` and the settings"""
+    if manifest is None or not os.path.exists(output_file):
+        return False
+    stored = dict(manifest.fingerprint)
+    stored.pop("format", None)
+    if stored != {k: v for k, v in expected_fingerprint.items() if k != "format"}:
+        return False
+    return len(scan_frames(output_file)) - 1 >= manifest.total_frames
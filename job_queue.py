@@ -0,0 +1,236 @@
+"""Queue of documents converted in the background, several at a time.
+
+The Turbo GUI's queue panel is a view of a ``JobQueue``; the queue itself has
+no Qt dependency.  Each queued document keeps the ``ConversionSettings`` it
+was added with.
+
+* Up to ``max_concurrent`` jobs run at once, each on its own thread.  The
+  next job to start is the queued one with the highest priority, and among
+  equal priorities the one nearest the top of the list.
+* pyttsx3 allows one engine per process, so every running pyttsx3 job,
+  multi-voice dialogue included, renders through its own render worker
+  process (see ``distributed``), started when its slot is first used and
+  reused by later jobs.  espeak-ng jobs need no engine.
+* Pausing stops a job; the chunks it rendered stay in its checkpoint (see
+  ``chunk_store``), so resuming queues it again and it carries on where it
+  stopped.
+"""
+import dataclasses
+import itertools
+import threading
+
+from conversion import SAVE_MP3, ConversionJob
+from distributed import spawn_local_workers, stop_local_workers
+from tts_backends import PYTTSX3
+
+QUEUED = "Queued"
+RUNNING = "Running"
+PAUSING = "Pausing"
+PAUSED = "Paused"
+CANCELLING = "Cancelling"
+CANCELLED = "Cancelled"
+DONE = "Done"
+FAILED = "Failed"
+
+DEFAULT_CONCURRENCY = 2
+
+
+class QueuedJob:
+    def __init__(self, job_id, title, text, settings, priority=0):
+        self.id = job_id
+        self.title = title
+        self.text = text
+        self.settings = settings
+        self.priority = priority
+        self.state = QUEUED
+        self.progress = 0
+        self.message = ""
+        self.output = None
+        self._stop_to = None  # PAUSED or CANCELLED once a stop is requested
+        self._removed = False
+
+    def report(self, value=None, message=None):
+        if value is not None:
+            self.progress = value
+        if message is not None:
+            self.message = message
+
+    def should_stop(self):
+        return self._stop_to is not None
+
+    @property
+    def active(self):
+        return self.state in (RUNNING, PAUSING, CANCELLING)
+
+
+class JobQueue:
+    def __init__(self, max_concurrent=DEFAULT_CONCURRENCY, worker_processes=True):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.worker_processes = worker_processes
+        self._jobs = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._free_slots = list(range(self.max_concurrent))
+        self._busy_slots = set()
+        self._workers = {}  # slot -> (processes, address)
+        self._threads = {}
+
+    def jobs(self):
+        """Jobs in list order"""
+        with self._lock:
+            return list(self._jobs)
+
+    def add(self, title, text, settings, priority=0):
+        with self._lock:
+            job = QueuedJob(next(self._ids), title, text, settings, priority)
+            self._jobs.append(job)
+        self.schedule()
+        return job
+
+    def _find(self, job_id):
+        for job in self._jobs:
+            if job.id == job_id:
+                return job
+        raise KeyError(job_id)
+
+    # Editing the list
+
+    def remove(self, job_id):
+        with self._lock:
+            job = self._find(job_id)
+            if job.active:
+                # Taken off the list once its thread has stopped
+                job._removed = True
+                self._stop(job, CANCELLED)
+            else:
+                self._jobs.remove(job)
+
+    def move(self, job_id, offset):
+        """Move a job ``offset`` places up (negative) or down the list"""
+        with self._lock:
+            job = self._find(job_id)
+            position = self._jobs.index(job)
+            target = min(max(position + offset, 0), len(self._jobs) - 1)
+            self._jobs.insert(target, self._jobs.pop(position))
+
+    def set_priority(self, job_id, priority):
+        with self._lock:
+            self._find(job_id).priority = priority
+        self.schedule()
+
+    def set_settings(self, job_id, settings):
+        with self._lock:
+            job = self._find(job_id)
+            if not job.active:
+                job.settings = settings
+
+    def set_limit(self, max_concurrent):
+        with self._lock:
+            self.max_concurrent = max(1, int(max_concurrent))
+            self._free_slots = [slot for slot in range(self.max_concurrent)
+                                if slot not in self._busy_slots]
+        self.schedule()
+
+    # Pause, resume and cancel
+
+    def pause(self, job_id):
+        with self._lock:
+            job = self._find(job_id)
+            if job.state == QUEUED:
+                job.state = PAUSED
+            elif job.state == RUNNING:
+                self._stop(job, PAUSED)
+
+    def resume(self, job_id):
+        with self._lock:
+            job = self._find(job_id)
+            if job.state in (PAUSED, FAILED, CANCELLED):
+                job.state = QUEUED
+                job.message = "Waiting"
+        self.schedule()
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._find(job_id)
+            if job.active:
+                self._stop(job, CANCELLED)
+            elif job.state in (QUEUED, PAUSED):
+                job.state = CANCELLED
+
+    def _stop(self, job, state):
+        job._stop_to = state
+        job.state = PAUSING if state == PAUSED else CANCELLING
+
+    # Running
+
+    def schedule(self):
+        """Start queued jobs while slots are free"""
+        with self._lock:
+            while True:
+                waiting = [job for job in self._jobs if job.state == QUEUED]
+                # Jobs still running over a lowered limit hold its slots too
+                if (not self._free_slots or not waiting
+                        or len(self._busy_slots) >= self.max_concurrent):
+                    return
+                position = {job.id: n for n, job in enumerate(self._jobs)}
+                job = max(waiting, key=lambda job: (job.priority, -position[job.id]))
+                slot = min(self._free_slots)
+                self._free_slots.remove(slot)
+                self._busy_slots.add(slot)
+                job.state = RUNNING
+                job._stop_to = None
+                thread = threading.Thread(target=self._run, args=(job, slot), daemon=True)
+                self._threads[job.id] = thread
+                thread.start()
+
+    def _run(self, job, slot):
+        try:
+            # Checkpointing is what lets a paused job carry on where it stopped
+            settings = dataclasses.replace(job.settings, output_format=SAVE_MP3,
+                                           checkpoint=True)
+            if (self.worker_processes and settings.backend == PYTTSX3
+                    and not settings.workers):
+                job.report(None, "Starting engine...")
+                settings = dataclasses.replace(settings, workers=(self._worker(slot),))
+            job.output = ConversionJob(None, job.text, settings, progress=job.report,
+                                       should_stop=job.should_stop).run()
+            if job._stop_to is not None:
+                job.state = job._stop_to
+            else:
+                job.state = DONE if job.output else FAILED
+        except Exception as e:
+            job.state = FAILED
+            job.message = str(e)
+        finally:
+            with self._lock:
+                self._busy_slots.discard(slot)
+                if slot < self.max_concurrent:
+                    self._free_slots.append(slot)
+                self._threads.pop(job.id, None)
+                if job._removed and job in self._jobs:
+                    self._jobs.remove(job)
+            self.schedule()
+
+    def _worker(self, slot):
+        with self._lock:
+            entry = self._workers.get(slot)
+            if entry is not None and entry[0][0].poll() is None:
+                return entry[1]
+        processes, addresses = spawn_local_workers(1)
+        with self._lock:
+            self._workers[slot] = (processes, addresses[0])
+        return addresses[0]
+
+    def shutdown(self):
+        """Stop running jobs and the worker processes"""
+        with self._lock:
+            for job in self._jobs:
+                if job.active:
+                    self._stop(job, PAUSED)
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join()
+        with self._lock:
+            for processes, _ in self._workers.values():
+                stop_local_workers(processes)
+            self._workers.clear()
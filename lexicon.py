@@ -0,0 +1,206 @@
+"""User pronunciation lexicon applied to chunks before synthesis.
+
+A lexicon file is UTF-8 text with one entry per line, ``term = spoken form``
+(a tab works as the separator too) and ``#`` comments::
+
+    Nguyen = Win
+    SQL = sequel
+    gif = jif
+
+Entries with capitals match exactly; all-lowercase entries match in any case.
+Terms only match as whole words, and where terms overlap the longest wins.
+
+All terms are compiled into one regular expression shaped as a trie (shared
+prefixes are factored out, so ``re`` never retries alternatives that start
+with a different character), and every chunk is rewritten with a single
+pass.  The cost is linear in the text and almost independent of the number
+of entries, where one ``str.replace`` per entry would be text x entries.
+The trie is keyed by lowercased character, each step matching exactly the
+spellings of the terms that pass through it, so exact and any-case terms
+share one trie and the greedy match is the longest; a match that is no
+term as written (``Sql`` when only ``SQL`` is listed) falls back to the
+longest term it starts with.
+
+Building the trie for a large lexicon takes a moment, so the pattern
+source is cached on disk by file content; compiling it still happens once
+per process, after which the compiled lexicon is kept in memory by path
+and modification time.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+from voice_catalog import CACHE_DIR
+
+LEXICON_CACHE_DIR = os.path.join(CACHE_DIR, "lexicons")
+
+_END = ""  # trie key marking the end of a term
+_WORD = re.compile(r"\w")
+_CACHE_VERSION = 2  # bumped whenever the cached pattern's shape changes
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def parse_lexicon(content):
+    """Entries {term: replacement} from lexicon file content"""
+    entries = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        separator = "\t" if "\t" in line else "="
+        term, _, replacement = line.partition(separator)
+        term, replacement = term.strip(), replacement.strip()
+        if term and separator in line:
+            entries[term] = replacement
+    return entries
+
+
+def trie_pattern(exact=(), folded=()):
+    """Regex source matching any of ``exact`` as written or ``folded`` in any case"""
+    root = {}
+    for term in exact:
+        _insert(root, term, False)
+    for term in folded:
+        _insert(root, term, True)
+    return _node_pattern(root)
+
+
+def _insert(root, term, fold):
+    flag = 1 if fold else 2
+    keys = term.lower()
+    if len(keys) != len(term):
+        keys = [char.lower() for char in term]
+    node = root
+    for char, key in zip(term, keys):
+        edge = node.get(key)
+        if edge is None:
+            # Spellings, whether an any-case term passes, whether an exact one does
+            edge = node[key] = [char, False, False, {}]
+        elif char not in edge[0]:
+            edge[0] += char
+        edge[flag] = True
+        node = edge[3]
+    node[_END] = None
+
+
+def _step(key, chars, fold):
+    spellings = set(chars)
+    if fold:
+        spellings.update(char for char in (key, key.upper(), key.title()) if len(char) == 1)
+    if len(spellings) == 1:
+        return re.escape(spellings.pop())
+    return "[" + "".join(re.escape(char) for char in sorted(spellings)) + "]"
+
+
+def _node_pattern(node, folding=False):
+    branches = []
+    for key in sorted(node):
+        if key == _END:
+            continue
+        chars, fold, exact, child = node[key]
+        if folding:
+            branches.append(re.escape(key) + _node_pattern(child, True))
+        elif not exact:
+            # Only any-case terms below: one scoped flag for the whole subtree
+            branches.append("(?i:" + re.escape(key) + _node_pattern(child, True) + ")")
+        else:
+            branches.append(_step(key, chars, fold) + _node_pattern(child))
+    if not branches:
+        return ""
+    if len(branches) == 1 and _END not in node:
+        return branches[0]
+    group = "(?:" + "|".join(branches) + ")"
+    # Greedy optional suffix: the longest term wins
+    return group + "?" if _END in node else group
+
+
+class Lexicon:
+    def __init__(self, entries, pattern=None):
+        self.exact = {term: spoken for term, spoken in entries.items() if term != term.lower()}
+        self.folded = {term: spoken for term, spoken in entries.items() if term == term.lower()}
+        self.source = pattern if pattern is not None else self._pattern()
+        self.regex = re.compile(self.source) if self.source else None
+
+    def _pattern(self):
+        if not self.exact and not self.folded:
+            return ""
+        return r"(?<!\w)" + trie_pattern(self.exact, self.folded) + r"(?!\w)"
+
+    def __len__(self):
+        return len(self.exact) + len(self.folded)
+
+    def apply(self, text):
+        if self.regex is None:
+            return text
+        return "".join(self._rewrite(text, 0, len(text)))
+
+    def _rewrite(self, text, start, end):
+        for match in self.regex.finditer(text, start, end):
+            yield text[start:match.start()]
+            yield from self._resolve(text, *match.span())
+            start = match.end()
+        yield text[start:end]
+
+    def _resolve(self, text, start, end):
+        # The trie matches every spelling of a shared step, so the longest
+        # match may be no term as written; take the longest term it starts
+        # with and rewrite the rest of it
+        for stop in range(end, start, -1):
+            if stop < end and _WORD.match(text, stop):
+                continue
+            spoken = self._lookup(text[start:stop])
+            if spoken is not None:
+                yield spoken
+                yield from self._rewrite(text, stop, end)
+                return
+        yield text[start]
+        yield from self._rewrite(text, start + 1, end)
+
+    def _lookup(self, term):
+        spoken = self.exact.get(term)
+        if spoken is None:
+            spoken = self.folded.get(term.lower())
+        return spoken
+
+    def to_json(self):
+        return {"pattern": self.source, "entries": {**self.exact, **self.folded}}
+
+
+def load_lexicon(path, cache_dir=LEXICON_CACHE_DIR):
+    """Compiled lexicon for ``path``, reusing in-memory and on-disk caches"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _compiled_lock:
+        if key in _compiled:
+            return _compiled[key]
+
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    digest = hashlib.sha1(f"{_CACHE_VERSION}\n{content}".encode("utf-8")).hexdigest()
+    cache_file = os.path.join(cache_dir, f"{digest}.json")
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cached = json.load(f)
+        lexicon = Lexicon(cached["entries"], cached["pattern"])
+    except (OSError, ValueError, KeyError):
+        lexicon = Lexicon(parse_lexicon(content))
+        _save_cache(cache_file, lexicon)
+
+    with _compiled_lock:
+        _compiled.clear()  # one lexicon in use at a time
+        _compiled[key] = lexicon
+    return lexicon
+
+
+def _save_cache(cache_file, lexicon):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_path = cache_file + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(lexicon.to_json(), f)
+        os.replace(temp_path, cache_file)
+    except OSError:
+        pass  # the cache is only an optimisation
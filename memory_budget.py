@@ -0,0 +1,228 @@
+"""Memory budget for a conversion.
+
+A ``MemoryGovernor`` keeps one job inside ``ConversionSettings.memory_budget_mb``
+so several jobs can share a host without the OOM killer picking one of them.
+Usage is the process RSS plus buffers held outside it (chunk files on the
+RAM-backed spool).  Where RSS cannot be read it falls back to the chunk audio
+the job has registered with ``track``.
+
+While usage is over the budget the governor:
+
+* lowers the number of chunks admitted into the pipeline at once (halving it
+  at most once per ``ADAPT_SECONDS``, never below what the speech backend has
+  to read ahead), and raises it again one at a time once usage falls under
+  ``RELAX_RATIO`` of the budget;
+* lets fewer of a stage's worker threads run at once, in proportion; and
+* flushes early: registered flushers run (the spool sends new chunk files to
+  disk), then garbage is collected and freed heap is handed back to the OS.
+
+The peak usage seen after each stage's work is kept per stage for the
+summary.
+"""
+import collections
+import ctypes
+import ctypes.util
+import gc
+import os
+import threading
+import time
+
+MB = 1024 * 1024
+ADAPT_SECONDS = 1.0  # minimum time between two cuts of the in-flight limit
+RELAX_RATIO = 0.8
+STALL_SECONDS = 2.0  # admit anyway after this long without a finished chunk
+
+_POLL_SECONDS = 0.1
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_libc = None
+_psutil_process = None
+
+
+def process_rss():
+    """Resident set size of this process in bytes, or None if unknown"""
+    global _psutil_process
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if _psutil_process is None:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        _psutil_process = psutil.Process()
+    return _psutil_process.memory_info().rss
+
+
+def trim_heap():
+    """Collect garbage and return freed heap to the OS where libc allows it"""
+    global _libc
+    gc.collect()
+    if _libc is None:
+        name = ctypes.util.find_library("c")
+        try:
+            _libc = ctypes.CDLL(name) if name else False
+        except OSError:
+            _libc = False
+    if _libc and hasattr(_libc, "malloc_trim"):
+        _libc.malloc_trim(0)
+
+
+class MemoryGovernor:
+    def __init__(self, budget_mb, max_in_flight):
+        self.budget = int(budget_mb * MB)
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.limit = self.max_in_flight
+        self.floor = 1
+        self.in_flight = 0
+        self.peaks = collections.defaultdict(int)
+        self.stats = {"peak": 0, "peak_tracked": 0, "throttled": 0, "flushes": 0,
+                      "min_limit": self.limit, "forced": 0}
+        self._tracked = {}
+        self._admitted = set()
+        self._sources = []
+        self._flushers = []
+        self._active = collections.Counter()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._last_release = time.monotonic()
+        self._last_cut = 0.0
+
+    def add_source(self, fn):
+        """Count ``fn()`` bytes, held outside the process, as used"""
+        self._sources.append(fn)
+
+    def add_flusher(self, fn):
+        """Call ``fn()`` to free memory whenever usage goes over budget"""
+        self._flushers.append(fn)
+
+    def set_floor(self, floor):
+        """Never admit fewer chunks than the speech backend reads ahead"""
+        with self._condition:
+            self.floor = max(1, int(floor))
+            self.max_in_flight = max(self.max_in_flight, self.floor)
+            self.limit = max(self.limit, self.floor)
+            self.stats["min_limit"] = max(self.stats["min_limit"], self.floor)
+            self._condition.notify_all()
+
+    @property
+    def throttled(self):
+        return self.limit < self.max_in_flight
+
+    def usage(self):
+        with self._condition:
+            tracked = sum(self._tracked.values())
+        rss = process_rss()
+        return (tracked if rss is None else rss) + sum(fn() for fn in self._sources), tracked
+
+    # Admission of chunks into the pipeline
+
+    def admit(self, key, should_stop=None):
+        """Wait until chunk ``key`` fits; False once the job is stopping"""
+        should_stop = should_stop or (lambda: False)
+        with self._condition:
+            while self.in_flight >= self.limit and not self._closed:
+                if should_stop():
+                    return False
+                if time.monotonic() - self._last_release > STALL_SECONDS:
+                    # Whatever is in flight may be waiting for this very chunk
+                    self.stats["forced"] += 1
+                    self._last_release = time.monotonic()
+                    break
+                self._condition.wait(_POLL_SECONDS)
+            if self._closed:
+                return False
+            self._admitted.add(key)
+            self.in_flight += 1
+            return True
+
+    def track(self, key, nbytes):
+        """Register the audio held for chunk ``key`` (replaces earlier sizes)"""
+        with self._condition:
+            self._tracked[key] = nbytes
+
+    def release(self, key):
+        """Chunk ``key`` has left the pipeline or holds no memory until it does"""
+        with self._condition:
+            self._tracked.pop(key, None)
+            if key in self._admitted:
+                self._admitted.discard(key)
+                self.in_flight -= 1
+                self._last_release = time.monotonic()
+                self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    # Worker throttling
+
+    def allowed_workers(self, workers):
+        if not self.throttled:
+            return workers
+        return max(1, workers * self.limit // self.max_in_flight)
+
+    def slot(self, stage, workers):
+        """Context manager holding one of a stage's running-worker slots"""
+        return _Slot(self, stage, workers)
+
+    # Monitoring
+
+    def observe(self, stage):
+        """Sample usage after ``stage`` handled an item and adapt the limits"""
+        used, tracked = self.usage()
+        flush = False
+        with self._condition:
+            self.peaks[stage] = max(self.peaks[stage], used)
+            self.stats["peak"] = max(self.stats["peak"], used)
+            self.stats["peak_tracked"] = max(self.stats["peak_tracked"], tracked)
+            now = time.monotonic()
+            if used > self.budget:
+                if now - self._last_cut >= ADAPT_SECONDS:
+                    self._last_cut = now
+                    flush = True
+                    self.stats["flushes"] += 1
+                    if self.limit > self.floor:
+                        self.limit = max(self.floor, min(self.limit, self.in_flight) // 2)
+                        self.stats["throttled"] += 1
+                        self.stats["min_limit"] = min(self.stats["min_limit"], self.limit)
+            elif used < self.budget * RELAX_RATIO and self.throttled:
+                self.limit += 1
+                self._condition.notify_all()
+        if flush:
+            for fn in self._flushers:
+                fn()
+            trim_heap()
+
+    def summary(self):
+        peaks = ", ".join(f"{stage} {peak / MB:.0f}" for stage, peak in self.peaks.items())
+        text = (f"Peak memory {self.stats['peak'] / MB:.0f} MB of "
+                f"{self.budget / MB:.0f} MB budget ({peaks} MB by stage)")
+        if self.stats["throttled"]:
+            text += (f"; throttled {self.stats['throttled']} times, down to "
+                     f"{self.stats['min_limit']} chunks in flight")
+        return text
+
+
+class _Slot:
+    def __init__(self, governor, stage, workers):
+        self.governor = governor
+        self.stage = stage
+        self.workers = workers
+
+    def __enter__(self):
+        governor = self.governor
+        with governor._condition:
+            while (governor._active[self.stage] >= governor.allowed_workers(self.workers)
+                   and not governor._closed):
+                governor._condition.wait(_POLL_SECONDS)
+            governor._active[self.stage] += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        governor = self.governor
+        with governor._condition:
+            governor._active[self.stage] -= 1
+            governor._condition.notify_all()
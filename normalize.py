@@ -0,0 +1,270 @@
+"""Text normalisation: numbers, dates, money and abbreviations as words.
+
+Speech engines read "$1,250.50", "3/4", "1990s" or "Henry VIII" poorly and
+spell out what they do not understand, which is slow as well as wrong.  A
+``TextNormalizer`` rewrites such tokens into the words a narrator would say
+before a chunk is synthesized:
+
+* cardinals, decimals, ordinals and percentages ("21st" -> "twenty-first");
+* four-digit years and decades ("1984" -> "nineteen eighty-four");
+* dates ("2024-03-05", "March 5, 2024", "5 March") and clock times;
+* amounts of dollars, pounds and euros, with "million" etc.;
+* Roman numerals after "Chapter", "Part", "Act"... and after the names
+  of monarchs and popes ("Louis XIV" -> "Louis the Fourteenth", while
+  "Type II" and "Apollo XI" are left to the engine); and
+* common abbreviations ("Dr.", "etc.", "No. 5"), with "St." read as
+  "Saint" before a name and as "Street" after one ("Baker St.").
+
+All rules are compiled into one regular expression, so a chunk is scanned
+once whatever the number of rules.  Books repeat the same tokens (chapter
+numbers, years, "Mr.") many times over, so every expansion is memoised by
+the matched text.  Chunks are normalised one at a time as the segment stage
+yields them, like the lexicon, so the cost is spread over the conversion.
+"""
+import re
+
+MEMO_SIZE = 1 << 16
+
+_ONES = ("zero one two three four five six seven eight nine ten eleven twelve thirteen "
+         "fourteen fifteen sixteen seventeen eighteen nineteen").split()
+_TENS = "_ _ twenty thirty forty fifty sixty seventy eighty ninety".split()
+_SCALES = ((10 ** 12, "trillion"), (10 ** 9, "billion"), (10 ** 6, "million"),
+           (1000, "thousand"))
+_ORDINAL_WORDS = {"one": "first", "two": "second", "three": "third", "five": "fifth",
+                  "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+_MONTHS = ("January February March April May June July August September October "
+           "November December").split()
+_MONTH_NAMES = {name.lower(): name for name in _MONTHS}
+_MONTH_NAMES.update({name[:3].lower(): name for name in _MONTHS})
+_MONTH_NAMES["sept"] = "September"
+_CURRENCIES = {"$": ("dollar", "dollars", "cent", "cents"),
+               "£": ("pound", "pounds", "penny", "pence"),
+               "€": ("euro", "euros", "cent", "cents")}
+_ROMAN = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100, "D": 500, "M": 1000}
+_ABBREVIATIONS = {
+    "mr": "Mister", "mrs": "Missus", "ms": "Miz", "dr": "Doctor", "prof": "Professor",
+    "jr": "Junior", "sr": "Senior", "capt": "Captain", "gen": "General",
+    "lt": "Lieutenant", "col": "Colonel", "sgt": "Sergeant", "mt": "Mount",
+    "vol": "Volume", "vs": "versus", "etc": "et cetera", "approx": "approximately",
+    "e.g": "for example", "i.e": "that is", "no": "number",
+}
+# Words after which a Roman numeral is a plain number ("World War II")
+_COUNTED = "Chapter|Book|Part|Volume|Vol|Act|Scene|Section|Canto|Appendix|Phase|War"
+# Names after which a Roman numeral is an ordinal ("Henry VIII"); after any
+# other word it may be a model, a class or a mission ("Apollo XI")
+_REGNAL = ("Alexander|Alfonso|Amenhotep|Anne|Benedict|Boniface|Casimir|Catherine|Charles"
+           "|Christian|Clement|Constantine|David|Edward|Elizabeth|Ferdinand|Frederick"
+           "|Friedrich|George|Gregory|Gustav|Haakon|Harald|Henry|Innocent|Ivan|James|John"
+           "|Leo|Leopold|Louis|Ludwig|Magnus|Mary|Napoleon|Nicholas|Olaf|Otto|Paul|Pedro"
+           "|Peter|Philip|Pius|Ptolemy|Rama|Ramesses|Richard|Robert|Rudolf|Sixtus|Thutmose"
+           "|Umberto|Urban|Victor|Wilhelm|William")
+# Capitalised words that come before "St." in "At St. Mary's" rather than
+# name a street
+_BEFORE_SAINT = {"A", "And", "At", "By", "For", "From", "In", "Near", "Of", "Old", "On",
+                 "Or", "Past", "The", "To", "Via", "With"}
+
+_MONTH = "|".join(sorted((name.capitalize() for name in _MONTH_NAMES), key=len, reverse=True))
+_INTEGER = r"\d{1,3}(?:,\d{3})+|\d+"
+_RULES = (
+    ("iso_date", r"\b(\d{4})-(\d{2})-(\d{2})\b"),
+    ("month_day", rf"\b({_MONTH})\.? (\d{{1,2}})(?:st|nd|rd|th)?\b(?:,? (\d{{4}})\b)?"),
+    ("day_month", rf"\b(\d{{1,2}})(?:st|nd|rd|th)? ({_MONTH})\b\.?(?:,? (\d{{4}})\b)?"),
+    ("money", rf"([$£€])({_INTEGER})(?:\.(\d\d?))?\b(?: (thousand|million|billion|trillion)\b)?"),
+    ("clock", r"\b(\d{1,2}):(\d\d)\b(?:\s?([AaPp])\.?[Mm]\b\.?)?"),
+    ("percent", r"\b(\d+(?:\.\d+)?)%"),
+    ("decade", r"\b(1[1-9]\d0|20\d0)'?s\b"),
+    ("ordinal", rf"\b({_INTEGER})(st|nd|rd|th)\b"),
+    ("counted_roman", rf"\b({_COUNTED})(\.?) ([IVXLC]+)\b"),
+    ("regnal", rf"\b({_REGNAL}) ([IVX]{{2,}}[IVXL]*|IV|V|IX|X)\b"),
+    ("number_sign", r"\bNo\. ?(?=\d)"),
+    # Whether a capital follows decides the reading, so it is part of the
+    # match: the memo is keyed by the matched text
+    ("saint_street", r"\b(?:([A-Z][a-z]+) )?St\.(?=[\s,;:)]|$)( ?[A-Z])?"),
+    ("abbreviation", r"\b(Mrs|Mr|Ms|Dr|Prof|Jr|Sr|Capt|Gen|Lt|Col|Sgt|Mt|Vol|vs|etc|approx"
+                     r"|e\.g|i\.e)\.(?=[\s,;:)]|$)"),
+    ("decimal", r"(?<![\d.])(\d+)\.(\d+)\b(?!\.\d)"),
+    ("number", rf"(?<![\d.,])({_INTEGER})\b(?![.,]\d)"),
+)
+PATTERN = re.compile("|".join(f"(?P<{name}>{rule})" for name, rule in _RULES))
+# Where each rule's own captures sit in ``match.groups()``
+_CAPTURES = {name: slice(PATTERN.groupindex[name],
+                         PATTERN.groupindex[name] + re.compile(rule).groups)
+             for name, rule in _RULES}
+_LAST_WORD = re.compile(r"[a-z]+$")
+
+
+def number_words(n):
+    """Cardinal ``n`` (a non-negative int) in words"""
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens] + (f"-{_ONES[ones]}" if ones else "")
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return f"{_ONES[hundreds]} hundred" + (f" {number_words(rest)}" if rest else "")
+    for scale, name in _SCALES:
+        if n >= scale:
+            high, rest = divmod(n, scale)
+            return f"{number_words(high)} {name}" + (f" {number_words(rest)}" if rest else "")
+    return " ".join(_ONES[int(d)] for d in str(n))
+
+
+def ordinal_words(n):
+    words = number_words(n)
+    last = _LAST_WORD.search(words).group(0)
+    if last in _ORDINAL_WORDS:
+        last = _ORDINAL_WORDS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return _LAST_WORD.sub(last, words)
+
+
+def year_words(n):
+    """``n`` read as a year: 1984 -> nineteen eighty-four, 2005 -> two thousand five"""
+    century, rest = divmod(n, 100)
+    if 2000 <= n < 2010:
+        return number_words(n)
+    if rest == 0:
+        return f"{number_words(century)} hundred"
+    if rest < 10:
+        return f"{number_words(century)} oh {_ONES[rest]}"
+    return f"{number_words(century)} {number_words(rest)}"
+
+
+def roman_value(numeral):
+    total = 0
+    for letter, following in zip(numeral, numeral[1:] + " "):
+        value = _ROMAN[letter]
+        total += -value if _ROMAN.get(following, 0) > value else value
+    return total
+
+
+def _integer(text):
+    return int(text.replace(",", ""))
+
+
+def _is_year(text):
+    return len(text) == 4 and 1100 <= int(text) <= 2099
+
+
+def _date(month, day, year=None):
+    words = f"{month} {ordinal_words(int(day))}"
+    return f"{words}, {year_words(int(year))}" if year else words
+
+
+def _expand(rule, groups):
+    if rule == "iso_date":
+        year, month, day = groups
+        if not 1 <= int(month) <= 12 or not 1 <= int(day) <= 31:
+            return None
+        return _date(_MONTHS[int(month) - 1], day, year)
+    if rule == "month_day":
+        month, day, year = groups
+        return _date(_MONTH_NAMES[month.lower()], day, year) if 1 <= int(day) <= 31 else None
+    if rule == "day_month":
+        day, month, year = groups
+        if not 1 <= int(day) <= 31:
+            return None
+        words = f"the {ordinal_words(int(day))} of {_MONTH_NAMES[month.lower()]}"
+        return f"{words}, {year_words(int(year))}" if year else words
+    if rule == "money":
+        symbol, whole, fraction, scale = groups
+        one, many, cent, cents = _CURRENCIES[symbol]
+        amount = _integer(whole)
+        if scale:
+            number = number_words(amount) + (
+                " point " + " ".join(_ONES[int(d)] for d in fraction) if fraction else "")
+            return f"{number} {scale} {many}"
+        words = f"{number_words(amount)} {one if amount == 1 else many}"
+        if fraction:
+            value = int(fraction.ljust(2, "0"))
+            if value:
+                words += f" and {number_words(value)} {cent if value == 1 else cents}"
+        return words
+    if rule == "clock":
+        hour, minute, meridiem = int(groups[0]), int(groups[1]), groups[2]
+        if hour > 23 or minute > 59:
+            return None
+        if minute == 0:
+            words = f"{number_words(hour)} o'clock" if not meridiem else number_words(hour)
+        elif minute < 10:
+            words = f"{number_words(hour)} oh {_ONES[minute]}"
+        else:
+            words = f"{number_words(hour)} {number_words(minute)}"
+        return f"{words} {meridiem.lower()} m" if meridiem else words
+    if rule == "percent":
+        number = groups[0]
+        if "." in number:
+            return f"{_expand('decimal', number.split('.'))} percent"
+        return f"{number_words(int(number))} percent"
+    if rule == "decade":
+        words = year_words(int(groups[0]))
+        return words[:-1] + "ies" if words.endswith("y") else words + "s"
+    if rule == "ordinal":
+        return ordinal_words(_integer(groups[0]))
+    if rule == "counted_roman":
+        word, dot, numeral = groups
+        if dot:
+            # "Vol. III", not the end of a sentence before "I went"
+            if word.lower() not in _ABBREVIATIONS:
+                return None
+            word = _ABBREVIATIONS[word.lower()]
+        return f"{word} {number_words(roman_value(numeral))}"
+    if rule == "regnal":
+        name, numeral = groups
+        return f"{name} the {ordinal_words(roman_value(numeral)).capitalize()}"
+    if rule == "number_sign":
+        return "number "
+    if rule == "saint_street":
+        before, after = groups
+        if before is not None and before not in _BEFORE_SAINT:
+            # A capital after a street starts the next sentence
+            return f"{before} Street" + (f".{after}" if after else "")
+        if not after:
+            return None  # no name follows, so neither reading is clear
+        return f"{before + ' ' if before else ''}Saint{after}"
+    if rule == "abbreviation":
+        return _ABBREVIATIONS[groups[0].lower()]
+    if rule == "decimal":
+        whole, fraction = groups
+        return f"{number_words(int(whole))} point {' '.join(_ONES[int(d)] for d in fraction)}"
+    if rule == "number":
+        text = groups[0]
+        if _is_year(text):
+            return year_words(int(text))
+        return number_words(_integer(text))
+    return None
+
+
+class TextNormalizer:
+    def __init__(self, memo_size=MEMO_SIZE):
+        self.memo_size = memo_size
+        self.memo = {}
+        self.stats = {"tokens": 0, "memo_hits": 0}
+
+    def _replace(self, match):
+        token = match.group(0)
+        self.stats["tokens"] += 1
+        words = self.memo.get(token)
+        if words is not None:
+            self.stats["memo_hits"] += 1
+            return words
+        rule = match.lastgroup
+        words = _expand(rule, match.groups()[_CAPTURES[rule]])
+        if words is None:
+            words = token
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        self.memo[token] = words
+        return words
+
+    def apply(self, text):
+        return PATTERN.sub(self._replace, text)
+
+    def summary(self):
+        tokens = self.stats["tokens"]
+        hits = self.stats["memo_hits"] * 100 / tokens if tokens else 0
+        return f"Normalised {tokens:,} numbers, dates and abbreviations ({hits:.0f}% memoised)"
@@ -0,0 +1,161 @@
+"""Text <-> audio offset index for a converted book.
+
+One entry per synthesized chunk maps its range in the source text (both as
+character offsets and as UTF-8 byte offsets, for seeking in the file on disk)
+to its range of samples in the output audio.  Entries are appended in
+document order, which is also audio order, so every column is sorted and
+lookups in either direction are a bisect.
+
+On disk the index is a small header followed by the six columns as little
+endian int64 arrays, next to the audio as ``<name>.idx``.  SRT and LRC
+subtitles are derived from it.
+"""
+import bisect
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+from chunking import sentence_spans
+
+MAGIC = b"ABIX"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIQ")  # magic, version, sample_rate, entry count
+
+OffsetEntry = namedtuple(
+    "OffsetEntry", "char_start char_end byte_start byte_end sample_start sample_end"
+)
+
+
+class OffsetIndex:
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self._columns = [array("q") for _ in OffsetEntry._fields]
+        self._text = None
+        self._byte_position = (0, 0)  # (char offset, byte offset) reached so far
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def __getitem__(self, i):
+        return OffsetEntry(*(column[i] for column in self._columns))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def add(self, text, char_start, char_end, sample_start, sample_end):
+        """Append the next chunk; chunks must arrive in document order"""
+        if len(self) and (char_start < self._columns[1][-1]
+                          or sample_start < self._columns[5][-1]):
+            raise ValueError("Offset index entries must be added in order")
+        byte_start = self._byte_offset(text, char_start)
+        byte_end = self._byte_offset(text, char_end)
+        for column, value in zip(self._columns, (char_start, char_end, byte_start,
+                                                 byte_end, sample_start, sample_end)):
+            column.append(value)
+
+    def _byte_offset(self, text, char_offset):
+        # Encode only the text since the previous call: linear over the book
+        if text is not self._text:
+            self._text, self._byte_position = text, (0, 0)
+        chars, offset = self._byte_position
+        offset += len(text[chars:char_offset].encode("utf-8"))
+        self._byte_position = (char_offset, offset)
+        return offset
+
+    # Lookups
+
+    def _find(self, starts, value):
+        i = bisect.bisect_right(starts, value) - 1
+        return self[i] if i >= 0 else None
+
+    def at_char(self, offset):
+        """Entry containing (or last starting before) a character offset"""
+        return self._find(self._columns[0], offset)
+
+    def at_byte(self, offset):
+        return self._find(self._columns[2], offset)
+
+    def at_sample(self, sample):
+        return self._find(self._columns[4], sample)
+
+    def at_time(self, seconds):
+        return self.at_sample(int(seconds * self.sample_rate))
+
+    def time_of_char(self, offset):
+        """Seconds into the audio where the chunk holding ``offset`` starts"""
+        entry = self.at_char(offset)
+        return entry.sample_start / self.sample_rate if entry else 0.0
+
+    # Persistence
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.sample_rate, len(self)))
+            for column in self._columns:
+                _little_endian(array("q", column)).tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, version, sample_rate, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an offset index")
+            index = cls(sample_rate)
+            for column in index._columns:
+                column.fromfile(f, count)
+                _little_endian(column)
+        return index
+
+    # Subtitles
+
+    def cues(self, text, split_sentences=True):
+        """Yield (start_seconds, end_seconds, caption) for subtitles.
+
+        Chunk times are exact; sentences inside a chunk get times
+        interpolated by character count.
+        """
+        for entry in self:
+            spans = [(entry.char_start, entry.char_end)]
+            if split_sentences:
+                spans = sentence_spans(text, entry.char_start, entry.char_end)
+            length = max(1, entry.char_end - entry.char_start)
+            samples = entry.sample_end - entry.sample_start
+            for start, end in spans:
+                sample_start = entry.sample_start + samples * (start - entry.char_start) // length
+                sample_end = entry.sample_start + samples * (end - entry.char_start) // length
+                caption = " ".join(text[start:end].split())
+                if caption:
+                    yield (sample_start / self.sample_rate,
+                           sample_end / self.sample_rate, caption)
+
+    def to_srt(self, text):
+        lines = []
+        for number, (start, end, caption) in enumerate(self.cues(text), 1):
+            lines += [str(number), f"{_srt_time(start)} --> {_srt_time(end)}", caption, ""]
+        return "\n".join(lines)
+
+    def to_lrc(self, text):
+        return "\n".join(f"[{_lrc_time(start)}]{caption}"
+                         for start, end, caption in self.cues(text)) + "\n"
+
+
+def _little_endian(column):
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+def _srt_time(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def _lrc_time(seconds):
+    centis = int(round(seconds * 100))
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{minutes:02d}:{secs:02d}.{centis:02d}"
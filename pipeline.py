@@ -0,0 +1,255 @@
+"""Staged producer/consumer pipeline with bounded queues.
+
+A conversion is split into stages (segment -> synthesize -> post-process ->
+encode -> write) that each run on their own threads and pass items along
+bounded queues:
+
+* stages overlap, so the encoder works on chunk N while the engine renders
+  chunk N+1;
+* a slow stage fills its input queue and blocks the stage before it, so
+  nothing runs ahead of the slowest stage (backpressure); and
+* the number of items alive at once is capped by the queue sizes plus the
+  items being worked on, so peak memory does not grow with the book.
+
+A stage is either a plain function applied to each item on ``workers``
+threads (results are still passed on in input order), or, with
+``stream=True``, a function from an iterable of items to an iterable of
+results run on a single thread, for steps such as batched synthesis that
+need to see several items at once.
+
+With a ``profiler`` (see ``profiling``) each item's time in each stage is
+also attributed to its position in the source, i.e. the chunk index.  With
+a ``governor`` (see ``memory_budget``) memory is sampled after every item
+and a stage's workers only run as many at once as the governor allows.
+"""
+import contextlib
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 4
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class PipelineStopped(Exception):
+    pass
+
+
+class Stage:
+    def __init__(self, name, fn, workers=1, stream=False):
+        if stream and workers != 1:
+            raise ValueError("A stream stage runs on exactly one thread")
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.stream = stream
+
+
+class Pipeline:
+    """Run ``source`` items through ``stages``; iterate to consume the results.
+
+    ``stats`` has, per stage, the items processed, seconds spent working and
+    seconds spent blocked on a full output queue (time lost to backpressure
+    from the stage after it).
+    """
+
+    def __init__(self, source, stages, queue_size=DEFAULT_QUEUE_SIZE, should_stop=None,
+                 profiler=None, governor=None):
+        self.source = source
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+        self.should_stop = should_stop or (lambda: False)
+        self.profiler = profiler
+        self.governor = governor
+        self.stats = {name: {"items": 0, "seconds": 0.0, "blocked": 0.0}
+                      for name in ["segment"] + [stage.name for stage in self.stages]}
+        self._stopped = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._guard, args=(self._produce, queues[0]),
+                                    daemon=True)]
+        for stage, inbox, outbox in zip(self.stages, queues, queues[1:]):
+            if stage.stream:
+                threads.append(threading.Thread(
+                    target=self._guard, args=(self._stream, stage, inbox, outbox), daemon=True))
+            else:
+                sequencer = _Sequencer(stage.workers)
+                threads += [threading.Thread(
+                    target=self._guard, args=(self._work, stage, inbox, outbox, sequencer),
+                    daemon=True) for _ in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                yield item[1]
+        except PipelineStopped:
+            pass
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+
+    # Stage runners
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+            self._stopped.set()
+
+    def _measure(self, name, seq):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.measure(name, seq)
+
+    def _slot(self, stage):
+        if self.governor is None or stage.workers == 1:
+            return contextlib.nullcontext()
+        return self.governor.slot(stage.name, stage.workers)
+
+    def _observe(self, name):
+        if self.governor is not None:
+            self.governor.observe(name)
+
+    def _forget(self, seq):
+        # The call that found the end of the input worked on no chunk
+        if self.profiler is not None:
+            self.profiler.forget(seq)
+
+    def _produce(self, outbox):
+        stats = self.stats["segment"]
+        source = iter(self.source)
+        seq = 0
+        while True:
+            start = time.perf_counter()
+            with self._measure("segment", seq):
+                item = next(source, _DONE)
+            if item is _DONE:
+                self._forget(seq)
+                break
+            stats["seconds"] += time.perf_counter() - start
+            stats["items"] += 1
+            self._observe("segment")
+            self._put(outbox, (seq, item), stats)
+            seq += 1
+        self._put(outbox, _DONE, stats)
+
+    def _work(self, stage, inbox, outbox, sequencer):
+        stats = self.stats[stage.name]
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                # Leave the marker for sibling workers; the last one passes it on
+                self._put(inbox, _DONE, stats)
+                if sequencer.retire():
+                    self._put(outbox, _DONE, stats)
+                return
+            seq, value = item
+            start = time.perf_counter()
+            with self._slot(stage), self._measure(stage.name, seq):
+                result = stage.fn(value)
+            with self._lock:
+                stats["seconds"] += time.perf_counter() - start
+                stats["items"] += 1
+            self._observe(stage.name)
+            sequencer.wait_turn(seq, self._stopped)
+            try:
+                self._put(outbox, (seq, result), stats)
+            finally:
+                sequencer.advance()
+
+    def _stream(self, stage, inbox, outbox):
+        stats = self.stats[stage.name]
+
+        def items():
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    return
+                yield item[1]
+
+        results = iter(stage.fn(items()))
+        seq = 0
+        while True:
+            start = time.perf_counter()
+            with self._measure(stage.name, seq):
+                result = next(results, _DONE)
+            stats["seconds"] += time.perf_counter() - start
+            if result is _DONE:
+                self._forget(seq)
+                break
+            stats["items"] += 1
+            self._observe(stage.name)
+            self._put(outbox, (seq, result), stats)
+            seq += 1
+        self._put(outbox, _DONE, stats)
+
+    # Queue access that gives up once the pipeline is stopped
+
+    def _get(self, inbox):
+        while not self._stopped.is_set():
+            if self.should_stop():
+                self._stopped.set()
+                break
+            try:
+                return inbox.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        raise PipelineStopped()
+
+    def _put(self, outbox, item, stats):
+        start = time.perf_counter()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    outbox.put(item, timeout=_POLL_SECONDS)
+                    return
+                except queue.Full:
+                    continue
+            raise PipelineStopped()
+        finally:
+            with self._lock:
+                stats["blocked"] += time.perf_counter() - start
+
+
+class _Sequencer:
+    """Lets the workers of one stage hand on their results in input order"""
+
+    def __init__(self, workers):
+        self.condition = threading.Condition()
+        self.next_seq = 0
+        self.live = workers
+
+    def wait_turn(self, seq, stopped):
+        with self.condition:
+            while self.next_seq != seq:
+                if stopped.is_set():
+                    raise PipelineStopped()
+                self.condition.wait(_POLL_SECONDS)
+
+    def advance(self):
+        with self.condition:
+            self.next_seq += 1
+            self.condition.notify_all()
+
+    def retire(self):
+        """Count a worker out; True for the last one"""
+        with self.condition:
+            self.live -= 1
+            return self.live == 0
@@ -0,0 +1,97 @@
+"""Asynchronous, cached voice previews.
+
+Previews are rendered to WAV by a dedicated engine instance (never the one a
+conversion may be using), off the GUI thread, and kept on disk keyed by the
+exact settings, so auditioning the same combination again plays instantly.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from voice_catalog import CACHE_DIR
+
+PREVIEW_DIR = os.path.join(CACHE_DIR, "previews")
+MAX_CLIPS = 64
+
+
+class PreviewRenderer:
+    def __init__(self, cache_dir=PREVIEW_DIR, max_clips=MAX_CLIPS):
+        self.cache_dir = cache_dir
+        self.max_clips = max_clips
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def clip_path(self, settings, text):
+        key = json.dumps({"settings": settings, "text": text}, sort_keys=True)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def cached_clip(self, settings, text):
+        """Path of an already rendered clip for these settings, or None"""
+        path = self.clip_path(settings, text)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # keep recently auditioned clips out of pruning
+        return path
+
+    def render(self, settings, text):
+        """Render (blocking) and return the clip path; call off the GUI thread"""
+        path = self.clip_path(settings, text)
+        with self._lock:
+            if os.path.exists(path):
+                return path
+            engine = self._get_engine()
+            if settings.get('voice'):
+                engine.setProperty('voice', settings['voice'])
+            engine.setProperty('rate', settings['rate'])
+            engine.setProperty('volume', settings['volume'])
+            if settings.get('pitch') is not None:
+                try:
+                    engine.setProperty('pitch', settings['pitch'])
+                except (KeyError, ValueError):
+                    pass
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = path + ".part"
+            engine.save_to_file(text, temp_path)
+            engine.runAndWait()
+            if not os.path.exists(temp_path):
+                raise RuntimeError("The speech engine did not produce a preview")
+            os.replace(temp_path, path)
+            self._prune()
+        return path
+
+    def _get_engine(self):
+        # A private instance; pyttsx3.init() would hand back the shared engine
+        if self._engine is None:
+            from pyttsx3 import Engine
+            self._engine = Engine()
+        return self._engine
+
+    def _prune(self):
+        clips = [os.path.join(self.cache_dir, name)
+                 for name in os.listdir(self.cache_dir) if name.endswith(".wav")]
+        if len(clips) <= self.max_clips:
+            return
+        clips.sort(key=os.path.getmtime)
+        for path in clips[:len(clips) - self.max_clips]:
+            os.remove(path)
+
+
+def play_clip(path):
+    """Start playing a WAV clip without blocking the caller"""
+    try:
+        from PyQt5.QtMultimedia import QSound
+    except ImportError:
+        QSound = None
+    if QSound is not None:
+        QSound.play(path)
+        return
+
+    def _play():
+        from pydub import AudioSegment
+        from pydub.playback import play
+        play(AudioSegment.from_wav(path))
+
+    threading.Thread(target=_play, daemon=True).start()
@@ -0,0 +1,236 @@
+"""Opt-in profiling of a conversion.
+
+A ``Profiler`` does two things while a job runs:
+
+* it times every pipeline stage for every chunk, so the report can name the
+  slowest chunks and say where their time went; and
+* a sampling thread reads the stacks of the threads doing conversion work
+  every few milliseconds.  Each stack is rooted at the stage and chunk the
+  thread was working on, and counted in the "folded" format read by
+  ``flamegraph.pl``, speedscope and most other flamegraph viewers::
+
+      synthesize;chunk 12;render (tts_backends.py:210);runAndWait (engine.py:180) 37
+
+Sampling costs the same whatever the code does, so the times stay close to
+an unprofiled run, and unlike ``cProfile`` it sees every thread at once.
+
+``ConversionJob`` profiles itself when ``ConversionSettings.profile`` is set
+and writes ``<name>.profile.folded`` and ``<name>.profile.txt`` next to the
+output.  From the command line::
+
+    python profiling.py book.txt --backend espeak-ng --top 20
+"""
+import argparse
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.005  # seconds between stack samples
+DEFAULT_TOP = 10
+FOLDED_SUFFIX = ".profile.folded"
+REPORT_SUFFIX = ".profile.txt"
+
+_THREADING_FILE = threading.__file__
+
+
+class Profiler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = collections.Counter()  # folded stack -> sample count
+        self.stage_seconds = collections.defaultdict(float)
+        self.chunk_seconds = collections.defaultdict(lambda: collections.defaultdict(float))
+        self.chunk_labels = {}
+        self.wall = 0.0
+        self._current = {}  # thread ident -> (stage, chunk) being worked on
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler",
+                                         daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+            self.wall += time.perf_counter() - self._started
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @contextlib.contextmanager
+    def measure(self, stage, chunk=None):
+        """Attribute the enclosed work on this thread to ``stage`` / ``chunk``"""
+        ident = threading.get_ident()
+        outer = self._current.get(ident)
+        self._current[ident] = (stage, chunk)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if outer is None:
+                self._current.pop(ident, None)
+            else:
+                self._current[ident] = outer
+            with self._lock:
+                self.stage_seconds[stage] += seconds
+                if chunk is not None:
+                    self.chunk_seconds[chunk][stage] += seconds
+
+    def forget(self, chunk):
+        with self._lock:
+            self.chunk_seconds.pop(chunk, None)
+
+    def label(self, chunk, text):
+        """Text shown for ``chunk`` in the slowest-chunks table"""
+        self.chunk_labels[chunk] = text
+
+    # Sampling
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, (stage, chunk) in list(self._current.items()):
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                root = [stage] if chunk is None else [stage, f"chunk {chunk + 1}"]
+                stack = ";".join(root + _stack(frame))
+                with self._lock:
+                    self.samples[stack] += 1
+
+    # Output
+
+    def write_folded(self, path):
+        with self._lock:
+            lines = [f"{stack} {count}\n" for stack, count in sorted(self.samples.items())]
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def slowest_chunks(self, top=DEFAULT_TOP):
+        """[(chunk, total seconds, {stage: seconds})], slowest first"""
+        totals = [(chunk, sum(stages.values()), dict(stages))
+                  for chunk, stages in self.chunk_seconds.items()]
+        return sorted(totals, key=lambda entry: entry[1], reverse=True)[:top]
+
+    def hot_spots(self, top=DEFAULT_TOP):
+        """[(function, self samples, total samples)], by self samples"""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [(frame, count, total[frame]) for frame, count in own.most_common(top)]
+
+    def report(self, pipeline_stats=None, top=DEFAULT_TOP):
+        sampled = sum(self.samples.values())
+        lines = [f"Profile: {self.wall:.2f} s wall, {sampled} samples "
+                 f"every {self.interval * 1000:.0f} ms", ""]
+
+        lines.append(f"{'stage':<12} {'busy s':>9} {'blocked s':>10} {'items':>7}")
+        stages = list(self.stage_seconds)
+        for name in (pipeline_stats or {}):
+            if name not in stages:
+                stages.append(name)
+        for name in stages:
+            stats = (pipeline_stats or {}).get(name, {})
+            busy = self.stage_seconds.get(name, stats.get("seconds", 0.0))
+            lines.append(f"{name:<12} {busy:>9.3f} {stats.get('blocked', 0.0):>10.3f} "
+                         f"{stats.get('items', ''):>7}")
+
+        slowest = self.slowest_chunks(top)
+        if slowest:
+            lines += ["", f"Slowest {len(slowest)} chunks:"]
+            for chunk, seconds, by_stage in slowest:
+                split = ", ".join(f"{name} {value:.3f}" for name, value in
+                                  sorted(by_stage.items(), key=lambda item: -item[1]))
+                text = " ".join(self.chunk_labels.get(chunk, "").split())
+                lines.append(f"  chunk {chunk + 1:<5} {seconds:>8.3f} s  ({split})")
+                if text:
+                    lines.append(f"      {text[:70]!r}")
+
+        hot = self.hot_spots(top)
+        if hot and sampled:
+            lines += ["", "Hot spots (self / total samples):"]
+            for frame, own, total in hot:
+                lines.append(f"  {own / sampled:>6.1%} {total / sampled:>6.1%}  {frame}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_file, pipeline_stats=None, top=DEFAULT_TOP):
+        """Write the folded stacks and report next to ``output_file``"""
+        base = os.path.splitext(output_file)[0]
+        folded, report = base + FOLDED_SUFFIX, base + REPORT_SUFFIX
+        self.write_folded(folded)
+        with open(report, "w", encoding="utf-8") as f:
+            f.write(self.report(pipeline_stats, top))
+        return folded, report
+
+
+def _stack(frame):
+    """Root-first frame labels, without the threading module's plumbing"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename != _THREADING_FILE:
+            labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                          f"{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def main():
+    from conversion import SAVE_MP3, ConversionJob, ConversionSettings
+    from tts_backends import PYTTSX3, available_backends
+
+    parser = argparse.ArgumentParser(description="Profile a conversion of a text file")
+    parser.add_argument("input")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--filename")
+    parser.add_argument("--backend", default=PYTTSX3, choices=available_backends())
+    parser.add_argument("--voice")
+    parser.add_argument("--rate", type=int, default=150)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP,
+                        help="Slowest chunks and hot spots to list")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL * 1000,
+                        help="Sampling interval in milliseconds")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        text = f.read()
+    engine = None
+    if args.backend == PYTTSX3:
+        import pyttsx3
+        engine = pyttsx3.init()
+    settings = ConversionSettings(
+        voice=args.voice, rate=args.rate, output_format=SAVE_MP3,
+        output_dir=args.output_dir,
+        filename=args.filename or os.path.splitext(os.path.basename(args.input))[0],
+        backend=args.backend, profile=True, profile_top=args.top,
+        profile_interval=args.interval / 1000,
+    )
+    ConversionJob(engine, text, settings,
+                  progress=lambda value=None, message=None: message and print(message)).run()
+    with open(settings.sidecar_file(REPORT_SUFFIX), encoding="utf-8") as f:
+        print(f.read())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Qt plumbing for running jobs off the GUI thread.
+
+Jobs run inside a ``TaskWorker`` moved onto its own ``QThread`` and report
+back only through signals.  Progress from a job is written into a
+``ProgressCoalescer``, which a GUI-thread timer drains at a fixed rate, so a
+job reporting thousands of chunks per second still costs at most one repaint
+per tick.
+"""
+import threading
+
+from PyQt5 import QtCore
+
+UI_REFRESH_MS = 100  # 10 Hz
+
+
+class TaskWorker(QtCore.QObject):
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        result = None
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.finished.emit(result)
+
+
+def start_worker(parent, fn, *args, on_finished=None, on_failed=None):
+    """Run ``fn(*args)`` on a new QThread owned by ``parent``.
+
+    ``on_finished``/``on_failed`` should be slots of a GUI-thread QObject so
+    they are delivered as queued calls.  Returns the (thread, worker) pair,
+    which the caller must keep referenced until ``finished``.
+    """
+    thread = QtCore.QThread(parent)
+    worker = TaskWorker(fn, *args)
+    worker.moveToThread(thread)
+    if on_failed is not None:
+        worker.failed.connect(on_failed)
+    if on_finished is not None:
+        worker.finished.connect(on_finished)
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    worker.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread, worker
+
+
+class ProgressCoalescer(QtCore.QObject):
+    """Keep only the latest progress report and publish it at most every tick.
+
+    Besides a progress value and status message a job can report the span of
+    source text currently being spoken; it is coalesced the same way.
+    """
+
+    updated = QtCore.pyqtSignal(int, str)
+    highlighted = QtCore.pyqtSignal(int, int)
+
+    def __init__(self, interval_ms=UI_REFRESH_MS, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._value = 0
+        self._message = ""
+        self._dirty = False
+        self._span = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def report(self, value=None, message=None):
+        """Thread-safe; ``None`` leaves that part of the display unchanged"""
+        with self._lock:
+            if value is not None:
+                self._value = value
+            if message is not None:
+                self._message = message
+            self._dirty = True
+
+    def report_span(self, start, end):
+        """Thread-safe; source offsets of the text being spoken"""
+        with self._lock:
+            self._span = (start, end)
+
+    def flush(self):
+        with self._lock:
+            dirty, span = self._dirty, self._span
+            value, message = self._value, self._message
+            self._dirty = False
+            self._span = None
+        if dirty:
+            self.updated.emit(value, message)
+        if span is not None:
+            self.highlighted.emit(*span)
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self.flush()
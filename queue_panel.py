@@ -0,0 +1,141 @@
+"""Queue panel: convert several documents in the background.
+
+A view of a ``job_queue.JobQueue``.  Documents added to the queue take the
+settings the main window has at that moment, so each one can be queued with
+its own voice, rate and output folder.  The table is redrawn from the queue
+at the same 10 Hz tick as the main progress bar.
+"""
+import os
+
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtWidgets import QFileDialog
+
+from job_queue import DEFAULT_CONCURRENCY, JobQueue
+from qt_workers import UI_REFRESH_MS
+
+COLUMNS = ("Document", "Priority", "Status", "Progress", "Output")
+
+
+class QueuePanel(QtWidgets.QWidget):
+    def __init__(self, current_settings, parent=None):
+        """``current_settings()`` returns the settings for newly added documents"""
+        super().__init__(parent, QtCore.Qt.Window)
+        self.setWindowTitle("Conversion Queue")
+        self.resize(760, 360)
+        self.current_settings = current_settings
+        self.queue = JobQueue(DEFAULT_CONCURRENCY)
+
+        self.table = QtWidgets.QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        self.add_button = QtWidgets.QPushButton("➕ Add files...")
+        self.remove_button = QtWidgets.QPushButton("✖ Remove")
+        self.up_button = QtWidgets.QPushButton("▲")
+        self.down_button = QtWidgets.QPushButton("▼")
+        self.pause_button = QtWidgets.QPushButton("⏸ Pause")
+        self.resume_button = QtWidgets.QPushButton("▶ Resume")
+        self.priority = QtWidgets.QSpinBox()
+        self.priority.setRange(-9, 9)
+        self.priority.setToolTip("Higher priority documents start first")
+        self.priority_button = QtWidgets.QPushButton("Set priority")
+        self.concurrency = QtWidgets.QSpinBox()
+        self.concurrency.setRange(1, max(1, os.cpu_count() or 1))
+        self.concurrency.setValue(min(DEFAULT_CONCURRENCY, self.concurrency.maximum()))
+        self.queue.set_limit(self.concurrency.value())
+
+        buttons = QtWidgets.QHBoxLayout()
+        for button in (self.add_button, self.remove_button, self.up_button,
+                       self.down_button, self.pause_button, self.resume_button):
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+        buttons.addWidget(QtWidgets.QLabel("Priority:"))
+        buttons.addWidget(self.priority)
+        buttons.addWidget(self.priority_button)
+        buttons.addWidget(QtWidgets.QLabel("At once:"))
+        buttons.addWidget(self.concurrency)
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        self.add_button.clicked.connect(self.add_files)
+        self.remove_button.clicked.connect(lambda: self._each_selected(self.queue.remove))
+        self.up_button.clicked.connect(lambda: self._move(-1))
+        self.down_button.clicked.connect(lambda: self._move(1))
+        self.pause_button.clicked.connect(lambda: self._each_selected(self.queue.pause))
+        self.resume_button.clicked.connect(lambda: self._each_selected(self.queue.resume))
+        self.priority_button.clicked.connect(lambda: self._each_selected(
+            lambda job_id: self.queue.set_priority(job_id, self.priority.value())))
+        self.concurrency.valueChanged.connect(self.queue.set_limit)
+
+        self._row_ids = []
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(UI_REFRESH_MS)
+
+    def add_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Add to Queue", "",
+                                                "Text files (*.txt *.md);;All files (*)")
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError as e:
+                QtWidgets.QMessageBox.critical(self, "Error", f"Cannot open file: {str(e)}")
+                continue
+            name = os.path.splitext(os.path.basename(path))[0]
+            settings = self.current_settings()
+            settings.filename = name
+            self.queue.add(os.path.basename(path), text, settings, self.priority.value())
+        self.refresh()
+
+    def selected_ids(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self._row_ids[row] for row in rows if row < len(self._row_ids)]
+
+    def _each_selected(self, fn):
+        for job_id in self.selected_ids():
+            try:
+                fn(job_id)
+            except KeyError:
+                pass  # finished removing since the last refresh
+        self.refresh()
+
+    def _move(self, offset):
+        selected = self.selected_ids()
+        # Move the selection as a block without jobs overtaking each other
+        for job_id in (reversed(selected) if offset > 0 else selected):
+            self.queue.move(job_id, offset)
+        self.refresh(select=selected)
+
+    def refresh(self, select=None):
+        jobs = self.queue.jobs()
+        if select is None:
+            select = self.selected_ids()
+        self._row_ids = [job.id for job in jobs]
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            status = job.state + (f" - {job.message}" if job.message and job.active else "")
+            values = (job.title, str(job.priority), status, f"{job.progress}%", job.output or "")
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    self.table.setItem(row, column, QtWidgets.QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+        selection = self.table.selectionModel()
+        selection.clearSelection()
+        for row, job in enumerate(jobs):
+            if job.id in select:
+                selection.select(self.table.model().index(row, 0),
+                                 QtCore.QItemSelectionModel.Select | QtCore.QItemSelectionModel.Rows)
+
+    def closeEvent(self, event):
+        # Jobs keep running with the panel hidden; the main window shuts the queue down
+        event.ignore()
+        self.hide()
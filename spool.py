@@ -0,0 +1,105 @@
+"""Scratch space for intermediate chunk audio.
+
+Engines render every chunk to a file before it is decoded and encoded into
+the book.  Those files used to go to a ``temp`` folder inside the output
+directory, which is often a network share.  A ``ChunkSpool`` hands out paths
+that are independent of the output directory:
+
+* on a RAM-backed filesystem (``/dev/shm``) while the chunk files alive at
+  that moment take up less than the memory budget; and
+* on local scratch disk (``$AUDIOBOOK_SCRATCH`` or the system temp dir)
+  once the budget is used up, or where no RAM filesystem exists.
+
+Chunk files are short-lived: callers ``release`` each one as soon as it has
+been decoded, so with the pipeline's bounded queues only a window of chunks
+is ever held and the budget is rarely exceeded.
+"""
+import os
+import shutil
+import tempfile
+import threading
+
+DEFAULT_BUDGET_MB = 256
+
+RAM_DIRS = ("/dev/shm", "/run/shm")
+
+
+def ram_dir():
+    """A writable RAM-backed directory, or None on this platform"""
+    for path in RAM_DIRS:
+        if os.path.isdir(path) and os.access(path, os.W_OK):
+            return path
+    return None
+
+
+def scratch_root():
+    return os.environ.get("AUDIOBOOK_SCRATCH") or tempfile.gettempdir()
+
+
+class ChunkSpool:
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, scratch_dir=None):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.scratch_dir = scratch_dir or scratch_root()
+        ram = ram_dir() if self.budget > 0 else None
+        self._ram = tempfile.mkdtemp(prefix="audiobook-", dir=ram) if ram else None
+        self._disk = None
+        self._live_ram = set()
+        self._lock = threading.Lock()
+        self.stats = {"ram_files": 0, "spilled_files": 0, "peak_ram_bytes": 0}
+
+    def path(self, name):
+        """Path for a new chunk file; RAM while under budget, else scratch disk"""
+        with self._lock:
+            if self._ram is not None:
+                used = self._ram_usage()
+                self.stats["peak_ram_bytes"] = max(self.stats["peak_ram_bytes"], used)
+                if used < self.budget:
+                    path = os.path.join(self._ram, name)
+                    self._live_ram.add(path)
+                    self.stats["ram_files"] += 1
+                    return path
+            if self._disk is None:
+                os.makedirs(self.scratch_dir, exist_ok=True)
+                self._disk = tempfile.mkdtemp(prefix="audiobook-", dir=self.scratch_dir)
+            self.stats["spilled_files"] += 1
+            return os.path.join(self._disk, name)
+
+    def release(self, path):
+        """Delete a chunk file that has been consumed"""
+        with self._lock:
+            self._live_ram.discard(path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def ram_bytes(self):
+        """Bytes of chunk files currently held in RAM"""
+        with self._lock:
+            return self._ram_usage()
+
+    def shrink(self):
+        """Halve the RAM budget, sending more chunk files to scratch disk"""
+        with self._lock:
+            self.budget //= 2
+
+    def _ram_usage(self):
+        # Only a window of chunks is alive at once, so this stays cheap
+        used = 0
+        for path in self._live_ram:
+            try:
+                used += os.path.getsize(path)
+            except OSError:
+                pass  # handed out but not written yet
+        return used
+
+    def close(self):
+        for directory in (self._ram, self._disk):
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+        self._ram = self._disk = None
+        self._live_ram.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
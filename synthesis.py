@@ -0,0 +1,110 @@
+"""Batched pyttsx3 file synthesis.
+
+Calling ``engine.save_to_file`` followed by ``engine.runAndWait`` for every
+chunk starts and tears down the driver loop once per chunk.  pyttsx3 can queue
+many utterances before a single ``runAndWait``, so ``BatchSynthesizer`` submits
+a window of chunks per run loop and then checks that every chunk produced its
+own file.
+
+Not every driver honours a queue of ``save_to_file`` commands (some versions
+of the espeak driver only render the last one), so chunks whose file is
+missing after a batch are re-rendered one at a time; if a whole window comes
+back incomplete the synthesizer drops to one chunk per run loop for the rest
+of the job instead of paying for every chunk twice.
+"""
+import contextlib
+import os
+import time
+
+DEFAULT_WINDOW = 16
+
+# Anything at or below a bare RIFF/WAVE header holds no audio
+MIN_AUDIO_FILE_SIZE = 45
+
+
+class SynthesisError(RuntimeError):
+    """A chunk could not be rendered, with the index of the offending chunk"""
+
+    def __init__(self, index, text, reason):
+        preview = text if len(text) <= 60 else text[:57] + "..."
+        super().__init__(f"Chunk {index + 1} could not be synthesized ({reason}): {preview!r}")
+        self.index = index
+        self.text = text
+        self.reason = reason
+
+
+class BatchSynthesizer:
+    """Render (index, text, path) items to files, ``window`` items per run loop"""
+
+    def __init__(self, engine, window=DEFAULT_WINDOW, should_stop=None, lock=None,
+                 voice=None):
+        self.engine = engine
+        self.window = max(1, int(window))
+        self.should_stop = should_stop or (lambda: False)
+        # Held for each batch when another thread also drives the engine
+        self.lock = lock or contextlib.nullcontext()
+        # Set for each batch when the engine is shared between voices
+        self.voice = voice
+        self.stats = {"chunks": 0, "run_loops": 0, "retries": 0, "seconds": 0.0}
+
+    def synthesize(self, items):
+        """Yield each (index, text, path) item, in order, once its file exists"""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.window:
+                yield from self._run_batch(batch)
+                batch = []
+        if batch:
+            yield from self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        if self.should_stop():
+            return
+        with self.lock:
+            if self.voice:
+                self.engine.setProperty('voice', self.voice)
+            self._render_batch(batch)
+        self.stats["chunks"] += len(batch)
+        for item in batch:
+            if self.should_stop():
+                return
+            yield item
+
+    def _render_batch(self, batch):
+        errors = {}
+
+        def on_error(name=None, exception=None, **kwargs):
+            errors[name] = exception
+
+        token = self.engine.connect('error', on_error)
+        start = time.perf_counter()
+        try:
+            for index, text, path in batch:
+                if os.path.exists(path):
+                    os.remove(path)
+                self.engine.save_to_file(text, path, name=str(index))
+            self.engine.runAndWait()
+            self.stats["run_loops"] += 1
+
+            missing = [item for item in batch if not self._has_audio(item[2])]
+            if missing and len(batch) > 1 and len(missing) == len(batch) - 1:
+                # The driver rendered only one queued command per loop
+                self.window = 1
+            for index, text, path in missing:
+                if self.should_stop():
+                    return
+                self.stats["retries"] += 1
+                self.engine.save_to_file(text, path, name=str(index))
+                self.engine.runAndWait()
+                self.stats["run_loops"] += 1
+                if not self._has_audio(path):
+                    reason = errors.get(str(index)) or "no audio written"
+                    raise SynthesisError(index, text, str(reason))
+        finally:
+            self.engine.disconnect(token)
+            self.stats["seconds"] += time.perf_counter() - start
+
+    @staticmethod
+    def _has_audio(path):
+        return os.path.exists(path) and os.path.getsize(path) > MIN_AUDIO_FILE_SIZE
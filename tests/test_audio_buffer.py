@@ -0,0 +1,77 @@
+import pytest
+
+import audio_buffer
+from audio_buffer import AudioBuffer, _zero_views
+from audio_codec import PcmAudio
+
+
+def _buffer(*parts):
+    """A mono 16-bit buffer whose views are ``parts``, frame n holding n"""
+    buffer, n = AudioBuffer(22050), 0
+    for frames in parts:
+        buffer._add(b"".join((n + i).to_bytes(2, "little") for i in range(frames)))
+        n += frames
+    return buffer
+
+
+def _values(buffer):
+    data = buffer.data
+    return [int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2)]
+
+
+@pytest.mark.parametrize("start, end", [
+    (0, 10), (2, 5), (3, 7), (4, 9), (0, 3), (7, 10), (5, 5), (-4, 4), (6, 99), (8, None),
+])
+def test_slice_across_view_boundaries(start, end):
+    buffer = _buffer(3, 4, 3)
+    expected = list(range(10))[max(start, 0):end]
+    sliced = buffer.slice(start, end)
+    assert _values(sliced) == expected
+    assert sliced.frames == len(expected)
+    assert all(len(view) for view in sliced.views)
+
+
+def test_slice_narrows_views_without_copying():
+    buffer = _buffer(3, 4, 3)
+    sliced = buffer.slice(2, 8)
+    assert len(sliced.views) == 3
+    assert [view.obj for view in sliced.views] == [view.obj for view in buffer.views]
+
+
+def test_getitem_takes_contiguous_slices_only():
+    buffer = _buffer(3, 4)
+    assert _values(buffer[1:-1]) == [1, 2, 3, 4, 5]
+    with pytest.raises(TypeError):
+        buffer[::2]
+
+
+@pytest.mark.parametrize("nbytes", [0, 10, audio_buffer._ZERO_BLOCK + 1,
+                                    16 * audio_buffer._ZERO_BLOCK,
+                                    16 * audio_buffer._ZERO_BLOCK * 3 + 5])
+def test_zero_views_total_the_size_asked_for(nbytes):
+    views = _zero_views(nbytes)
+    assert sum(len(view) for view in views) == nbytes
+    assert not any(any(view) for view in views)
+
+
+def test_silence_longer_than_the_shared_block_reuses_it():
+    limit = 16 * audio_buffer._ZERO_BLOCK
+    _zero_views(limit)  # grows the block to its largest
+    views = _zero_views(limit * 2 + 6)
+    assert [len(view) for view in views] == [limit, limit, 6]
+    assert len({id(view.obj) for view in views}) == 1
+    assert len(audio_buffer._zeros) == limit
+
+
+def test_append_silence_after_speech():
+    speech = PcmAudio(b"\x01\x02" * 5, 22050, 1, 2)
+    frames = 16 * audio_buffer._ZERO_BLOCK  # twice the block's size in bytes
+    buffer = AudioBuffer.from_pcm(speech).append_silence(frames)
+    assert buffer.frames == 5 + frames
+    assert buffer.data[:10] == speech.data
+    assert buffer.data[10:] == bytes(2 * frames)
+
+
+def test_append_rejects_another_format():
+    with pytest.raises(ValueError):
+        AudioBuffer(22050).append(AudioBuffer(44100))
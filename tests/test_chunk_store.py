@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from audio_codec import PcmAudio
+from chunk_store import PLANES_ZLIB, ZLIB, ChunkStore, checkpoint_store, pack_pcm, unpack_pcm
+
+
+def _speech(n):
+    return bytes((i * 7) % 256 for i in range(n))
+
+
+@pytest.mark.parametrize("audio, codec", [
+    (PcmAudio(_speech(4000), 22050, 1, 2), PLANES_ZLIB),
+    (PcmAudio(_speech(4000), 44100, 2, 2), PLANES_ZLIB),
+    (PcmAudio(_speech(4001), 22050, 1, 1), ZLIB),
+    (PcmAudio(b"", 22050, 1, 2), PLANES_ZLIB),
+])
+def test_pack_unpack_round_trip(audio, codec):
+    packed_codec, payload = pack_pcm(audio)
+    assert packed_codec == codec
+    assert unpack_pcm(packed_codec, payload, *audio[1:]) == audio
+
+
+@pytest.mark.parametrize("data, kept", [
+    (b"\x01\x02\x03", b"\x01\x02"),
+    (b"\x01\x02\x03\x04\x05\x06", b"\x01\x02\x03\x04"),
+])
+def test_partial_frame_is_trimmed(data, kept):
+    channels = 1 if len(data) == 3 else 2
+    audio = PcmAudio(data, 22050, channels, 2)
+    assert unpack_pcm(*pack_pcm(audio), *audio[1:]).data == kept
+
+
+def test_unknown_codec_is_an_error():
+    with pytest.raises(ValueError):
+        unpack_pcm("lzma", pack_pcm(PcmAudio(b"ab", 22050, 1, 2))[1], 22050, 1, 2)
+
+
+def test_store_round_trip_and_reopen(tmp_path):
+    path = str(tmp_path / "book")
+    store = ChunkStore(path)
+    chunks = {f"chunk-{n}": PcmAudio(_speech(100 + n), 22050, 1, 1) for n in range(3)}
+    for key, audio in chunks.items():
+        store.put(key, audio)
+    store.put("chunk-0", PcmAudio(b"other", 22050, 1, 1))  # first write wins
+    assert store.get("chunk-0") == chunks["chunk-0"]
+    store.close()
+
+    reopened = ChunkStore(path)
+    assert len(reopened) == 3
+    assert all(reopened.get(key) == audio for key, audio in chunks.items())
+    assert reopened.get("missing") is None
+
+
+def test_torn_index_line_keeps_the_chunks_before_it(tmp_path):
+    path = str(tmp_path / "book")
+    store = ChunkStore(path)
+    store.put("a", PcmAudio(_speech(200), 22050, 1, 2))
+    store.put("b", PcmAudio(_speech(300), 22050, 1, 2))
+    store.close()
+    with open(path + ".idx", "rb+") as f:
+        f.truncate(os.path.getsize(path + ".idx") - 10)
+
+    reopened = ChunkStore(path)
+    assert "a" in reopened and "b" not in reopened
+    reopened.put("b", PcmAudio(_speech(300), 22050, 1, 2))
+    assert reopened.get("b").data == _speech(300)
+
+
+def test_index_entry_past_the_data_is_dropped(tmp_path):
+    path = str(tmp_path / "book")
+    store = ChunkStore(path)
+    store.put("a", PcmAudio(_speech(200), 22050, 1, 2))
+    store.put("b", PcmAudio(_speech(300), 22050, 1, 2))
+    store.close()
+    with open(path + ".dat", "rb+") as f:
+        f.truncate(os.path.getsize(path + ".dat") - 1)
+    assert "b" not in ChunkStore(path)
+
+
+def test_checkpoints_are_pruned_oldest_first(tmp_path):
+    directory = str(tmp_path)
+    for n in range(3):
+        store = checkpoint_store(f"book{n}.mp3", {"rate": 150}, directory, max_checkpoints=2)
+        store.put("a", PcmAudio(b"ab", 22050, 1, 2))
+        store.close()
+        os.utime(store.index_file, (n, n))
+    assert len(os.listdir(directory)) == 4
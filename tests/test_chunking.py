@@ -0,0 +1,80 @@
+import math
+import random
+
+import pytest
+
+from chunking import ChunkPolicy, EngineTiming, best_chunk_size
+
+
+def _book(paragraphs=30, seed=3):
+    rng = random.Random(seed)
+    words = ["the", "quiet", "river", "ran", "past", "a", "mill", "where", "nobody", "lived"]
+    paras = []
+    for _ in range(paragraphs):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 25))).capitalize()
+                     + rng.choice(".!?") for _ in range(rng.randint(1, 8))]
+        paras.append(("  " if rng.random() < 0.3 else "") + "  ".join(sentences))
+    return "\n\n \n".join(paras) + "\n"
+
+
+@pytest.mark.parametrize("max_chars, min_chars", [(500, 0), (120, 0), (300, 200), (80, 80)])
+def test_spans_are_exact_ordered_slices(max_chars, min_chars):
+    text = _book()
+    spans = list(ChunkPolicy(max_chars, min_chars).iter_spans(text))
+    assert all(a_end <= b_start for (_, a_end), (b_start, _) in zip(spans, spans[1:]))
+    for start, end in spans:
+        chunk = text[start:end]
+        assert chunk == chunk.strip() and chunk
+    # Nothing but whitespace falls between chunks
+    covered = "".join(text[start:end] for start, end in spans)
+    assert "".join(covered.split()) == "".join(text.split())
+
+
+def test_min_chars_merges_across_paragraphs():
+    text = "One.\n\nTwo.\n\nThree is longer.\n\nFour."
+    policy = ChunkPolicy(max_chars=100, min_chars=10)
+    # A short last chunk has nothing left to merge with
+    assert policy.split(text) == ["One.\n\nTwo.", "Three is longer.", "Four."]
+
+
+def test_merging_stops_at_max_chars():
+    text = "Aaaa.\n\nBbbb.\n\nCccc."
+    assert ChunkPolicy(max_chars=12, min_chars=12).split(text) == ["Aaaa.\n\nBbbb.", "Cccc."]
+
+
+def test_long_paragraph_splits_on_sentences():
+    text = "First one here. Second one here. Third one here."
+    assert ChunkPolicy(max_chars=32).split(text) == ["First one here. Second one here.",
+                                                     "Third one here."]
+    sentence = "A single sentence that is far longer than the limit."
+    assert ChunkPolicy(max_chars=10).split(sentence) == [sentence]
+
+
+@pytest.mark.parametrize("max_chars, min_chars", [(0, 0), (100, 101), (100, -1)])
+def test_policy_rejects_bad_limits(max_chars, min_chars):
+    with pytest.raises(ValueError):
+        ChunkPolicy(max_chars, min_chars)
+
+
+@pytest.mark.parametrize("workers, seconds", [(1, 14), (2, 8), (4, 4), (8, 4)])
+def test_makespan(workers, seconds):
+    # Four chunks of 300, 300, 300 and 100 characters, 4 s for a full one
+    timing = EngineTiming(overhead=1, chars_per_second=100)
+    assert timing.makespan(1000, 300, workers) == pytest.approx(seconds)
+
+
+def test_best_chunk_size_balances_overhead_and_latency():
+    timing = EngineTiming(overhead=0.2, chars_per_second=100)
+    size = best_chunk_size(timing, 10000, step=10)
+    assert abs(size - math.sqrt(10000 * 0.2 * 100)) <= 0.15 * size
+    estimates = {s: timing.makespan(10000, s) + timing.chunk_seconds(s)
+                 for s in range(100, 2001, 10)}
+    assert estimates[size] <= min(estimates.values()) * 1.001
+
+
+def test_best_chunk_size_limits():
+    timing = EngineTiming(overhead=0.2, chars_per_second=100)
+    assert best_chunk_size(timing, 0) == 2000
+    assert best_chunk_size(EngineTiming(5, 100), 10 ** 8, max_chars=1500) == 1500
+    assert best_chunk_size(EngineTiming(0, 100), 10000) == 100
+    assert best_chunk_size(timing, 10000, workers=4) <= best_chunk_size(timing, 10000)
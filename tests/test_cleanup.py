@@ -0,0 +1,83 @@
+from cleanup import TextCleaner, find_boilerplate, line_key, page_like
+
+WORDS = ("rain harbour boats lantern quay gulls rope tide mast sail anchor "
+         "keeper storm cliff net oar").split()
+
+
+def paragraph(n):
+    """A two-line wrapped paragraph that no other paragraph repeats"""
+    first, second = WORDS[n % len(WORDS)], WORDS[(n * 7 + 3) % len(WORDS)]
+    return (f"The {first} had not moved for days, and the {second} was\n"
+            f"no better than it had been the {WORDS[n // len(WORDS)]} before.")
+
+
+def book(pages, header="THE STORM  {page}", footer="{page}", paragraphs=3):
+    """Pages of extracted text with a running header and a page number footer"""
+    out = []
+    for page in range(1, pages + 1):
+        body = "\n".join(paragraph(page * paragraphs + n) for n in range(paragraphs))
+        out.append(f"{header.format(page=page)}\n\n{body}\n\n{footer.format(page=page)}")
+    return "\n".join(out)
+
+
+def test_running_header_with_page_numbers_is_boilerplate():
+    assert "the storm #" in find_boilerplate(book(10))
+
+
+def test_page_numbers_are_boilerplate():
+    assert "#page" in find_boilerplate(book(10))
+
+
+def test_exact_repeats_are_boilerplate_wherever_they_fall():
+    text = "\n\n".join(f"A NOVEL\n\n" + "\n".join(map(paragraph, range(n * n))) for n in range(5))
+    assert "a novel" in find_boilerplate(text)
+
+
+def test_prose_is_never_boilerplate():
+    assert line_key("He said nothing.") is None
+    assert line_key(paragraph(1).replace("\n", " ")) is None
+    assert not find_boilerplate("\n".join(["She waited."] * 10))
+
+
+def test_chapter_headings_are_not_boilerplate():
+    text = "\n\n".join(f"Chapter {n}\n\n{paragraph(2 * n)}\n\n{paragraph(2 * n + 1)}"
+                       for n in range(1, 6))
+    assert find_boilerplate(text) == frozenset()
+    cleaned = TextCleaner.for_text(text).apply(text)
+    for n in range(1, 6):
+        assert f"Chapter {n}" in cleaned
+
+
+def test_heading_keys_keep_their_number():
+    assert line_key("Chapter 2") != line_key("Chapter 3")
+    assert line_key("Chapter 3 - The Storm  47") == line_key("Chapter 3 - The Storm  48")
+
+
+def test_numbered_lines_at_uneven_intervals_are_not_boilerplate():
+    sections = [f"{n}\n\n" + "\n".join(map(paragraph, range(n * n, 2 * n * n)))
+                for n in range(1, 6)]
+    assert "#page" not in find_boilerplate("\n\n".join(sections))
+
+
+def test_page_like_intervals():
+    assert page_like([0, 40, 80, 121, 160, 240])
+    assert not page_like([0, 10, 200, 230, 700])
+    assert not page_like([0, 500, 1000, 1500])
+    assert not page_like([7])
+
+
+def test_cleaner_removes_furniture_and_mends_wraps():
+    text = book(4)
+    cleaner = TextCleaner.for_text(text)
+    cleaned = cleaner.apply(text)
+    assert "THE STORM" not in cleaned
+    assert "\n1\n" not in cleaned
+    assert paragraph(3).replace("\n", " ") in cleaned
+    assert cleaner.stats["lines_removed"] == 8
+    assert cleaner.saved > 0
+
+
+def test_hyphenation_is_repaired_but_real_hyphens_kept():
+    cleaner = TextCleaner()
+    assert cleaner.apply("an exam-\nple of it") == "an example of it"
+    assert cleaner.apply("the Anglo-\nSaxon kings") == "the Anglo-Saxon kings"
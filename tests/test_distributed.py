@@ -0,0 +1,174 @@
+import http.client
+import sys
+import threading
+
+import pytest
+
+import distributed
+from distributed import DistributedSynthesizer, ShardQueue, decode_results, encode_results
+from synthesis import SynthesisError
+
+
+def _batch(*positions):
+    return [(position, 0) for position in positions]
+
+
+def test_batches_are_cut_in_order_as_workers_ask():
+    queue = ShardQueue("abcde", ["A", "B"], batch=2)
+    assert queue.take("A") == _batch(0, 1)
+    assert queue.take("B") == _batch(2, 3)
+    assert queue.items == {0: "a", 1: "b", 2: "c", 3: "d"}
+
+
+def test_input_is_read_only_a_few_batches_ahead():
+    read = []
+
+    def chunks():
+        for n in range(100):
+            read.append(n)
+            yield n
+    queue = ShardQueue(chunks(), ["A"], batch=2, ahead=4)
+    assert queue.take("A") == _batch(0, 1)
+    queue.done("A")
+    assert queue.take("A") == _batch(2, 3)
+    queue.done("A")
+    assert queue.take("A", poll=0.01, should_stop=_after(3)) is None
+    assert len(read) == 4
+    queue.release(0)
+    assert queue.take("A") == _batch(4, 5)
+    assert 0 not in queue.items
+
+
+def test_retry_goes_to_a_worker_that_has_not_failed_it():
+    queue = ShardQueue("ab", ["A", "B"], batch=1)
+    assert queue.take("B") == _batch(0)
+    queue.put_back(_batch(0), "B")
+    assert queue.take("A") == _batch(0)
+
+
+def test_failers_add_up_across_attempts():
+    queue = ShardQueue("a", ["A", "B", "C"])
+    assert queue.take("A") == _batch(0)
+    queue.put_back(_batch(0), "A")
+    assert queue.take("B") == _batch(0)
+    queue.put_back(_batch(0), "B")
+    assert queue.retries[0][1] == {"A", "B"}
+    assert queue.take("C") == _batch(0)
+
+
+def test_failer_retries_only_when_no_other_worker_is_alive():
+    queue = ShardQueue("a", ["A", "B"])
+    assert queue.take("B") == _batch(0)
+    queue.put_back(_batch(0), "B")
+    assert queue.take("B", poll=0.01, should_stop=_after(3)) is None
+    queue.retire("A")
+    assert queue.take("B") == _batch(0)
+
+
+def test_idle_worker_waits_for_batches_in_flight():
+    queue = ShardQueue("ab", ["A", "B"], batch=1)
+    assert queue.take("A") == _batch(0)
+    queue.done("A")
+    assert queue.take("B") == _batch(1)
+    taken = []
+    idle = threading.Thread(target=lambda: taken.append(queue.take("A", poll=0.05)))
+    idle.start()
+    queue.put_back(_batch(1), "B")
+    idle.join(5)
+    assert taken == [_batch(1)]
+
+
+def test_take_returns_none_once_everything_is_done():
+    queue = ShardQueue("a", ["A", "B"])
+    assert queue.take("A") == _batch(0)
+    queue.done("A")
+    assert queue.take("B") is None
+
+
+def _after(calls):
+    count = [0]
+
+    def should_stop():
+        count[0] += 1
+        return count[0] > calls
+    return should_stop
+
+
+def _synthesizer(monkeypatch, tmp_path, failing):
+    monkeypatch.setattr(distributed, "RETRY_BACKOFF", 0)
+    synthesizer = DistributedSynthesizer(["A", "B"], batch=1)
+
+    def render(worker, items, pending):
+        if worker in failing:
+            raise OSError(f"{worker} unreachable")
+        for position, _ in pending:
+            with open(items[position][2], "wb") as f:
+                f.write(b"wav")
+    monkeypatch.setattr(synthesizer, "_render", render)
+    items = [(i, f"chunk {i}", str(tmp_path / f"{i}.wav")) for i in range(8)]
+    return synthesizer, items
+
+
+def test_healthy_worker_retries_a_dead_workers_chunks(monkeypatch, tmp_path):
+    synthesizer, items = _synthesizer(monkeypatch, tmp_path, failing={"B"})
+    assert list(synthesizer.synthesize(items)) == items
+    assert synthesizer.stats["per_worker"] == {"A": 8, "B": 0}
+
+
+def test_healthy_worker_retries_a_torn_reply(monkeypatch, tmp_path):
+    synthesizer, items = _synthesizer(monkeypatch, tmp_path, failing=set())
+    render = synthesizer._render
+    torn = []
+
+    def tear_once(worker, items, pending):
+        if not torn:
+            torn.append(pending)
+            raise http.client.IncompleteRead(b"")
+        render(worker, items, pending)
+    monkeypatch.setattr(synthesizer, "_render", tear_once)
+    assert list(synthesizer.synthesize(items)) == items
+    assert synthesizer.stats["retries"] == 1
+
+
+def test_results_round_trip():
+    results = [(3, b"RIFF-a"), (4, b"")]
+    assert decode_results(encode_results(results)) == dict(results)
+
+
+@pytest.mark.parametrize("cut", [5, 14])
+def test_truncated_reply_is_a_value_error(cut):
+    with pytest.raises(ValueError):
+        decode_results(encode_results([(3, b"RIFF-a")])[:-cut])
+
+
+def test_every_worker_failing_is_an_error(monkeypatch, tmp_path):
+    synthesizer, items = _synthesizer(monkeypatch, tmp_path, failing={"A", "B"})
+    with pytest.raises(SynthesisError):
+        list(synthesizer.synthesize(items))
+
+
+def test_input_error_reaches_the_caller(monkeypatch, tmp_path):
+    synthesizer, items = _synthesizer(monkeypatch, tmp_path, failing=set())
+
+    def chunks():
+        yield from items[:3]
+        raise OSError("segmenting failed")
+    with pytest.raises(OSError, match="segmenting failed"):
+        list(synthesizer.synthesize(chunks()))
+
+
+def test_local_workers_answer_on_the_ports_they_report():
+    processes, addresses = distributed.spawn_local_workers(2)
+    try:
+        assert len(set(addresses)) == 2
+        assert all(distributed._healthy(address) for address in addresses)
+    finally:
+        distributed.stop_local_workers(processes)
+
+
+def test_local_worker_exiting_at_startup_is_an_error(monkeypatch):
+    popen = distributed.subprocess.Popen
+    monkeypatch.setattr(distributed.subprocess, "Popen",
+                        lambda args: popen([sys.executable, "-c", "pass"]))
+    with pytest.raises(RuntimeError, match="did not start"):
+        distributed.spawn_local_workers(1, startup_timeout=10)
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from hls import PLAYLIST_NAME, HlsWriter, segment_file, timestamp_tag
+from incremental import frame_info, scan_frames
+
+HEADER = bytes([0xFF, 0xF3, 0x80, 0x00])  # MPEG-2 Layer III, 64 kbps, 22050 Hz
+FRAME_SAMPLES = 576
+
+
+def _frame(tag):
+    length, _ = frame_info(HEADER)
+    return HEADER + bytes([tag]) * (length - len(HEADER))
+
+
+def _syncsafe(data):
+    value = 0
+    for byte in data:
+        assert byte < 0x80
+        value = (value << 7) | byte
+    return value
+
+
+@pytest.mark.parametrize("sample, sample_rate, pts", [
+    (0, 22050, 0), (22050, 22050, 90000), (441, 44100, 900),
+    ((1 << 33) + 900, 90000, 900),  # wraps at 33 bits
+])
+def test_timestamp_tag_layout(sample, sample_rate, pts):
+    tag = timestamp_tag(sample, sample_rate)
+    assert tag[:6] == b"ID3\x04\x00\x00"
+    assert _syncsafe(tag[6:10]) == len(tag) - 10
+    frame = tag[10:]
+    assert frame[:4] == b"PRIV" and frame[8:10] == b"\0\0"
+    body = frame[10:]
+    assert _syncsafe(frame[4:8]) == len(body)
+    owner, _, timestamp = body.partition(b"\0")
+    assert owner == b"com.apple.streaming.transportStreamTimestamp"
+    assert int.from_bytes(timestamp, "big") == pts and len(timestamp) == 8
+
+
+def _playlist(writer):
+    with open(writer.playlist, encoding="utf-8") as f:
+        return f.read()
+
+
+def _segment(writer, n):
+    with open(os.path.join(writer.directory, f"segment_{n:05d}.mp3"), "rb") as f:
+        return f.read()
+
+
+def test_poll_cuts_segments_as_the_file_grows(tmp_path):
+    source = tmp_path / "book.mp3"
+    # 0.1 s holds three 576-sample frames at 22050 Hz
+    writer = HlsWriter(str(source), segment_seconds=0.1)
+    writer.poll()  # the encoder has not created the file yet
+    frames = [_frame(n) for n in range(7)]
+    data = b"".join(frames)
+    with open(source, "wb") as f:
+        f.write(data[:len(frames[0]) * 4 + 10])  # four frames and a bit
+    writer.poll()
+    assert writer.segments == 1
+    with open(source, "ab") as f:
+        f.write(data[len(frames[0]) * 4 + 10:])
+    writer.poll()
+    assert writer.segments == 2
+    writer.close()
+
+    assert writer.segments == 3
+    assert writer.seconds == pytest.approx(7 * FRAME_SAMPLES / 22050)
+    entries = [line for line in _playlist(writer).splitlines() if line.startswith("#EXTINF")]
+    assert entries == ["#EXTINF:0.078,", "#EXTINF:0.078,", "#EXTINF:0.026,"]
+    assert _playlist(writer).endswith("segment_00002.mp3\n#EXT-X-ENDLIST\n")
+    for n, (start, count) in enumerate([(0, 3), (3, 3), (6, 1)]):
+        tag = timestamp_tag(start * FRAME_SAMPLES, 22050)
+        assert _segment(writer, n) == tag + b"".join(frames[start:start + count])
+
+
+def test_poll_resynchronises_past_junk(tmp_path):
+    source = tmp_path / "book.mp3"
+    frames = [_frame(n) for n in range(2)]
+    source.write_bytes(b"\x00\xFF\x12" + frames[0] + b"junk" + frames[1])
+    playlist = segment_file(str(source), segment_seconds=10)
+    directory = os.path.dirname(playlist)
+    with open(os.path.join(directory, "segment_00000.mp3"), "rb") as f:
+        assert f.read() == timestamp_tag(0, 22050) + b"".join(frames)
+
+
+def test_segments_start_with_a_tag_scan_frames_skips(tmp_path):
+    source = tmp_path / "book.mp3"
+    source.write_bytes(_frame(1) * 5)
+    writer = HlsWriter(str(source), segment_seconds=0.06)  # two frames a segment
+    writer.close()
+    path = os.path.join(writer.directory, "segment_00001.mp3")
+    tag = len(timestamp_tag(0, 22050))
+    assert scan_frames(path) == [tag, tag + 208, tag + 416]
+
+
+def test_new_writer_clears_old_segments(tmp_path):
+    source = tmp_path / "book.mp3"
+    source.write_bytes(_frame(1) * 5)
+    writer = HlsWriter(str(source), segment_seconds=0.05)
+    writer.close()
+    source.write_bytes(_frame(1))
+    writer = HlsWriter(str(source), segment_seconds=0.05)
+    writer.close()
+    assert sorted(os.listdir(writer.directory)) == [PLAYLIST_NAME, "segment_00000.mp3"]
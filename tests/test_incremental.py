@@ -0,0 +1,149 @@
+import os
+import types
+
+import pytest
+
+import incremental
+from audio_codec import PcmAudio
+from conversion import ConversionJob, ConversionSettings
+from incremental import (ENCODER_DELAY, MANIFEST_SUFFIX, ChunkManifest, chunk_digest,
+                         frame_info, frame_samples, pad_to_frames, scan_frames, splice_files)
+
+MPEG1_128K_44100 = bytes([0xFF, 0xFB, 0x90, 0x00])  # 417 bytes, 418 padded
+MPEG2_64K_22050 = bytes([0xFF, 0xF3, 0x80, 0x00])  # 208 bytes
+
+
+def _frame(header, tag=0):
+    length, _ = frame_info(header)
+    return header + bytes([tag]) * (length - len(header))
+
+
+def _padded(header):
+    return header[:2] + bytes([header[2] | 0x02]) + header[3:]
+
+
+@pytest.mark.parametrize("header, info", [
+    (MPEG1_128K_44100, (417, 44100)),
+    (_padded(MPEG1_128K_44100), (418, 44100)),
+    (MPEG2_64K_22050, (208, 22050)),
+])
+def test_frame_info(header, info):
+    assert frame_info(header) == info
+
+
+@pytest.mark.parametrize("header", [
+    b"ID3\x04",
+    bytes([0xFF, 0xFD, 0x90, 0x00]),  # Layer II
+    bytes([0xFF, 0xFB, 0xF0, 0x00]),  # bad bitrate
+    bytes([0xFF, 0xFB, 0x9C, 0x00]),  # reserved sample rate
+    bytes([0xFF, 0xEB, 0x90, 0x00]),  # reserved version
+])
+def test_frame_info_rejects_other_headers(header):
+    assert frame_info(header) is None
+
+
+def test_scan_frames_skips_id3_and_stops_at_junk(tmp_path):
+    frames = [_frame(MPEG2_64K_22050, 1), _frame(_padded(MPEG1_128K_44100), 2)]
+    tag = b"ID3\x04\x00\x00" + bytes([0, 0, 1, 0x05]) + b"t" * 133  # 128 + 5 bytes
+    path = tmp_path / "book.mp3"
+    path.write_bytes(tag + b"".join(frames) + b"\x00" * 50)
+    start = len(tag)
+    assert scan_frames(str(path)) == [start, start + 208, start + 208 + 418]
+
+
+def test_scan_frames_of_an_empty_file(tmp_path):
+    path = tmp_path / "empty.mp3"
+    path.write_bytes(b"")
+    assert scan_frames(str(path)) == [0]
+
+
+@pytest.mark.parametrize("sample_rate", [22050, 44100])
+@pytest.mark.parametrize("speech_frames", [0, 1, 575, 4000])
+@pytest.mark.parametrize("pause", [0, 0.01, 0.5])
+def test_pad_to_frames(sample_rate, speech_frames, pause):
+    sound = PcmAudio(b"\x01\x00" * speech_frames, sample_rate, 1, 2)
+    padded = pad_to_frames(sound, pause)
+    frame = frame_samples(sample_rate)
+    silence = padded.frames - speech_frames
+    assert padded.frames % frame == 0
+    assert silence >= max(ENCODER_DELAY + frame, round(pause * sample_rate))
+    assert silence < max(ENCODER_DELAY + frame, round(pause * sample_rate)) + frame
+    assert padded.data[:2 * speech_frames] == sound.data
+    assert not any(padded.data[2 * speech_frames:])
+
+
+class _Seeks:
+    """Source file that records where it is read from"""
+
+    def __init__(self, f, seeks):
+        self.f, self.seeks = f, seeks
+
+    def seek(self, position):
+        self.seeks.append(position)
+        return self.f.seek(position)
+
+    def read(self, size):
+        return self.f.read(size)
+
+    def close(self):
+        self.f.close()
+
+
+def test_splice_merges_adjacent_ranges(tmp_path, monkeypatch):
+    old, new = tmp_path / "old", tmp_path / "new"
+    old.write_bytes(b"0123456789")
+    new.write_bytes(b"abcdef")
+    seeks = []
+    monkeypatch.setattr(incremental, "open", lambda path, mode="r": (
+        _Seeks(open(path, mode), seeks) if mode == "rb" else open(path, mode)), raising=False)
+    out = tmp_path / "out"
+    splice_files(str(out), [(str(old), 0, 2), (str(old), 2, 5), (str(new), 1, 3),
+                            (str(old), 7, 10)])
+    assert out.read_bytes() == b"01234bc789"
+    assert seeks == [0, 1, 7]
+
+
+def test_splice_error_leaves_no_part_file(tmp_path):
+    source, out = tmp_path / "old", tmp_path / "out"
+    source.write_bytes(b"0123")
+    out.write_bytes(b"previous book")
+    with pytest.raises(IOError):
+        splice_files(str(out), [(str(source), 0, 2), (str(source), 2, 10)])
+    assert out.read_bytes() == b"previous book"
+    assert not os.path.exists(str(out) + ".part")
+
+
+def test_update_splices_changed_chunks_between_unchanged_ones(tmp_path):
+    frame = frame_samples(22050)
+    settings = ConversionSettings(output_dir=str(tmp_path), write_index=False)
+    text = "Alpha. Bravo. Charlie."
+    job = ConversionJob(None, text, settings, codec=object())
+    old_chunks = ["Alpha.", "Beta.", "Charlie."]
+    previous = ChunkManifest({"format": [22050, 1, 2]}, 22050)
+    with open(settings.output_file, "wb") as f:
+        for n, chunk in enumerate(old_chunks):
+            previous.add(chunk_digest(chunk), 2 * frame * n, 600, 2 * frame)
+            f.write(_frame(MPEG2_64K_22050, 2 * n) + _frame(MPEG2_64K_22050, 2 * n + 1))
+
+    chunks = ["Alpha.", "Bravo.", "Charlie."]
+    rendered = []
+
+    def render_changed(previous, changed, chunks, digests, spool, fresh_file):
+        rendered.extend(changed)
+        with open(fresh_file, "wb") as f:
+            f.write(_frame(MPEG2_64K_22050, 9) * 3)
+        return {digests[1]: (0, 900, 3 * frame)}
+    job._render_changed = render_changed
+    spool = types.SimpleNamespace(path=lambda name: str(tmp_path / name))
+    spans = [(0, 6), (7, 13), (14, 22)]
+    assert job._update(previous, chunks, spans, spool) == settings.output_file
+
+    assert rendered == [1]
+    with open(settings.output_file, "rb") as f:
+        data = f.read()
+    tags = [data[offset + 4] for offset in scan_frames(settings.output_file)[:-1]]
+    assert tags == [0, 1, 9, 9, 9, 4, 5]
+    manifest = ChunkManifest.load(settings.sidecar_file(MANIFEST_SUFFIX))
+    assert [chunk[1:] for chunk in manifest.chunks] == [
+        [0, 600, 2 * frame], [2 * frame, 2 * frame + 900, 5 * frame],
+        [5 * frame, 5 * frame + 600, 7 * frame]]
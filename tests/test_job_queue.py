@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+import job_queue
+from conversion import ConversionSettings
+from job_queue import DONE, PAUSED, QUEUED, RUNNING, JobQueue
+
+
+class FakeJob:
+    """Stands in for ConversionJob: runs until its title is released or it is stopped"""
+    release = {}
+    started = []
+
+    def __init__(self, engine, text, settings, progress=None, should_stop=None):
+        self.text = text
+        self.settings = settings
+        self.should_stop = should_stop
+
+    def run(self):
+        FakeJob.started.append(self.text)
+        event = FakeJob.release.setdefault(self.text, threading.Event())
+        while not event.wait(0.01):
+            if self.should_stop():
+                return None
+        return self.settings.output_file
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    FakeJob.release = {}
+    FakeJob.started = []
+    monkeypatch.setattr(job_queue, "ConversionJob", FakeJob)
+    queue = JobQueue(2, worker_processes=False)
+    yield queue
+    for event in FakeJob.release.values():
+        event.set()
+    queue.shutdown()
+
+
+def add(queue, name, priority=0):
+    return queue.add(name, name, ConversionSettings(filename=name), priority)
+
+
+def finish(name):
+    FakeJob.release.setdefault(name, threading.Event()).set()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def states(queue):
+    return [job.state for job in queue.jobs()]
+
+
+def test_runs_up_to_the_limit(queue):
+    for name in "abc":
+        add(queue, name)
+    assert states(queue) == [RUNNING, RUNNING, QUEUED]
+    finish("a")
+    wait_for(lambda: states(queue) == [DONE, RUNNING, RUNNING])
+
+
+def test_highest_priority_starts_first_then_list_order(queue):
+    queue.set_limit(1)
+    for name, priority in (("a", 0), ("b", 0), ("c", 5), ("d", 5)):
+        add(queue, name, priority)
+    for name in "acdb":
+        wait_for(lambda: FakeJob.started[-1:] == [name])
+        finish(name)
+    wait_for(lambda: states(queue) == [DONE] * 4)
+
+
+def test_lowering_and_raising_the_limit_keeps_one_job_per_slot(queue):
+    queue.set_limit(1)
+    queue.set_limit(2)
+    assert sorted(queue._free_slots) == [0, 1]
+    for name in "abc":
+        add(queue, name)
+    assert states(queue).count(RUNNING) == 2
+
+
+def test_lowered_limit_holds_back_jobs_until_running_ones_finish(queue):
+    for name in "abc":
+        add(queue, name)
+    queue.set_limit(1)
+    finish("a")
+    wait_for(lambda: states(queue)[0] == DONE)
+    assert states(queue)[2] == QUEUED
+    finish("b")
+    wait_for(lambda: states(queue)[2] == RUNNING)
+
+
+def test_pause_and_resume(queue):
+    job = add(queue, "a")
+    queue.pause(job.id)
+    wait_for(lambda: job.state == PAUSED)
+    queue.resume(job.id)
+    assert job.state == RUNNING
+    finish("a")
+    wait_for(lambda: job.state == DONE)
+    assert job.output.endswith("a.mp3")
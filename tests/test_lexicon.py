@@ -0,0 +1,46 @@
+import pytest
+
+import lexicon
+from lexicon import Lexicon, load_lexicon, parse_lexicon
+
+
+def test_parse_lexicon():
+    content = "# names\nNguyen = Win\nSQL\tsequel\n\nno separator\n"
+    assert parse_lexicon(content) == {"Nguyen": "Win", "SQL": "sequel"}
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("SQL Server is here", "sequel server is here"),
+    ("sql server is here", "sequel server is here"),
+    ("SQL is here", "sequel is here"),
+    ("Sql is here", "Sql is here"),
+    ("SQLite is here", "SQLite is here"),
+])
+def test_longest_term_wins_across_exact_and_any_case(text, spoken):
+    entries = {"SQL": "sequel", "sql server": "sequel server"}
+    assert Lexicon(entries).apply(text) == spoken
+
+
+def test_shorter_term_when_the_longer_one_is_cased_differently():
+    entries = {"sql": "S Q L", "SQL Server": "sequel server", "Server": "host"}
+    assert Lexicon(entries).apply("sql server, SQL Server") == "S Q L server, sequel server"
+
+
+def test_terms_match_whole_words_only():
+    entries = {"gif": "jif", "C++": "C plus plus"}
+    assert Lexicon(entries).apply("GIF gifs C++ C++x") == "jif gifs C plus plus C++x"
+
+
+def test_load_lexicon_reuses_the_cached_pattern(monkeypatch, tmp_path):
+    path = tmp_path / "lexicon.txt"
+    path.write_text("SQL = sequel\nsql server = sequel server\n", encoding="utf-8")
+    cache = tmp_path / "cache"
+    first = load_lexicon(str(path), str(cache))
+    assert load_lexicon(str(path), str(cache)) is first
+    assert len(list(cache.iterdir())) == 1
+
+    lexicon._compiled.clear()
+    monkeypatch.setattr(lexicon, "trie_pattern", None)  # must come from the cache
+    second = load_lexicon(str(path), str(cache))
+    assert second.source == first.source
+    assert second.apply("SQL Server") == "sequel server"
@@ -0,0 +1,73 @@
+import pytest
+
+from offset_index import OffsetIndex
+
+RATE = 1000
+TEXT = "Café au lait. Second sentence.\n\nNext paragraph here."
+
+
+def build():
+    index = OffsetIndex(RATE)
+    index.add(TEXT, 0, 30, 0, 3000)
+    index.add(TEXT, 32, 52, 3500, 5500)
+    return index
+
+
+def test_byte_offsets_follow_utf8():
+    first, second = build()
+    assert (first.byte_start, first.byte_end) == (0, 31)  # "é" is two bytes
+    assert second.byte_start == 33
+
+
+def test_entries_must_arrive_in_order():
+    index = build()
+    with pytest.raises(ValueError):
+        index.add(TEXT, 10, 20, 6000, 7000)
+
+
+def test_lookups():
+    index = build()
+    assert index.at_char(40).char_start == 32
+    assert index.at_time(1.0).char_start == 0
+    assert index.at_time(4.0).char_start == 32
+    assert index.time_of_char(45) == 3.5
+    assert index.at_byte(-1) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "book.idx"
+    index = build()
+    index.save(path)
+    loaded = OffsetIndex.load(path)
+    assert loaded.sample_rate == RATE
+    assert list(loaded) == list(index)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "book.idx"
+    path.write_bytes(b"RIFF" + bytes(32))
+    with pytest.raises(ValueError):
+        OffsetIndex.load(path)
+
+
+def test_cues_interpolate_sentences_within_a_chunk():
+    cues = list(build().cues(TEXT))
+    assert [caption for _, _, caption in cues] == [
+        "Café au lait.", "Second sentence.", "Next paragraph here."]
+    assert cues[0] == (0.0, 1.3, "Café au lait.")
+    assert cues[1][:2] == (1.4, 3.0)
+    assert cues[2][:2] == (3.5, 5.5)
+
+
+def test_srt_and_lrc():
+    index = build()
+    assert index.to_srt(TEXT).splitlines()[:4] == [
+        "1", "00:00:00,000 --> 00:00:01,300", "Café au lait.", ""]
+    assert index.to_lrc(TEXT).splitlines() == [
+        "[00:00.00]Café au lait.", "[00:01.40]Second sentence.", "[00:03.50]Next paragraph here."]
+
+
+def test_srt_times_past_an_hour():
+    index = OffsetIndex(RATE)
+    index.add(TEXT, 32, 52, 3_723_456, 3_725_000)
+    assert "01:02:03,456 --> 01:02:05,000" in index.to_srt(TEXT)
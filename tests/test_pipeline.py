@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+
+import pytest
+
+from pipeline import Pipeline, PipelineStopped, Stage, _Sequencer
+
+
+def _jittered(fn):
+    def run(value):
+        time.sleep(random.random() / 500)
+        return fn(value)
+    return run
+
+
+def test_multi_worker_stages_keep_input_order():
+    stages = [Stage("double", _jittered(lambda n: n * 2), workers=4),
+              Stage("label", _jittered(str), workers=3)]
+    assert list(Pipeline(range(50), stages)) == [str(n * 2) for n in range(50)]
+
+
+def test_stream_stage_sees_the_items_as_an_iterable():
+    def pairs(items):
+        items = iter(items)
+        for first in items:
+            yield first + next(items, 0)
+    stages = [Stage("pair", pairs, stream=True), Stage("square", lambda n: n * n, workers=2)]
+    assert list(Pipeline(range(5), stages)) == [1, 25, 16]
+
+
+def test_stream_stage_runs_on_one_thread():
+    with pytest.raises(ValueError):
+        Stage("batch", list, workers=2, stream=True)
+
+
+def test_stage_error_reaches_the_consumer():
+    def fail_on_seven(n):
+        if n == 7:
+            raise KeyError(n)
+        return n
+    pipeline = Pipeline(range(100), [Stage("check", fail_on_seven, workers=3)])
+    with pytest.raises(KeyError):
+        list(pipeline)
+
+
+def test_source_error_reaches_the_consumer():
+    def source():
+        yield 1
+        raise OSError("unreadable")
+    with pytest.raises(OSError, match="unreadable"):
+        list(Pipeline(source(), [Stage("same", lambda n: n)]))
+
+
+def test_should_stop_ends_the_pipeline_quietly():
+    stop = threading.Event()
+    results = []
+    pipeline = Pipeline(range(10 ** 9), [Stage("same", lambda n: n, workers=2)],
+                        should_stop=stop.is_set)
+    for n in pipeline:
+        results.append(n)
+        if n == 5:
+            stop.set()
+    assert results[:6] == list(range(6))
+    assert len(results) < 100
+
+
+def test_full_queues_hold_the_source_back():
+    read = []
+    release = threading.Event()
+
+    def source():
+        for n in range(1000):
+            read.append(n)
+            yield n
+
+    def slow(n):
+        release.wait(5)
+        return n
+    pipeline = Pipeline(source(), [Stage("slow", slow), Stage("same", lambda n: n)],
+                        queue_size=2)
+    results = iter(pipeline)
+    consumer = threading.Thread(target=lambda: next(results))
+    consumer.start()
+    time.sleep(0.3)
+    # The item in "slow", a full queue of two before it, and one waiting to be put
+    assert read == [0, 1, 2, 3]
+    release.set()
+    consumer.join(5)
+    assert list(results) == list(range(1, 1000))
+
+
+def test_sequencer_holds_workers_until_their_turn():
+    sequencer = _Sequencer(2)
+    stopped = threading.Event()
+    order = []
+
+    def later():
+        sequencer.wait_turn(1, stopped)
+        order.append(1)
+    worker = threading.Thread(target=later)
+    worker.start()
+    time.sleep(0.05)
+    order.append(0)
+    sequencer.advance()
+    worker.join(5)
+    assert order == [0, 1]
+    assert not sequencer.retire() and sequencer.retire()
+
+
+def test_sequencer_gives_up_once_stopped():
+    stopped = threading.Event()
+    stopped.set()
+    with pytest.raises(PipelineStopped):
+        _Sequencer(1).wait_turn(3, stopped)
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from synthesis import BatchSynthesizer, SynthesisError
+
+AUDIO = b"RIFF" + b"\x00" * 100
+
+
+class FakeEngine:
+    """pyttsx3 stand-in; ``renders`` picks which queued files each loop writes"""
+
+    def __init__(self, renders="all", silent=()):
+        self.renders = renders
+        self.silent = set(silent)
+        self.queued = []
+        self.loops = []
+        self.callbacks = {}
+        self.voice = None
+
+    def connect(self, topic, callback):
+        self.callbacks[topic] = callback
+        return topic
+
+    def disconnect(self, token):
+        del self.callbacks[token]
+
+    def setProperty(self, name, value):
+        self.voice = value
+
+    def save_to_file(self, text, path, name=None):
+        self.queued.append((text, path, name))
+
+    def runAndWait(self):
+        queued, self.queued = self.queued, []
+        self.loops.append(len(queued))
+        for text, path, name in (queued if self.renders == "all" else queued[-1:]):
+            if text in self.silent:
+                self.callbacks["error"](name=name, exception="voice missing")
+                continue
+            with open(path, "wb") as f:
+                f.write(AUDIO)
+
+
+def _items(tmp_path, count):
+    return [(i, f"chunk {i}", str(tmp_path / f"{i}.wav")) for i in range(count)]
+
+
+def test_batches_share_a_run_loop(tmp_path):
+    engine = FakeEngine()
+    synthesizer = BatchSynthesizer(engine, window=4)
+    items = _items(tmp_path, 10)
+    assert list(synthesizer.synthesize(items)) == items
+    assert engine.loops == [4, 4, 2]
+    assert synthesizer.stats["retries"] == 0
+
+
+def test_driver_rendering_one_command_per_loop_shrinks_the_window(tmp_path):
+    engine = FakeEngine(renders="last")
+    synthesizer = BatchSynthesizer(engine, window=4)
+    items = _items(tmp_path, 7)
+    assert list(synthesizer.synthesize(items)) == items
+    assert all(os.path.getsize(path) == len(AUDIO) for _, _, path in items)
+    # One batch of four with three retries, then one chunk per loop
+    assert engine.loops == [4, 1, 1, 1, 1, 1, 1]
+    assert synthesizer.window == 1
+    assert synthesizer.stats["retries"] == 3
+
+
+def test_stale_file_from_an_earlier_run_is_not_taken_as_audio(tmp_path):
+    engine = FakeEngine(silent={"chunk 1"})
+    items = _items(tmp_path, 2)
+    with open(items[1][2], "wb") as f:
+        f.write(AUDIO)
+    with pytest.raises(SynthesisError) as error:
+        list(BatchSynthesizer(engine, window=2).synthesize(items))
+    assert error.value.index == 1
+    assert error.value.reason == "voice missing"
+
+
+def test_voice_is_set_for_each_batch(tmp_path):
+    engine = FakeEngine()
+    list(BatchSynthesizer(engine, window=2, voice="v1").synthesize(_items(tmp_path, 3)))
+    assert engine.voice == "v1"
+
+
+def test_stop_ends_before_the_next_batch(tmp_path):
+    engine = FakeEngine()
+    stop = []
+    synthesizer = BatchSynthesizer(engine, window=2, should_stop=lambda: bool(stop))
+    results = []
+    for item in synthesizer.synthesize(_items(tmp_path, 6)):
+        results.append(item)
+        stop.append(True)
+    assert len(results) == 1 and engine.loops == [2]
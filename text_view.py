@@ -0,0 +1,162 @@
+"""Large-document text view with read-along highlighting.
+
+``QPlainTextEdit`` lays text out per block and only for what is visible, so
+it copes with book-length input where ``QTextEdit`` stalls.  Beyond
+``PAGE_THRESHOLD`` characters even that gets slow, so the view keeps the full
+text as a Python string and only loads one page of it into the editor at a
+time.  The spoken chunk or word is shown with an extra selection, which Qt
+paints over the existing layout without touching the document.
+"""
+import bisect
+import re
+
+from PyQt5 import QtGui, QtWidgets
+
+PAGE_THRESHOLD = 2000000
+PAGE_CHARS = 200000
+
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+
+
+class LargeTextView(QtWidgets.QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.editor = QtWidgets.QPlainTextEdit()
+
+        # Page navigation, only shown for documents that are paged
+        self.prev_page_button = QtWidgets.QPushButton("◀")
+        self.next_page_button = QtWidgets.QPushButton("▶")
+        self.page_label = QtWidgets.QLabel()
+        self.prev_page_button.clicked.connect(lambda: self.show_page(self._page - 1))
+        self.next_page_button.clicked.connect(lambda: self.show_page(self._page + 1))
+        nav = QtWidgets.QHBoxLayout()
+        nav.addWidget(self.prev_page_button)
+        nav.addWidget(self.page_label, 1)
+        nav.addWidget(self.next_page_button)
+        self.nav_bar = QtWidgets.QWidget()
+        self.nav_bar.setLayout(nav)
+        self.nav_bar.hide()
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.editor)
+        layout.addWidget(self.nav_bar)
+        self.setLayout(layout)
+
+        self.highlight_format = QtGui.QTextCharFormat()
+        self.highlight_format.setBackground(QtGui.QColor("#555500"))
+        self._text = None
+        self._pages = []
+        self._page = 0
+        self._page_text = ""
+        self._page_has_astral = False
+
+    def setPlaceholderText(self, text):
+        self.editor.setPlaceholderText(text)
+
+    def setPlainText(self, text):
+        self.clear_highlight()
+        if len(text) <= PAGE_THRESHOLD:
+            self._text = None
+            self._pages = []
+            self.nav_bar.hide()
+            self.editor.setReadOnly(False)
+            self.editor.setPlainText(text)
+            return
+
+        # Paged mode: read-only, one page in the editor at a time
+        self._text = text
+        self._pages = _page_starts(text)
+        self.nav_bar.show()
+        self.editor.setReadOnly(True)
+        self.show_page(0)
+
+    def toPlainText(self):
+        if self._text is not None:
+            return self._text
+        return self.editor.toPlainText()
+
+    def clear(self):
+        self.setPlainText("")
+
+    def is_paged(self):
+        return self._text is not None
+
+    def set_read_along(self, active):
+        """Lock editing while source offsets are being highlighted"""
+        if not self.is_paged():
+            self.editor.setReadOnly(active)
+            if active:
+                self._set_page_text(self.editor.toPlainText())
+        if not active:
+            self.clear_highlight()
+
+    def show_page(self, page):
+        if not self.is_paged():
+            return
+        page = max(0, min(page, len(self._pages) - 1))
+        start, end = self._page_bounds(page)
+        self._page = page
+        self._set_page_text(self._text[start:end])
+        self.editor.setPlainText(self._page_text)
+        self.page_label.setText(f"Page {page + 1} of {len(self._pages)}")
+        self.prev_page_button.setEnabled(page > 0)
+        self.next_page_button.setEnabled(page < len(self._pages) - 1)
+
+    def highlight(self, start, end):
+        """Highlight source offsets [start, end) and scroll them into view"""
+        offset = 0
+        if self.is_paged():
+            page = bisect.bisect_right(self._pages, start) - 1
+            if page != self._page:
+                self.show_page(page)
+            offset = self._pages[self._page]
+
+        document = self.editor.document()
+        last = document.characterCount() - 1
+        local_start = min(self._to_qt(start - offset), last)
+        local_end = min(self._to_qt(end - offset), last)
+
+        cursor = QtGui.QTextCursor(document)
+        cursor.setPosition(local_start)
+        cursor.setPosition(local_end, QtGui.QTextCursor.KeepAnchor)
+        selection = QtWidgets.QTextEdit.ExtraSelection()
+        selection.cursor = cursor
+        selection.format = self.highlight_format
+        self.editor.setExtraSelections([selection])
+
+        caret = QtGui.QTextCursor(document)
+        caret.setPosition(local_start)
+        self.editor.setTextCursor(caret)
+        self.editor.ensureCursorVisible()
+
+    def clear_highlight(self):
+        self.editor.setExtraSelections([])
+
+    def _page_bounds(self, page):
+        start = self._pages[page]
+        end = self._pages[page + 1] if page + 1 < len(self._pages) else len(self._text)
+        return start, end
+
+    def _set_page_text(self, text):
+        self._page_text = text
+        self._page_has_astral = _ASTRAL.search(text) is not None
+
+    def _to_qt(self, position):
+        # Qt counts UTF-16 code units; only pages with astral characters differ
+        if not self._page_has_astral:
+            return position
+        return len(self._page_text[:position].encode('utf-16-le')) // 2
+
+
+def _page_starts(text):
+    """Page start offsets, each page ending at a line break near PAGE_CHARS"""
+    starts = [0]
+    position = 0
+    while position + PAGE_CHARS < len(text):
+        newline = text.find('\n', position + PAGE_CHARS)
+        if newline < 0:
+            break
+        position = newline + 1
+        starts.append(position)
+    return starts
@@ -0,0 +1,239 @@
+"""Speech backends: text in, PCM out.
+
+Conversion code talks to a ``TTSBackend`` instead of a pyttsx3 engine, so
+the engine can be picked per job (``ConversionSettings.backend``):
+
+* ``Pyttsx3Backend`` is the original path: batched ``save_to_file`` through
+  the platform driver into a ``ChunkSpool``, each WAV read back and released.
+* ``EspeakBackend`` runs the espeak-ng command line with ``--stdout`` and
+  reads the WAV straight from the pipe.  There is no driver loop and no
+  intermediate file, and since every chunk is its own process several chunks
+  render in parallel on a multi-core machine.
+
+Playback and read-along highlighting still go through the pyttsx3 engine;
+backends only render audio.
+"""
+import os
+import re
+import shutil
+import subprocess
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_codec import CodecWorker, read_wav
+from spool import ChunkSpool
+from synthesis import BatchSynthesizer, DEFAULT_WINDOW, SynthesisError
+
+PYTTSX3 = "pyttsx3"
+ESPEAK_NG = "espeak-ng"
+
+BackendCapabilities = namedtuple("BackendCapabilities", "batching parallel platform_voices")
+
+
+class TTSBackend:
+    """Render text to ``PcmAudio`` with a fixed voice, rate and volume"""
+
+    name = None
+    capabilities = BackendCapabilities(batching=False, parallel=False, platform_voices=False)
+
+    def __init__(self):
+        self.voice = None
+        self.rate = 150
+        self.volume = 0.9
+
+    def configure(self, voice=None, rate=150, volume=0.9):
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+
+    @property
+    def lookahead(self):
+        """Items ``render`` reads before it yields the first of them"""
+        return 1
+
+    @property
+    def concurrency(self):
+        """Chunks ``render`` synthesizes at the same time"""
+        return 1
+
+    def list_voices(self):
+        """Voices as dicts with ``id``, ``name`` and ``gender``"""
+        raise NotImplementedError
+
+    def synthesize(self, text):
+        raise NotImplementedError
+
+    def render(self, items, should_stop=None):
+        """Yield (index, text, PcmAudio) for (index, text) items, in order"""
+        should_stop = should_stop or (lambda: False)
+        for index, text in items:
+            if should_stop():
+                return
+            yield index, text, self.synthesize(text)
+
+
+class Pyttsx3Backend(TTSBackend):
+    name = PYTTSX3
+    capabilities = BackendCapabilities(batching=True, parallel=False, platform_voices=True)
+
+    def __init__(self, engine=None, window=DEFAULT_WINDOW, codec=None, spool=None,
+                 lock=None, pin_voice=False):
+        super().__init__()
+        self._engine = engine
+        self.window = window
+        self.codec = codec or CodecWorker()
+        self.spool = spool
+        self.lock = lock
+        # Other backends share the engine with other voices: re-select ours
+        # before every batch instead of once in configure
+        self.pin_voice = pin_voice
+        self.default_voice = None
+
+    @property
+    def lookahead(self):
+        return self.window
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+        return self._engine
+
+    def configure(self, voice=None, rate=150, volume=0.9):
+        # No voice means the engine's own, not whichever voice was set last
+        if self.default_voice is None:
+            self.default_voice = self.engine.getProperty('voice')
+        super().configure(voice or self.default_voice, rate, volume)
+        if self.voice:
+            self.engine.setProperty('voice', self.voice)
+        self.engine.setProperty('rate', rate)
+        self.engine.setProperty('volume', volume)
+
+    def list_voices(self):
+        from voice_catalog import voices_from_engine
+        return voices_from_engine(self.engine)
+
+    def synthesize(self, text):
+        for _, _, audio in self.render([(0, text)]):
+            return audio
+        raise SynthesisError(0, text, "no audio written")
+
+    def render(self, items, should_stop=None):
+        if self.spool is not None:
+            yield from self._render(items, self.spool, should_stop)
+            return
+        with ChunkSpool() as spool:
+            yield from self._render(items, spool, should_stop)
+
+    def _render(self, items, spool, should_stop):
+        synthesizer = BatchSynthesizer(self.engine, window=self.window,
+                                       should_stop=should_stop, lock=self.lock,
+                                       voice=self.voice if self.pin_voice else None)
+        for index, text, path in synthesizer.synthesize(
+                (index, text, spool.path(f"chunk_{index}.wav")) for index, text in items):
+            audio = self.codec.decode(path)
+            spool.release(path)
+            yield index, text, audio
+
+
+def find_espeak():
+    return shutil.which("espeak-ng") or shutil.which("espeak")
+
+
+class EspeakBackend(TTSBackend):
+    name = ESPEAK_NG
+    capabilities = BackendCapabilities(batching=False, parallel=True, platform_voices=False)
+
+    def __init__(self, executable=None, jobs=None):
+        super().__init__()
+        self.executable = executable or find_espeak()
+        if not self.executable:
+            raise RuntimeError("espeak-ng not found")
+        self.jobs = jobs or os.cpu_count() or 1
+        self._voices = None
+
+    @property
+    def lookahead(self):
+        return self.jobs * 2
+
+    @property
+    def concurrency(self):
+        return self.jobs
+
+    def list_voices(self):
+        if self._voices is None:
+            result = subprocess.run([self.executable, "--voices"], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, check=True)
+            self._voices = _parse_voice_list(result.stdout.decode("utf-8", "replace"))
+        return self._voices
+
+    def synthesize(self, text):
+        # Rate is words per minute as in pyttsx3; amplitude 100 is full volume
+        cmd = [self.executable, "--stdout", "-s", str(int(self.rate)),
+               "-a", str(int(round(self.volume * 100)))]
+        if self.voice:
+            cmd += ["-v", self.voice]
+        result = subprocess.run(cmd, input=text.encode("utf-8"), stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, check=False)
+        if result.returncode != 0 or not result.stdout:
+            reason = result.stderr.decode("utf-8", "replace").strip() or "no audio written"
+            raise SynthesisError(0, text, reason)
+        return read_wav(result.stdout)
+
+    def render(self, items, should_stop=None):
+        """Keep ``jobs`` espeak-ng processes busy, yielding results in order"""
+        should_stop = should_stop or (lambda: False)
+        items = iter(items)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while True:
+                while len(pending) < self.jobs * 2:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    pending.append((item, pool.submit(self.synthesize, item[1])))
+                if not pending or should_stop():
+                    for _, future in pending:
+                        future.cancel()
+                    return
+                (index, text), future = pending.popleft()
+                try:
+                    audio = future.result()
+                except SynthesisError as e:
+                    raise SynthesisError(index, text, e.reason) from None
+                yield index, text, audio
+
+
+def _parse_voice_list(listing):
+    """Voices from ``espeak-ng --voices`` (Pty Language Age/Gender VoiceName File ...)"""
+    voices = []
+    for line in listing.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 5:
+            continue
+        language, age_gender, name = fields[1], fields[2], fields[3]
+        gender = {"M": "male", "F": "female"}.get(re.sub(r"^[-\d]*/?", "", age_gender),
+                                                   "unknown")
+        voices.append({"id": language, "name": f"{name.replace('_', ' ')} [{language}]",
+                       "gender": gender})
+    return voices
+
+
+def available_backends():
+    """Backend names that can run on this machine"""
+    names = [PYTTSX3]
+    if find_espeak():
+        names.append(ESPEAK_NG)
+    return names
+
+
+def create_backend(name, engine=None, window=DEFAULT_WINDOW, codec=None, spool=None,
+                   jobs=None, lock=None, pin_voice=False):
+    """Backend ``name``, reusing the local pyttsx3 engine when it applies"""
+    if name == ESPEAK_NG:
+        return EspeakBackend(jobs=jobs)
+    if name == PYTTSX3:
+        return Pyttsx3Backend(engine, window=window, codec=codec, spool=spool, lock=lock,
+                              pin_voice=pin_voice)
+    raise ValueError(f"Unknown speech backend {name!r}")
@@ -0,0 +1,65 @@
+"""Persisted voice catalog and deferred engine start-up.
+
+``pyttsx3.init()`` and enumerating ``getProperty('voices')`` can take several
+seconds, so the GUIs list voices from the catalog saved by the previous run,
+show the window straight away and start the engine on a background thread.
+When the engine is ready its voice list replaces the cached one and is
+written back for next time.
+"""
+import json
+import os
+import tempfile
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "audiobook_reader"
+)
+CATALOG_FILE = os.path.join(CACHE_DIR, "voices.json")
+
+
+def load_voices(path=CATALOG_FILE):
+    """Return the cached voices as a list of {id, name, gender} dicts"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            voices = json.load(f).get("voices", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [v for v in voices if isinstance(v, dict) and v.get("id")]
+
+
+def save_voices(voices, path=CATALOG_FILE):
+    """Atomically write the voice list, ignoring an unwritable cache dir"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"voices": voices}, f, indent=1)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def voices_from_engine(engine):
+    voices = []
+    for voice in engine.getProperty('voices'):
+        voices.append({
+            "id": voice.id,
+            "name": voice.name or voice.id,
+            "gender": voice.gender,
+        })
+    return voices
+
+
+def start_engine(rate=150, volume=0.9):
+    """Import pyttsx3, start an engine and refresh the catalog.
+
+    Meant to run off the GUI thread; returns (engine, voices).
+    """
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    voices = voices_from_engine(engine)
+    if voices != load_voices():
+        save_voices(voices)
+    return engine, voices
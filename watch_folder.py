@@ -0,0 +1,335 @@
+"""Watch-folder daemon: convert text files as they are dropped into folders.
+
+    python watch_folder.py ~/Manuscripts --settings turbo.json --output-dir ~/Audiobooks
+
+Settings are a ``ConversionSettings`` JSON file, as written by "Save
+settings..." in the Turbo GUI, so a book converts the same way it would have
+from the window; options given on the command line override the file.
+
+New and changed files are picked up with inotify on Linux and by polling
+elsewhere.  Network shares do not report writes made from other machines to
+inotify, so the folders are also rescanned every ``--rescan`` seconds.  A
+file is converted only once its size and modification time have not changed
+for ``--settle`` seconds, so manuscripts still being copied are left alone.
+
+Every converted file's content hash is recorded in a ledger; a file whose
+content was already converted (renamed, touched or dropped again) is skipped
+while its audiobook still exists.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import dataclasses
+import hashlib
+import json
+import os
+import queue
+import select
+import struct
+import threading
+import time
+
+from conversion import SAVE_MP3, ConversionJob, ConversionSettings
+from tts_backends import PYTTSX3
+from voice_catalog import CACHE_DIR
+
+LEDGER_FILE = os.path.join(CACHE_DIR, "watch_ledger.json")
+DEFAULT_EXTENSIONS = (".txt", ".md")
+DEFAULT_SETTLE = 5.0  # seconds a file must stay unchanged before converting
+DEFAULT_POLL = 2.0
+DEFAULT_RESCAN = 60.0
+IGNORED_SUFFIXES = ("~", ".tmp", ".part", ".crdownload", ".swp")
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def file_digest(path):
+    """sha1 of the file's content"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Inotify:
+    """Minimal inotify binding: file names written or moved into directories"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+
+    def __init__(self, directories):
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True) if name else None
+        if libc is None or not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            self.directories[wd] = directory
+
+    def read(self, timeout):
+        """Paths with events in the next ``timeout`` seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name and wd in self.directories:
+                paths.append(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Yield files in ``directories`` once they are new or changed and settled"""
+
+    def __init__(self, directories, extensions=DEFAULT_EXTENSIONS, settle=DEFAULT_SETTLE,
+                 poll_interval=DEFAULT_POLL, rescan_interval=DEFAULT_RESCAN, use_inotify=True):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify(self.directories)
+            except OSError:
+                self.inotify = None
+        self._pending = {}  # path -> (signature, time it last changed)
+        self._reported = {}  # path -> signature when last yielded
+
+    @property
+    def mode(self):
+        return "inotify" if self.inotify is not None else "polling"
+
+    def wanted(self, path):
+        name = os.path.basename(path)
+        return (not name.startswith(".") and not name.endswith(IGNORED_SUFFIXES)
+                and name.lower().endswith(self.extensions))
+
+    def changes(self, stop):
+        """Generator of settled paths until the ``stop`` event is set"""
+        self._scan()
+        last_scan = time.monotonic()
+        try:
+            while not stop.is_set():
+                wait = min(self.poll_interval, self.settle / 2 or self.poll_interval)
+                if self.inotify is not None:
+                    for path in self.inotify.read(wait):
+                        self._note(path)
+                    rescan = self.rescan_interval
+                else:
+                    stop.wait(wait)
+                    rescan = self.poll_interval
+                if time.monotonic() - last_scan >= rescan:
+                    self._scan()
+                    last_scan = time.monotonic()
+                yield from self._settled()
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+
+    def _scan(self):
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                self._note(entry.path)
+
+    def _note(self, path):
+        if not self.wanted(path):
+            return
+        signature = _signature(path)
+        if signature is None or signature == self._reported.get(path):
+            return
+        known = self._pending.get(path)
+        if known is None or known[0] != signature:
+            self._pending[path] = (signature, time.monotonic())
+
+    def _settled(self):
+        now = time.monotonic()
+        for path, (signature, changed) in list(self._pending.items()):
+            if now - changed < self.settle:
+                continue
+            current = _signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now)
+            else:
+                del self._pending[path]
+                self._reported[path] = signature
+                yield path
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ConversionLedger:
+    """Content hashes of converted files and the audiobooks made from them"""
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def converted(self, digest):
+        """Output file for content ``digest`` if it still exists, else None"""
+        entry = self.entries.get(digest)
+        if entry and os.path.exists(entry["output"]):
+            return entry["output"]
+        return None
+
+    def record(self, digest, source, output):
+        self.entries[digest] = {"source": source, "output": output, "converted": time.time()}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(temp_path, self.path)
+
+
+class WatchDaemon:
+    """Queue settled files from a ``FolderWatcher`` and convert them one at a time"""
+
+    def __init__(self, watcher, settings, ledger=None, log=print):
+        self.watcher = watcher
+        self.settings = settings
+        self.ledger = ledger or ConversionLedger()
+        self.log = log
+        self.queue = queue.Queue()
+        self.stop = threading.Event()
+        self.engine = None
+
+    def run(self):
+        converter = threading.Thread(target=self._convert_loop, name="converter", daemon=True)
+        converter.start()
+        self.log(f"Watching {', '.join(self.watcher.directories)} ({self.watcher.mode})")
+        try:
+            for path in self.watcher.changes(self.stop):
+                self.log(f"Queued {path}")
+                self.queue.put(path)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop.set()
+            if self.engine is not None:
+                self.engine.stop()
+            converter.join()
+
+    def _convert_loop(self):
+        while not self.stop.is_set():
+            try:
+                path = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.convert(path)
+            except Exception as e:
+                self.log(f"Failed {path}: {e}")
+
+    def convert(self, path):
+        """Convert one file unless its content was converted before"""
+        digest = file_digest(path)
+        output = self.ledger.converted(digest)
+        if output is not None:
+            self.log(f"Skipped {path}: already converted to {output}")
+            return output
+
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        settings = dataclasses.replace(
+            self.settings, output_format=SAVE_MP3,
+            filename=os.path.splitext(os.path.basename(path))[0])
+        os.makedirs(settings.output_dir, exist_ok=True)
+        if self.engine is None and settings.backend == PYTTSX3 and not settings.workers:
+            # One engine for the daemon, created on first use and kept for
+            # every job; each job's pipeline drives it from its stage threads
+            # under the job's engine lock, one job at a time
+            import pyttsx3
+            self.engine = pyttsx3.init()
+
+        def progress(value=None, message=None):
+            if message:
+                self.log(f"  {message}")
+
+        self.log(f"Converting {path}")
+        output = ConversionJob(self.engine, text, settings, progress=progress,
+                               should_stop=self.stop.is_set).run()
+        if output is not None:
+            self.ledger.record(digest, os.path.abspath(path), os.path.abspath(output))
+        return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert text files dropped into folders")
+    parser.add_argument("directories", nargs="+")
+    parser.add_argument("--settings", help="ConversionSettings JSON saved from the GUI")
+    parser.add_argument("--output-dir")
+    parser.add_argument("--backend")
+    parser.add_argument("--voice")
+    parser.add_argument("--rate", type=int)
+    parser.add_argument("--extensions", nargs="+", default=list(DEFAULT_EXTENSIONS))
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help="Seconds a file must stay unchanged before it is converted")
+    parser.add_argument("--rescan", type=float, default=DEFAULT_RESCAN,
+                        help="Seconds between full rescans alongside inotify")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--ledger", default=LEDGER_FILE)
+    args = parser.parse_args()
+
+    overrides = {name: value for name, value in (
+        ("output_dir", args.output_dir), ("backend", args.backend),
+        ("voice", args.voice), ("rate", args.rate)) if value is not None}
+    if args.settings:
+        settings = ConversionSettings.load(args.settings, **overrides)
+    else:
+        settings = ConversionSettings(**overrides)
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error(f"not a directory: {directory}")
+
+    watcher = FolderWatcher(args.directories, args.extensions, settle=args.settle,
+                            rescan_interval=args.rescan, use_inotify=not args.poll)
+    WatchDaemon(watcher, settings, ConversionLedger(args.ledger)).run()
+
+
+if __name__ == "__main__":
+    main()